@@ -3,30 +3,101 @@
 # 维护约定：变更前先确认输入输出与调用链，避免影响前后端联调。
 
 import csv
-import gzip as gzip_mod
 import io
+import itertools
+import json
 import os
+import secrets
 import sqlite3
 import hashlib
 import hmac
+import importlib.util
 import math
+import mimetypes
+import threading
 import time
 import uuid
 import urllib.error
 import urllib.request
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 from urllib.parse import urlparse
 
-from flask import Flask, Response, g, jsonify, redirect, render_template, request, send_file, session, url_for
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    send_from_directory,
+    session,
+    stream_with_context,
+    url_for,
+)
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
+from werkzeug.wsgi import ClosingIterator, FileWrapper
+
+from coord_transform import (
+    COORD_SYSTEM_GCJ02,
+    COORD_SYSTEM_WGS84,
+    mercator_quantize_batch,
+    normalize_coord_system,
+    to_float,
+    to_optional_float,
+    to_wgs84,
+    validate_lat_lon,
+    validate_source_coords,
+    wgs84_to_gcj02_batch,
+)
+from route_import import (
+    COLUMNAR_IMPORT_FORMATS,
+    IMPORT_FORMAT_LABELS,
+    NODE_IMPORT_FORMATS,
+    ROW_ERROR_KEY,
+    columnar_import_available,
+    iter_node_upload_rows,
+    iter_parsed_upload_routes,
+    parse_endpoint,
+    parse_route_payload,
+    resolve_import_format,
+)
+from json_codec import (
+    FastJSONProvider,
+    dumps_bytes,
+    iter_json_array,
+    iter_ndjson,
+    resolve_json_backend,
+    splice_json_array,
+)
+from response_codec import (
+    COMPRESS_MIN_BYTES,
+    compress_bytes,
+    compression_levels,
+    iter_compressed_chunks,
+    negotiate_encoding,
+)
+from route_payload import (
+    ROUTE_LAYOUT_BINARY,
+    ROUTE_LAYOUT_COLUMNAR,
+    ROUTE_LAYOUT_ROWS,
+    ROUTE_MIME_BINARY,
+    ROUTE_MIME_COLUMNAR,
+    encode_routes_binary,
+    encode_routes_columnar,
+    negotiate_route_layout,
+)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "webgis.db")
+DB_PATH = os.environ.get("WEBGIS_DB_PATH", "").strip() or os.path.join(BASE_DIR, "webgis.db")
 DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
 MAX_FAILED_LOGIN_ATTEMPTS = 5
 LOGIN_LOCK_MINUTES = 15
+LOGIN_HISTORY_KEEP = 10
 PASSWORD_MIN_LENGTH = 6
 PASSWORD_MAX_LENGTH = 64
 LOCAL_DEFAULT_AVATAR = "/static/images/avatar-default.svg"
@@ -40,11 +111,98 @@ TILE_RATE_WINDOW_SECONDS = 60
 TILE_CACHE_DIR = os.path.join(BASE_DIR, ".tile_cache")
 TILE_CACHE_TTL_SECONDS = 86400
 SCHEMA_VERSION = "20260304_v5"
-COORD_SYSTEM_WGS84 = "wgs84"
-COORD_SYSTEM_GCJ02 = "gcj02"
-GCJ_A = 6378245.0
-GCJ_EE = 0.00669342162296594323
+CUSTOM_REGION = "自定义"
+ROUTE_BBOX_MODE_EXTENT = "extent"
+ROUTE_BBOX_MODE_WITHIN = "within"
+ROUTE_BBOX_MODE_ENDPOINT = "endpoint"
+ROUTE_BBOX_MODES = {ROUTE_BBOX_MODE_EXTENT, ROUTE_BBOX_MODE_WITHIN, ROUTE_BBOX_MODE_ENDPOINT}
+PROJECTION_EPSG3857 = "epsg3857"
+PROJECTION_ALIASES = {"epsg3857": PROJECTION_EPSG3857, "3857": PROJECTION_EPSG3857, "mercator": PROJECTION_EPSG3857}
+PROJECTION_DEFAULT_PRECISION = 1.0
+PROJECTION_MIN_PRECISION = 0.01
+PROJECTION_MAX_PRECISION = 100000.0
+ROUTE_COORD_OUTPUT_FIELDS = (
+    "origin_lat",
+    "origin_lon",
+    "destination_lat",
+    "destination_lon",
+    "origin_lat_wgs84",
+    "origin_lon_wgs84",
+    "destination_lat_wgs84",
+    "destination_lon_wgs84",
+    "origin_lat_gcj02",
+    "origin_lon_gcj02",
+    "destination_lat_gcj02",
+    "destination_lon_gcj02",
+    "coord_system",
+)
+ROUTE_HASH_PRECISION = 6
+# 未提供创建时间的路线：同一账户在此时间窗内已有同内容路线时视为重复提交（双击保存、重复上传模板）
+ROUTE_DUPLICATE_WINDOW_SECONDS = 600
+ROUTE_DUPLICATE_SKIP = "skip"
+ROUTE_DUPLICATE_UPSERT = "upsert"
+ROUTE_DUPLICATE_MODES = {ROUTE_DUPLICATE_SKIP, ROUTE_DUPLICATE_UPSERT}
+ROUTE_DEDUPE_CHUNK_SIZE = 5000
+NODE_CONFLICT_SKIP = "skip"
+NODE_CONFLICT_REPLACE = "replace"
+NODE_CONFLICT_MODES = {NODE_CONFLICT_SKIP, NODE_CONFLICT_REPLACE}
+NODE_BATCH_MAX_ITEMS = 1000
+NODE_INSERT_SQL = "INSERT INTO nodes(code, name, region, lat, lon) VALUES(?,?,?,?,?)"
+# 覆盖时使用 UPDATE（而非 REPLACE 删除重建），以便触发器只按变化同步路线终点区域
+NODE_INSERT_SQL_BY_CONFLICT_MODE = {
+    NODE_CONFLICT_SKIP: f"{NODE_INSERT_SQL} ON CONFLICT(code) DO NOTHING",
+    NODE_CONFLICT_REPLACE: (
+        f"{NODE_INSERT_SQL} ON CONFLICT(code) DO UPDATE SET "
+        "name = excluded.name, region = excluded.region, lat = excluded.lat, lon = excluded.lon"
+    ),
+}
+DATA_VERSION_ROUTES = "routes"
+DATA_VERSION_NODES = "nodes"
+DATA_VERSION_USERS = "users"
+DATA_VERSION_ALERTS = "alerts"
+IMPORT_CHUNK_SIZE = 2000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+IMPORT_JOB_DIR = os.path.join(BASE_DIR, ".import_jobs")
+IMPORT_JOB_WORKERS = 2
+IMPORT_PARSE_PROCESSES = 4
+IMPORT_JOB_STATUS_QUEUED = "queued"
+IMPORT_JOB_STATUS_RUNNING = "running"
+IMPORT_JOB_STATUS_COMPLETED = "completed"
+IMPORT_JOB_STATUS_FAILED = "failed"
+IMPORT_JOB_STATUS_CANCELLED = "cancelled"
+IMPORT_JOB_ACTIVE_STATUSES = {IMPORT_JOB_STATUS_QUEUED, IMPORT_JOB_STATUS_RUNNING}
+FLOW_CELL_PIXELS = 64
+FLOW_CACHE_MAX_ENTRIES = 256
+ROUTE_FRAGMENT_CACHE_MAX_ENTRIES = 20000
+NDJSON_MIMETYPE = "application/x-ndjson"
+CHANGE_ENTITY_ROUTE = "route"
+CHANGE_ENTITY_USER = "user"
+CHANGE_OP_UPSERT = "upsert"
+CHANGE_OP_DELETE = "delete"
+CHANGE_LOG_FLOOR_KEY = "change_log_floor"
+DATA_EPOCH_KEY = "data_epoch"
+CHANGE_LOG_MAX_TOMBSTONES = 20000
+CHANGE_LOG_COMPACT_INTERVAL_SECONDS = 600
+CHANGE_SYNC_MAX_ENTRIES = 5000
+CHANGE_SYNC_FETCH_CHUNK = 500
+STREAM_FETCH_ROWS = 500
+# 构建阶段（webgisctl build）生成的静态资源预压缩变体：后缀 -> Content-Encoding，同等 q 值时按此顺序优先
+PRECOMPRESSED_STATIC_VARIANTS = ((".br", "br"), (".gz", "gzip"))
+COMPRESSED_BODY_CACHE_MAX_BYTES = 16 * 1024 * 1024
+COMPRESSED_BODY_CACHE_MAX_ENTRY_BYTES = 2 * 1024 * 1024
 _tile_rate_buckets: dict[str, deque[float]] = {}
+_flow_cache: OrderedDict[tuple[Any, ...], list[dict[str, Any]]] = OrderedDict()
+_flow_cache_lock = threading.Lock()
+_route_fragment_cache: OrderedDict[tuple[Any, ...], bytes] = OrderedDict()
+_route_fragment_cache_lock = threading.Lock()
+_compressed_body_cache: OrderedDict[tuple[bytes, str, int], bytes] = OrderedDict()
+_compressed_body_cache_bytes = 0
+_compressed_body_cache_lock = threading.Lock()
+_change_log_compacted_at = 0.0
+_node_registry: dict[str, Any] = {"version": None, "nodes": {}, "body": None}
+_node_registry_lock = threading.Lock()
+_import_job_executor: ThreadPoolExecutor | None = None
+_import_job_lock = threading.Lock()
 
 USER_TYPE_NORMAL_USER = "normal_user"
 USER_TYPE_ADMIN = "admin"
@@ -166,40 +324,38 @@ def append_login_ip_history(
     user_id: int,
     ip_address: str,
     login_at: str | None = None,
-    keep: int = 10,
+    keep: int = LOGIN_HISTORY_KEEP,
 ) -> None:
+    # 每个账户固定 keep 个槽位的环形缓冲：序号自增后按 seq % keep 覆盖最旧记录，
+    # 登录写入恒为一次 UPDATE + 一次 UPSERT，无需排序或删除。
     ts = (login_at or utc_now_text()).strip() or utc_now_text()
     ip = (ip_address or "").strip()[:128]
+    uid = int(user_id)
+    db.execute("UPDATE users SET login_seq = login_seq + 1 WHERE id = ?", (uid,))
+    row = db.execute("SELECT login_seq FROM users WHERE id = ?", (uid,)).fetchone()
+    if row is None:
+        return
+    seq = int(row["login_seq"])
     db.execute(
         """
-        INSERT INTO user_login_history(user_id, ip_address, login_at)
-        VALUES(?,?,?)
-        """,
-        (int(user_id), ip, ts),
-    )
-    db.execute(
-        """
-        DELETE FROM user_login_history
-        WHERE user_id = ?
-          AND id NOT IN (
-              SELECT id
-              FROM user_login_history
-              WHERE user_id = ?
-              ORDER BY datetime(login_at) DESC, id DESC
-              LIMIT ?
-          )
+        INSERT INTO user_login_history(user_id, slot, seq, ip_address, login_at)
+        VALUES(?,?,?,?,?)
+        ON CONFLICT(user_id, slot) DO UPDATE SET
+            seq = excluded.seq,
+            ip_address = excluded.ip_address,
+            login_at = excluded.login_at
         """,
-        (int(user_id), int(user_id), int(max(1, keep))),
+        (uid, seq % max(1, int(keep)), seq, ip, ts),
     )
 
 
-def fetch_login_ip_history(db: sqlite3.Connection, user_id: int, limit: int = 10) -> list[dict[str, Any]]:
+def fetch_login_ip_history(db: sqlite3.Connection, user_id: int, limit: int = LOGIN_HISTORY_KEEP) -> list[dict[str, Any]]:
     rows = db.execute(
         """
         SELECT ip_address, login_at
         FROM user_login_history
         WHERE user_id = ?
-        ORDER BY datetime(login_at) DESC, id DESC
+        ORDER BY seq DESC
         LIMIT ?
         """,
         (int(user_id), int(max(1, limit))),
@@ -247,6 +403,35 @@ def get_tile_cache_ttl_seconds() -> int:
     return max(0, min(7 * 24 * 3600, value))
 
 
+def get_import_job_workers() -> int:
+    raw = (os.environ.get("WEBGIS_IMPORT_WORKERS") or "").strip()
+    if not raw:
+        return IMPORT_JOB_WORKERS
+    try:
+        value = int(raw)
+    except ValueError:
+        return IMPORT_JOB_WORKERS
+    return max(1, min(8, value))
+
+
+def get_import_processes() -> int:
+    # 导入解析进程数；1 表示在当前进程内解析
+    default = max(1, min(IMPORT_PARSE_PROCESSES, os.cpu_count() or 1))
+    raw = (os.environ.get("WEBGIS_IMPORT_PROCESSES") or "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return max(1, min(16, value))
+
+
+def get_json_backend() -> str:
+    # WEBGIS_JSON_BACKEND=auto|orjson|json；默认 auto（已安装 orjson 时使用）
+    return resolve_json_backend(os.environ.get("WEBGIS_JSON_BACKEND"))
+
+
 def tile_cache_enabled() -> bool:
     return get_tile_cache_ttl_seconds() > 0
 
@@ -405,6 +590,8 @@ def create_app() -> Flask:
     app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
     app.config["SESSION_COOKIE_SECURE"] = os.environ.get("WEBGIS_COOKIE_SECURE", "0") == "1"
     app.permanent_session_lifetime = timedelta(hours=12)
+    app.json = FastJSONProvider(app)
+    app.json.backend = get_json_backend()
     init_db()
     if not system_admin_enabled():
         print(
@@ -417,6 +604,19 @@ def create_app() -> Flask:
             f"或在项目根目录写入 {os.path.basename(TIANDITU_API_KEY_FILE)}。"
         )
 
+    import_jobs_resumed = threading.Event()
+
+    @app.before_request
+    def resume_pending_import_jobs() -> None:
+        # 仅在服务实际处理请求时恢复后台导入，避免命令行工具导入本模块时启动工作线程
+        if import_jobs_resumed.is_set():
+            return
+        with _import_job_lock:
+            if import_jobs_resumed.is_set():
+                return
+            import_jobs_resumed.set()
+        resume_import_jobs()
+
     @app.teardown_appcontext
     def close_db(_: Exception | None) -> None:
         db = g.pop("db", None)
@@ -432,7 +632,11 @@ def create_app() -> Flask:
         response.headers["Permissions-Policy"] = "geolocation=(), camera=(), microphone=()"
         # Prevent caching of API responses that may contain sensitive data
         if request.path.startswith("/api/"):
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+            # 带 ETag 的只读接口允许浏览器私有缓存，但每次使用前都须携带 If-None-Match 重新验证
+            if "ETag" in response.headers:
+                response.headers["Cache-Control"] = "private, no-cache"
+            else:
+                response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
             response.headers["Pragma"] = "no-cache"
         # Long-lived cache for static assets (versioned via ?v= query string)
         elif request.path.startswith("/static/"):
@@ -440,34 +644,72 @@ def create_app() -> Flask:
         return response
 
     @app.after_request
-    def gzip_response(response: Response) -> Response:
-        # Skip if client doesn't accept gzip, response is already encoded,
-        # status is not 200, or content is too small to benefit.
+    def compress_response(response: Response) -> Response:
+        # 按 Accept-Encoding（含 q 值）在可用编码中协商，级别按 Content-Type 取预设；
+        # 跳过非 200、已编码、直通文件（send_file / 静态资源）与过小的响应体。
+        # 流式响应逐块压缩、定期刷新，不调用 get_data，因而不会先把整个响应缓冲到内存
         if (
-            "gzip" not in request.headers.get("Accept-Encoding", "")
-            or response.status_code != 200
+            response.status_code != 200
             or response.direct_passthrough
+            or isinstance(response.response, FileWrapper)
             or "Content-Encoding" in response.headers
-            or response.content_length is not None and response.content_length < 256
+            or response.content_length is not None and response.content_length < COMPRESS_MIN_BYTES
         ):
             return response
-        content_type = response.content_type or ""
-        compressible = any(
-            ct in content_type
-            for ct in ("text/html", "text/css", "application/javascript", "text/javascript", "application/json", "image/svg+xml")
-        )
-        if not compressible:
+        levels = compression_levels(response.content_type or "")
+        if levels is None:
+            return response
+        if response.is_streamed:
+            response.vary.add("Accept-Encoding")
+            encoding = negotiate_encoding(request.accept_encodings)
+            if encoding is None:
+                return response
+            # ClosingIterator 保证客户端断开时原始生成器（及 stream_with_context 的请求上下文）被关闭
+            source = response.response
+            response.response = ClosingIterator(
+                iter_compressed_chunks(response.iter_encoded(), encoding, levels[encoding]),
+                getattr(source, "close", None),
+            )
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
             return response
         data = response.get_data()
-        if len(data) < 256:
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
             return response
-        compressed = gzip_mod.compress(data, compresslevel=6)
+        compressed = compress_body_cached(data, encoding, levels[encoding])
         response.set_data(compressed)
-        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Content-Encoding"] = encoding
         response.headers["Content-Length"] = len(compressed)
-        response.headers.setdefault("Vary", "Accept-Encoding")
         return response
 
+    def send_precompressed_static(filename: str) -> Response:
+        # 替换 Flask 默认的 static 视图：存在不旧于源文件的 .br/.gz 变体且客户端接受该编码时直接发送变体，
+        # 仍保留原文件的 Content-Type；静态响应为 direct_passthrough，不会再经过 compress_response。
+        # 文件有变体时，未命中变体的原文件响应同样声明 Vary，避免中间缓存把它发给接受压缩的客户端
+        variants = precompressed_static_variants(app.static_folder, filename)
+        variant = precompressed_static_variant(variants, request.accept_encodings)
+        if variant is None:
+            response = app.send_static_file(filename)
+            if variants:
+                response.vary.add("Accept-Encoding")
+            return response
+        suffix, encoding = variant
+        response = send_from_directory(
+            app.static_folder,
+            filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=app.get_send_file_max_age(filename),
+        )
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.view_functions["static"] = send_precompressed_static
+
     def session_user() -> sqlite3.Row | dict[str, Any] | None:
         if session.get("is_system_admin"):
             return build_system_admin_user(status="online")
@@ -489,6 +731,52 @@ def create_app() -> Flask:
             return None, (jsonify({"ok": False, "message": "无管理员权限"}), 403)
         return user, None
 
+    def etag_viewer() -> str:
+        # ETag 需区分会话身份：同一浏览器切换账户后不能用旧账户的缓存通过验证
+        if session.get("is_system_admin"):
+            return "system"
+        return str(session.get("user_id") or "anon")
+
+    def not_modified(etag: str) -> Response | None:
+        # If-None-Match 命中时直接返回 304，调用方在执行任何数据查询前判断（按弱比较匹配）
+        if not request.if_none_match.contains_weak(etag):
+            return None
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    def with_etag(response: Response, etag: str) -> Response:
+        # 弱 ETag：同一数据版本的 identity / gzip / br / zstd 响应字节不同但语义相同，不能共用强 ETag
+        response.set_etag(etag, weak=True)
+        return response
+
+    def negotiate_list_stream() -> str | None:
+        # Accept: application/x-ndjson 时按 NDJSON 流式输出；?stream=1 时按原有 JSON 结构分块输出
+        if request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            return "ndjson"
+        if request.args.get("stream", "").strip().lower() in {"1", "true", "yes"}:
+            return "json"
+        return None
+
+    def stream_list_response(
+        mode: str,
+        head: dict[str, Any],
+        key: str,
+        fragment_batches: Iterable[list[bytes]],
+    ) -> Response:
+        # 游标按批读取、逐批序列化并增量压缩，首字节时间与内存占用不随行数增长
+        backend = app.json.backend
+        if mode == "ndjson":
+            chunks = iter_ndjson(head, fragment_batches, backend)
+            mimetype = NDJSON_MIMETYPE
+        else:
+            chunks = iter_json_array(head, key, fragment_batches, backend)
+            mimetype = "application/json"
+        # 压缩由 compress_response 对流式响应逐块完成
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+        response.vary.add("Accept")
+        return response
+
     @app.route("/")
     def home() -> str:
         user = session_user()
@@ -695,7 +983,7 @@ def create_app() -> Flask:
             "UPDATE users SET status = 'online', last_active_at = ? WHERE id = ?",
             (utc_now_text(), new_id),
         )
-        append_login_ip_history(db, new_id, register_ip, utc_now_text(), keep=10)
+        append_login_ip_history(db, new_id, register_ip, utc_now_text())
         db.commit()
         return jsonify({"ok": True, "user_id": new_id, "redirect": "/"})
 
@@ -752,7 +1040,7 @@ def create_app() -> Flask:
         session.clear()
         session["user_id"] = int(cur.lastrowid)
         session.permanent = True
-        append_login_ip_history(db, int(cur.lastrowid), register_ip, utc_now_text(), keep=10)
+        append_login_ip_history(db, int(cur.lastrowid), register_ip, utc_now_text())
         db.commit()
         return jsonify({"ok": True, "user_id": int(cur.lastrowid), "redirect": "/"})
 
@@ -841,7 +1129,7 @@ def create_app() -> Flask:
             """,
             (utc_now_text(), uid),
         )
-        append_login_ip_history(db, uid, extract_client_ip(request), utc_now_text(), keep=10)
+        append_login_ip_history(db, uid, extract_client_ip(request), utc_now_text())
         db.commit()
         redirect_path = "/admin" if normalize_user_type(row["user_type"], "") in ADMIN_USER_TYPES else "/"
         return jsonify(
@@ -929,6 +1217,13 @@ def create_app() -> Flask:
         category = request.args.get("category", "").strip()
         user_id = request.args.get("user_id", "").strip()
         limit = clamp_int(request.args.get("limit", "300"), 1, 1000, 300)
+        try:
+            bbox = parse_bbox(request.args.get("bbox"))
+            intersects = normalize_bbox_mode(request.args.get("intersects"))
+            projection = parse_projection_options(request.args)
+            layout = negotiate_route_layout(request.args.get("layout"), request.accept_mimetypes)
+        except ValueError as exc:
+            return jsonify({"ok": False, "message": str(exc)}), 400
 
         sql = [
             """
@@ -957,41 +1252,125 @@ def create_app() -> Flask:
             sql.append("AND r.category = ?")
             params.append(category)
 
-        if not is_admin_user(user):
-            sql.append("AND r.user_id = ?")
-            params.append(int(user["id"]))
-        else:
-            # 普通管理员只能看学生线路，超级管理员可看全部。
+        if bbox is not None:
+            clause, clause_params = route_bbox_clause(db, bbox, intersects)
+            sql.append(clause)
+            params.extend(clause_params)
+
+        scope_clause, scope_params = route_scope_clause(user)
+        sql.append(scope_clause)
+        params.extend(scope_params)
+        if is_admin_user(user) and user_id:
+            try:
+                uid = int(user_id)
+            except ValueError:
+                return jsonify({"ok": False, "message": "user_id 非法"}), 400
             if not is_super_admin_user(user):
-                sql.append("AND COALESCE(u.user_type, '') = ?")
-                params.append(USER_TYPE_NORMAL_USER)
-            if user_id:
-                try:
-                    uid = int(user_id)
-                except ValueError:
-                    return jsonify({"ok": False, "message": "user_id 非法"}), 400
-                if not is_super_admin_user(user):
-                    target_user = db.execute(
-                        "SELECT id, user_type FROM users WHERE id = ?",
-                        (uid,),
-                    ).fetchone()
-                    if target_user is None:
-                        return jsonify({"ok": False, "message": "用户不存在"}), 404
-                    if not can_manage_target_user(user, target_user["user_type"]):
-                        return jsonify({"ok": False, "message": "无权限查看该用户路线"}), 403
-                sql.append("AND r.user_id = ?")
-                params.append(uid)
+                target_user = db.execute(
+                    "SELECT id, user_type FROM users WHERE id = ?",
+                    (uid,),
+                ).fetchone()
+                if target_user is None:
+                    return jsonify({"ok": False, "message": "用户不存在"}), 404
+                if not can_manage_target_user(user, target_user["user_type"]):
+                    return jsonify({"ok": False, "message": "无权限查看该用户路线"}), 403
+            sql.append("AND r.user_id = ?")
+            params.append(uid)
 
         sql.append("ORDER BY datetime(r.created_at) DESC LIMIT ?")
         params.append(limit)
+        stream_mode = negotiate_list_stream() if layout == ROUTE_LAYOUT_ROWS else None
+        if stream_mode is not None:
+            cursor = db.execute("\n".join(sql), params)
+            backend = app.json.backend
+
+            def route_batches() -> Iterator[list[bytes]]:
+                for batch in iter_row_batches(cursor):
+                    if projection is None:
+                        yield route_json_fragments(batch, backend)
+                    else:
+                        yield [dumps_bytes(r, backend) for r in project_route_dicts(route_rows_to_dicts(batch), projection)]
+
+            head: dict[str, Any] = {"ok": True}
+            if projection is not None:
+                head["projection"] = projection
+            return stream_list_response(stream_mode, head, "routes", route_batches())
+
         rows = db.execute("\n".join(sql), params).fetchall()
 
-        return jsonify(
-            {
-                "ok": True,
-                "routes": [route_row_to_dict(r) for r in rows],
-            }
+        # 同一 URL 按 Accept 返回不同格式，需声明 Vary 以免中间缓存混用
+        if layout == ROUTE_LAYOUT_ROWS and projection is None:
+            body = splice_json_array({"ok": True}, "routes", route_json_fragments(rows, app.json.backend), app.json.backend)
+            response = Response(body, mimetype="application/json")
+            response.vary.add("Accept")
+            return response
+
+        routes = route_rows_to_dicts(rows)
+        if projection is not None:
+            routes = project_route_dicts(routes, projection)
+        if layout == ROUTE_LAYOUT_BINARY:
+            response = Response(encode_routes_binary(routes, projection), mimetype=ROUTE_MIME_BINARY)
+        elif layout == ROUTE_LAYOUT_COLUMNAR:
+            response = Response(
+                app.json.dumps_bytes(dict(encode_routes_columnar(routes, projection), ok=True)),
+                mimetype=ROUTE_MIME_COLUMNAR,
+            )
+        else:
+            response = jsonify({"ok": True, "projection": projection, "routes": routes})
+        response.vary.add("Accept")
+        return response
+
+    @app.get("/api/routes/flows")
+    def route_flows() -> Any:
+        user = session_user()
+        if user is None:
+            return jsonify({"ok": False, "message": "未登录"}), 401
+
+        db = get_db()
+        z = clamp_int(request.args.get("z", "4"), 0, 22, 4)
+        category = request.args.get("category", "").strip()
+        limit = clamp_int(request.args.get("limit", "500"), 1, 5000, 500)
+        try:
+            bbox = parse_bbox(request.args.get("bbox"))
+            projection = parse_projection_options(request.args)
+        except ValueError as exc:
+            return jsonify({"ok": False, "message": str(exc)}), 400
+
+        etag = data_version_etag(db, (DATA_VERSION_ROUTES,), etag_viewer(), request.query_string.decode("latin-1"))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        cell = flow_cell_size(z)
+        cell_range = flow_cell_range(bbox, cell)
+        version = (get_data_epoch(db), get_data_version(db, DATA_VERSION_ROUTES))
+        scope_key = (
+            "self" if not is_admin_user(user) else ("all" if is_super_admin_user(user) else "students"),
+            int(user["id"]) if not is_admin_user(user) else 0,
         )
+        cache_key = (z, cell_range, category, scope_key, version)
+        flows = flow_cache_get(cache_key)
+        if flows is None:
+            flows = aggregate_route_flows(db, user, z, cell_range, category)
+            flow_cache_put(cache_key, flows)
+
+        total_routes = sum(f["count"] for f in flows)
+        max_count = flows[0]["count"] if flows else 0
+        items = [dict(f, weight=round(f["count"] / max_count, 4)) for f in flows[:limit]]
+        if projection is not None:
+            items = project_flow_dicts(items, projection)
+        body: dict[str, Any] = {
+            "ok": True,
+            "z": z,
+            "cell_size": cell,
+            "data_version": version,
+            "total_routes": total_routes,
+            "flow_count": len(flows),
+            "flows": items,
+        }
+        if projection is not None:
+            body["projection"] = projection
+        return with_etag(jsonify(body), etag)
 
     @app.post("/api/routes")
     def add_route() -> Any:
@@ -999,7 +1378,8 @@ def create_app() -> Flask:
         db = get_db()
 
         try:
-            route_id = insert_route(db, payload)
+            on_duplicate = normalize_duplicate_mode(payload.get("on_duplicate"))
+            route_id, created = insert_route(db, payload, on_duplicate)
             db.commit()
         except ValueError as exc:
             return jsonify({"ok": False, "message": str(exc)}), 400
@@ -1013,7 +1393,7 @@ def create_app() -> Flask:
             """,
             (route_id,),
         ).fetchone()
-        return jsonify({"ok": True, "route": route_row_to_dict(row)})
+        return jsonify({"ok": True, "duplicate": not created, "route": route_row_to_dict(row)})
 
     @app.delete("/api/routes/<int:route_id>")
     def delete_route(route_id: int) -> Any:
@@ -1045,6 +1425,15 @@ def create_app() -> Flask:
             return jsonify({"ok": False, "message": "未找到该路线"}), 404
         return jsonify({"ok": True})
 
+    def resolve_upload_format(filename: str | None, requested: str | None) -> tuple[str, Any | None]:
+        try:
+            fmt = resolve_import_format(filename, requested)
+        except ValueError as exc:
+            return "", (jsonify({"ok": False, "message": str(exc)}), 400)
+        if fmt in COLUMNAR_IMPORT_FORMATS and not columnar_import_available():
+            return "", (jsonify({"ok": False, "message": "服务器未安装 pyarrow，无法导入 Parquet/Arrow 文件"}), 400)
+        return fmt, None
+
     @app.post("/api/routes/batch")
     def batch_routes() -> Any:
         _, err = require_admin()
@@ -1053,38 +1442,150 @@ def create_app() -> Flask:
 
         upload = request.files.get("file")
         if upload is None:
-            return jsonify({"ok": False, "message": "缺少 CSV 文件"}), 400
-
-        raw = upload.read()
-        if not raw:
-            return jsonify({"ok": False, "message": "CSV 文件为空"}), 400
+            return jsonify({"ok": False, "message": "缺少导入文件"}), 400
+        fmt, err = resolve_upload_format(upload.filename, request.form.get("format"))
+        if err:
+            return err
 
         db = get_db()
-        text = raw.decode("utf-8-sig", errors="ignore")
-        reader = csv.DictReader(io.StringIO(text))
+        try:
+            on_duplicate = normalize_duplicate_mode(request.form.get("on_duplicate"))
+            parsed_rows = iter_parsed_upload_routes(upload.stream, fmt, get_import_processes())
+            first = next(parsed_rows, None)
+            if first is None:
+                return jsonify({"ok": False, "message": f"{IMPORT_FORMAT_LABELS[fmt]} 文件为空"}), 400
+
+            result = import_route_rows(
+                db,
+                itertools.chain([first], parsed_rows),
+                resolve_route_actor(db),
+                on_duplicate=on_duplicate,
+            )
+        except ValueError as exc:
+            return jsonify({"ok": False, "message": str(exc)}), 400
+        failed = result["failed"]
+        if failed is not None:
+            # 出错位置之前的行已写入提交，连同计数一并返回，修正文件后重新导入时已导入的行按重复处理
+            message = (
+                f"第 {failed['line']} 行解析失败：{failed['error']}；"
+                f"此前的行已导入 {result['inserted']} 条，重复 {result['duplicates']} 条"
+            )
+            return jsonify({"ok": False, "message": message, "format": fmt, **result}), 400
+        return jsonify({"ok": True, "format": fmt, **result})
 
-        inserted = 0
-        errors: list[dict[str, Any]] = []
+    @app.post("/api/import-jobs")
+    def create_import_job() -> Any:
+        admin_user, err = require_admin()
+        if err:
+            return err
 
-        for idx, row in enumerate(reader, start=2):
-            if not any((v or "").strip() for v in row.values()):
-                continue
-            normalized = {k.strip(): (v or "").strip() for k, v in row.items() if k}
-            try:
-                insert_route(db, normalized)
-                inserted += 1
-            except ValueError as exc:
-                errors.append({"line": idx, "error": str(exc)})
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"ok": False, "message": "缺少导入文件"}), 400
+        fmt, err = resolve_upload_format(upload.filename, request.form.get("format"))
+        if err:
+            return err
+        try:
+            on_duplicate = normalize_duplicate_mode(request.form.get("on_duplicate"))
+        except ValueError as exc:
+            return jsonify({"ok": False, "message": str(exc)}), 400
+
+        job_id = uuid.uuid4().hex
+        file_path = import_job_upload_path(job_id)
+        os.makedirs(IMPORT_JOB_DIR, exist_ok=True)
+        upload.save(file_path)
+        bytes_total = os.path.getsize(file_path)
+        if bytes_total == 0:
+            os.remove(file_path)
+            return jsonify({"ok": False, "message": f"{IMPORT_FORMAT_LABELS[fmt]} 文件为空"}), 400
 
+        db = get_db()
+        actor = resolve_route_actor(db)
+        now = utc_now_text()
+        db.execute(
+            """
+            INSERT INTO import_jobs(
+                id, status, format, on_duplicate, filename, file_path, created_by, actor_user_type,
+                bytes_total, created_at, updated_at
+            ) VALUES(?,?,?,?,?,?,?,?,?,?,?)
+            """,
+            (
+                job_id,
+                IMPORT_JOB_STATUS_QUEUED,
+                fmt,
+                on_duplicate,
+                (upload.filename or "")[:255],
+                file_path,
+                int(actor["id"]) if actor else 0,
+                actor["user_type"] if actor else user_type_from_user(admin_user),
+                bytes_total,
+                now,
+                now,
+            ),
+        )
         db.commit()
+        submit_import_job(job_id)
+        row = db.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        return jsonify({"ok": True, "job": import_job_row_to_dict(row)}), 202
 
-        return jsonify(
-            {
-                "ok": True,
-                "inserted": inserted,
-                "errors": errors,
-            }
+    def load_visible_import_job(job_id: str) -> tuple[sqlite3.Row | None, Any | None]:
+        admin_user, err = require_admin()
+        if err:
+            return None, err
+        db = get_db()
+        row = db.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None, (jsonify({"ok": False, "message": "导入任务不存在"}), 404)
+        if not is_super_admin_user(admin_user) and int(row["created_by"]) != int(admin_user["id"]):
+            return None, (jsonify({"ok": False, "message": "无权限查看该导入任务"}), 403)
+        return row, None
+
+    @app.get("/api/import-jobs")
+    def list_import_jobs() -> Any:
+        admin_user, err = require_admin()
+        if err:
+            return err
+        db = get_db()
+        limit = clamp_int(request.args.get("limit", "20"), 1, 200, 20)
+        if is_super_admin_user(admin_user):
+            rows = db.execute(
+                "SELECT * FROM import_jobs ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        else:
+            rows = db.execute(
+                "SELECT * FROM import_jobs WHERE created_by = ? ORDER BY created_at DESC LIMIT ?",
+                (int(admin_user["id"]), limit),
+            ).fetchall()
+        return jsonify({"ok": True, "jobs": [import_job_row_to_dict(r) for r in rows]})
+
+    @app.get("/api/import-jobs/<job_id>")
+    def get_import_job(job_id: str) -> Any:
+        row, err = load_visible_import_job(job_id)
+        if err:
+            return err
+        return jsonify({"ok": True, "job": import_job_row_to_dict(row)})
+
+    @app.post("/api/import-jobs/<job_id>/cancel")
+    def cancel_import_job(job_id: str) -> Any:
+        row, err = load_visible_import_job(job_id)
+        if err:
+            return err
+        if row["status"] not in IMPORT_JOB_ACTIVE_STATUSES:
+            return jsonify({"ok": False, "message": "任务已结束，无法取消"}), 400
+
+        db = get_db()
+        db.execute(
+            "UPDATE import_jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?",
+            (utc_now_text(), job_id),
         )
+        db.commit()
+        if row["status"] == IMPORT_JOB_STATUS_QUEUED:
+            # 尚未开始的任务直接结束；若工作线程已抢先认领（状态已变为 running），条件更新不生效，
+            # 由工作线程在下一批写入后停止
+            finish_import_job(db, job_id, IMPORT_JOB_STATUS_CANCELLED, "任务已取消", (IMPORT_JOB_STATUS_QUEUED,))
+        row = db.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        return jsonify({"ok": True, "job": import_job_row_to_dict(row)})
 
     @app.get("/api/routes/template")
     def download_template() -> Any:
@@ -1101,48 +1602,146 @@ def create_app() -> Flask:
 
     @app.get("/api/nodes")
     def list_nodes() -> Any:
+        # 响应体按节点数据版本缓存，节点未变化时直接返回已序列化的内容
         db = get_db()
-        rows = db.execute(
-            "SELECT code, name, region, lat, lon FROM nodes ORDER BY code ASC"
-        ).fetchall()
-        return jsonify({"ok": True, "nodes": [node_row_to_dict(r) for r in rows]})
+        etag = data_version_etag(db, (DATA_VERSION_NODES,), etag_viewer())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        registry = get_node_registry(db)
+        body = registry["body"]
+        if body is None:
+            nodes = node_rows_to_dicts(registry["nodes"].values())
+            body = app.json.dumps_bytes({"ok": True, "nodes": nodes})
+            registry["body"] = body
+        return with_etag(Response(body, mimetype="application/json"), etag)
 
     @app.post("/api/nodes")
     def create_node() -> Any:
         payload = request.get_json(silent=True) or {}
-        code = (payload.get("code") or "").strip().upper()
-        name = (payload.get("name") or "").strip()
-        region = (payload.get("region") or "").strip() or "未分组"
-        try:
-            coord_system = normalize_coord_system(payload.get("coord_system"), COORD_SYSTEM_WGS84)
-        except ValueError as exc:
-            return jsonify({"ok": False, "message": str(exc)}), 400
         try:
-            input_lat = to_float(payload.get("lat"), "lat")
-            input_lon = to_float(payload.get("lon"), "lon")
+            values = build_node_values(payload)
         except ValueError as exc:
             return jsonify({"ok": False, "message": str(exc)}), 400
 
-        if not code:
-            return jsonify({"ok": False, "message": "code 不能为空"}), 400
-        if not name:
-            return jsonify({"ok": False, "message": "name 不能为空"}), 400
-        validate_lat_lon(input_lat, input_lon)
-        lat, lon = to_wgs84(input_lat, input_lon, coord_system)
-        validate_lat_lon(lat, lon)
-
         db = get_db()
         try:
-            db.execute(
-                "INSERT INTO nodes(code, name, region, lat, lon) VALUES(?,?,?,?,?)",
-                (code, name, region, lat, lon),
-            )
+            db.execute(NODE_INSERT_SQL, values)
             db.commit()
         except sqlite3.IntegrityError:
             return jsonify({"ok": False, "message": "该节点代码已存在"}), 400
 
         return jsonify({"ok": True})
 
+    @app.post("/api/nodes/import")
+    def import_nodes() -> Any:
+        _, err = require_admin()
+        if err:
+            return err
+
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"ok": False, "message": "缺少导入文件"}), 400
+        try:
+            fmt = resolve_import_format(upload.filename, request.form.get("format"))
+            if fmt not in NODE_IMPORT_FORMATS:
+                raise ValueError("节点导入仅支持 CSV / GeoJSON / NDJSON")
+            on_conflict = normalize_node_conflict_mode(request.form.get("on_conflict"))
+        except ValueError as exc:
+            return jsonify({"ok": False, "message": str(exc)}), 400
+
+        db = get_db()
+        try:
+            rows = iter_node_upload_rows(upload.stream, fmt)
+            first = next(rows, None)
+            if first is None:
+                return jsonify({"ok": False, "message": f"{IMPORT_FORMAT_LABELS[fmt]} 文件为空"}), 400
+            result = import_node_rows(db, itertools.chain([first], rows), on_conflict)
+        except ValueError as exc:
+            return jsonify({"ok": False, "message": str(exc)}), 400
+        failed = result["failed"]
+        if failed is not None:
+            # 出错位置之前的行已写入提交，连同计数一并返回，修正文件后重新导入时已导入的行按重复处理
+            message = (
+                f"第 {failed['line']} 行解析失败：{failed['error']}；"
+                f"此前的行已导入 {result['inserted']} 条，重复 {result['duplicates']} 条"
+            )
+            return jsonify({"ok": False, "message": message, "format": fmt, **result}), 400
+        return jsonify({"ok": True, "format": fmt, **result})
+
+    def node_batch_items(key: str) -> tuple[list[Any], Any | None]:
+        payload = request.get_json(silent=True) or {}
+        items = payload.get(key)
+        if not isinstance(items, list) or not items:
+            return [], (jsonify({"ok": False, "message": f"{key} 不能为空"}), 400)
+        if len(items) > NODE_BATCH_MAX_ITEMS:
+            return [], (jsonify({"ok": False, "message": f"单次最多处理 {NODE_BATCH_MAX_ITEMS} 个节点"}), 400)
+        return items, None
+
+    @app.post("/api/nodes/batch-update")
+    def batch_update_nodes() -> Any:
+        # 全部校验通过后在同一事务中更新；任一项失败则整体不生效
+        _, err = require_admin()
+        if err:
+            return err
+        items, err = node_batch_items("nodes")
+        if err:
+            return err
+
+        db = get_db()
+        registry = get_node_registry(db)["nodes"]
+        updates: list[tuple[Any, ...]] = []
+        seen: set[str] = set()
+        for idx, item in enumerate(items, start=1):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("节点格式无效")
+                code = str(item.get("code") or "").strip().upper()
+                current = registry.get(code)
+                if current is None:
+                    raise ValueError(f"节点代码 {code or '（空）'} 不存在")
+                if code in seen:
+                    raise ValueError(f"节点代码 {code} 重复")
+                seen.add(code)
+                merged = {"code": current["code"], "name": current["name"], "region": current["region"]}
+                merged.update({k: item[k] for k in ("name", "region") if k in item})
+                if "lat" in item or "lon" in item:
+                    merged.update({"lat": item.get("lat"), "lon": item.get("lon"), "coord_system": item.get("coord_system")})
+                else:
+                    merged.update({"lat": current["lat"], "lon": current["lon"]})
+                values = build_node_values(merged)
+            except ValueError as exc:
+                return jsonify({"ok": False, "message": f"第 {idx} 项：{exc}"}), 400
+            updates.append((*values[1:], values[0]))
+
+        db.executemany("UPDATE nodes SET name = ?, region = ?, lat = ?, lon = ? WHERE code = ?", updates)
+        db.commit()
+        return jsonify({"ok": True, "updated": len(updates)})
+
+    @app.post("/api/nodes/batch-delete")
+    def batch_delete_nodes() -> Any:
+        # 删除后引用这些节点的路线终点区域由触发器改为“自定义”；任一代码不存在则整体不生效
+        _, err = require_admin()
+        if err:
+            return err
+        items, err = node_batch_items("codes")
+        if err:
+            return err
+
+        db = get_db()
+        registry = get_node_registry(db)["nodes"]
+        codes: list[str] = []
+        for idx, item in enumerate(items, start=1):
+            current = registry.get(str(item or "").strip().upper())
+            if current is None:
+                return jsonify({"ok": False, "message": f"第 {idx} 项：节点代码 {item} 不存在"}), 400
+            if current["code"] not in codes:
+                codes.append(current["code"])
+
+        db.executemany("DELETE FROM nodes WHERE code = ?", [(code,) for code in codes])
+        db.commit()
+        return jsonify({"ok": True, "deleted": len(codes)})
+
     @app.get("/api/users")
     def list_users() -> Any:
         admin_user, err = require_admin()
@@ -1192,6 +1791,10 @@ def create_app() -> Flask:
             params.append(USER_TYPE_NORMAL_USER)
 
         sql.append("GROUP BY u.id ORDER BY route_count DESC, datetime(COALESCE(u.last_active_at, u.created_at)) DESC")
+        stream_mode = negotiate_list_stream()
+        if stream_mode is not None:
+            cursor = db.execute("\n".join(sql), params)
+            return stream_list_response(stream_mode, {"ok": True}, "users", user_json_batches(cursor, app.json.backend))
         rows = db.execute("\n".join(sql), params).fetchall()
         return jsonify({"ok": True, "users": [user_row_to_dict(r) for r in rows]})
 
@@ -1246,9 +1849,9 @@ def create_app() -> Flask:
             {
                 "ok": True,
                 "user": user_row_to_dict(user),
-                "routes": [route_row_to_dict(r) for r in routes],
+                "routes": route_rows_to_dicts(routes),
                 "categories": [dict(r) for r in categories],
-                "login_history": fetch_login_ip_history(db, int(user["id"]), limit=10),
+                "login_history": fetch_login_ip_history(db, int(user["id"])),
             }
         )
 
@@ -1263,11 +1866,15 @@ def create_app() -> Flask:
             return jsonify({"ok": False, "message": "账户不存在"}), 404
         if not can_manage_target_user(admin_user, target["user_type"]):
             return jsonify({"ok": False, "message": "无权限查看该账户"}), 403
-        return jsonify({"ok": True, "history": fetch_login_ip_history(db, int(account_id), limit=10)})
+        return jsonify({"ok": True, "history": fetch_login_ip_history(db, int(account_id))})
 
     @app.get("/api/alerts")
     def list_alerts() -> Any:
         db = get_db()
+        etag = data_version_etag(db, (DATA_VERSION_ALERTS,), etag_viewer())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
         rows = db.execute(
             """
             SELECT id, level, message, active, created_at
@@ -1276,50 +1883,123 @@ def create_app() -> Flask:
             LIMIT 20
             """
         ).fetchall()
-        return jsonify({"ok": True, "alerts": [dict(r) for r in rows]})
+        return with_etag(jsonify({"ok": True, "alerts": [dict(r) for r in rows]}), etag)
+
+    @app.get("/api/sync")
+    def sync_changes() -> Any:
+        # 增量同步：不带 since 时只返回当前序号；带 since 时返回其后变更的路线与账户（删除以墓碑 id 给出），
+        # full_resync 为 true 时客户端应全量重新加载后以新的 seq 继续
+        user = session_user()
+        if user is None:
+            return jsonify({"ok": False, "message": "未登录"}), 401
+
+        db = get_db()
+        seq = get_change_seq(db)
+        raw_since = request.args.get("since", "").strip()
+        if not raw_since:
+            return jsonify({"ok": True, "seq": seq, "full_resync": True})
+        try:
+            since = int(raw_since)
+        except ValueError:
+            return jsonify({"ok": False, "message": "since 非法"}), 400
+
+        maybe_compact_change_log(db)
+        entries = fetch_change_entries(db, since, seq)
+        if entries is None:
+            return jsonify({"ok": True, "seq": seq, "full_resync": True})
+
+        changed: dict[tuple[str, str], list[int]] = {}
+        route_owner: dict[int, int] = {}
+        for e in entries:
+            changed.setdefault((e["entity"], e["op"]), []).append(int(e["entity_id"]))
+            if e["entity"] == CHANGE_ENTITY_ROUTE:
+                route_owner[int(e["entity_id"])] = int(e["owner_id"] or 0)
+
+        # 路线：按当前账户的可见范围取回新增/修改的行；已不存在的行与删除墓碑一并作为 deleted 返回
+        route_ids = changed.get((CHANGE_ENTITY_ROUTE, CHANGE_OP_UPSERT), [])
+        scope_clause, scope_params = route_scope_clause(user)
+        route_rows = fetch_rows_by_ids(
+            db,
+            f"""
+            SELECT r.*, u.name AS user_name
+            FROM od_routes r
+            LEFT JOIN users u ON u.id = r.user_id
+            WHERE r.id IN ({{ids}}) {scope_clause}
+            """,
+            route_ids,
+            scope_params,
+        )
+        existing_routes = {int(r["id"]) for r in fetch_rows_by_ids(db, "SELECT id FROM od_routes WHERE id IN ({ids})", route_ids)}
+        deleted_routes = changed.get((CHANGE_ENTITY_ROUTE, CHANGE_OP_DELETE), []) + [
+            rid for rid in route_ids if rid not in existing_routes
+        ]
+        if not is_admin_user(user):
+            deleted_routes = [rid for rid in deleted_routes if route_owner.get(rid) == int(user["id"])]
+
+        body: dict[str, Any] = {
+            "ok": True,
+            "seq": seq,
+            "full_resync": False,
+            "routes": {"upserts": route_rows_to_dicts(route_rows), "deleted": sorted(set(deleted_routes))},
+            "stats_changed": bool(entries),
+        }
+
+        if is_admin_user(user):
+            user_ids = changed.get((CHANGE_ENTITY_USER, CHANGE_OP_UPSERT), [])
+            type_clause, type_params = "", []
+            if not is_super_admin_user(user):
+                type_clause, type_params = "AND u.user_type = ?", [USER_TYPE_NORMAL_USER]
+            user_rows = fetch_rows_by_ids(
+                db,
+                f"""
+                SELECT u.*, COUNT(r.id) AS route_count
+                FROM users u
+                LEFT JOIN od_routes r ON r.user_id = u.id
+                WHERE u.id IN ({{ids}}) {type_clause}
+                GROUP BY u.id
+                """,
+                user_ids,
+                type_params,
+            )
+            existing_users = {int(r["id"]) for r in fetch_rows_by_ids(db, "SELECT id FROM users WHERE id IN ({ids})", user_ids)}
+            deleted_users = changed.get((CHANGE_ENTITY_USER, CHANGE_OP_DELETE), []) + [
+                uid for uid in user_ids if uid not in existing_users
+            ]
+            body["users"] = {"upserts": [user_row_to_dict(r) for r in user_rows], "deleted": sorted(set(deleted_users))}
+
+        return jsonify(body)
 
     @app.get("/api/stats/overview")
     def stats_overview() -> Any:
         db = get_db()
-        route_count = db.execute("SELECT COUNT(*) AS v FROM od_routes").fetchone()["v"]
+        etag = data_version_etag(db, (DATA_VERSION_ROUTES, DATA_VERSION_ALERTS), etag_viewer())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
         active_alerts = (
             db.execute("SELECT COUNT(*) AS v FROM alerts WHERE active = 1").fetchone()["v"]
         )
 
-        peak = db.execute(
-            """
-            SELECT strftime('%H', created_at) AS hour,
-                   COUNT(*) AS total
-            FROM od_routes
-            GROUP BY hour
-            ORDER BY total DESC
-            LIMIT 1
-            """
-        ).fetchone()
+        # 直接读取 24 行小时汇总表，不再扫描 od_routes
+        live_series = fetch_hourly_route_series(db)
+        route_count = sum(live_series)
 
         peak_window = "暂无数据"
-        if peak and peak["hour"] is not None:
-            h = int(peak["hour"])
+        if route_count > 0:
+            h = max(range(24), key=lambda i: live_series[i])
             peak_window = f"{h:02d}:00 - {(h + 1) % 24:02d}:00"
 
-        hourly = {int(r["hour"]): int(r["total"]) for r in db.execute(
-            """
-            SELECT CAST(strftime('%H', created_at) AS INTEGER) AS hour,
-                   COUNT(*) AS total
-            FROM od_routes
-            GROUP BY hour
-            """
-        ).fetchall()}
-        live_series = [hourly.get(i, 0) for i in range(24)]
-
-        return jsonify(
-            {
-                "ok": True,
-                "route_count": int(route_count),
-                "active_alerts": int(active_alerts),
-                "peak_window": peak_window,
-                "live_series": live_series,
-            }
+        return with_etag(
+            jsonify(
+                {
+                    "ok": True,
+                    "route_count": int(route_count),
+                    "active_alerts": int(active_alerts),
+                    "peak_window": peak_window,
+                    "live_series": live_series,
+                }
+            ),
+            etag,
         )
 
     @app.get("/api/admin/region-load")
@@ -1329,15 +2009,17 @@ def create_app() -> Flask:
             return err
 
         db = get_db()
+        etag = data_version_etag(db, (DATA_VERSION_ROUTES,), etag_viewer())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
 
+        # 终点区域在写入时已落库，按索引分组即可，无需再关联 nodes
         rows = db.execute(
             """
-            SELECT
-                COALESCE(n.region, '自定义') AS region,
-                COUNT(r.id) AS total
-            FROM od_routes r
-            LEFT JOIN nodes n ON UPPER(r.destination_code) = UPPER(n.code)
-            GROUP BY COALESCE(n.region, '自定义')
+            SELECT destination_region AS region, COUNT(*) AS total
+            FROM od_routes
+            GROUP BY destination_region
             ORDER BY total DESC
             """
         ).fetchall()
@@ -1353,7 +2035,7 @@ def create_app() -> Flask:
         ]
 
         top = items[0] if items else {"region": "暂无", "total": 0, "ratio": 0}
-        return jsonify({"ok": True, "top": top, "items": items})
+        return with_etag(jsonify({"ok": True, "top": top, "items": items}), etag)
 
     @app.get("/api/admin/hourly")
     def admin_hourly() -> Any:
@@ -1362,17 +2044,13 @@ def create_app() -> Flask:
             return err
 
         db = get_db()
-        rows = db.execute(
-            """
-            SELECT CAST(strftime('%H', created_at) AS INTEGER) AS hour,
-                   COUNT(*) AS total
-            FROM od_routes
-            GROUP BY hour
-            ORDER BY hour ASC
-            """
-        ).fetchall()
-        data = [{"hour": int(r["hour"]), "total": round(float(r["total"]), 2)} for r in rows]
-        return jsonify({"ok": True, "series": data})
+        etag = data_version_etag(db, (DATA_VERSION_ROUTES,), etag_viewer())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        series = fetch_hourly_route_series(db)
+        data = [{"hour": hour, "total": round(float(total), 2)} for hour, total in enumerate(series) if total > 0]
+        return with_etag(jsonify({"ok": True, "series": data}), etag)
 
     @app.get("/api/admin/overview")
     def admin_overview() -> Any:
@@ -1381,43 +2059,60 @@ def create_app() -> Flask:
             return err
 
         db = get_db()
-        total_students = db.execute(
-            "SELECT COUNT(*) AS v FROM users WHERE user_type = 'normal_user'"
-        ).fetchone()["v"]
-        active_students = db.execute(
-            "SELECT COUNT(*) AS v FROM users WHERE user_type = 'normal_user' AND status = 'online'"
-        ).fetchone()["v"]
-        new_students_today = db.execute(
+        # “今日新增”随日期变化，日期计入 ETag
+        etag = data_version_etag(
+            db,
+            (DATA_VERSION_USERS, DATA_VERSION_ROUTES),
+            etag_viewer(),
+            utc_now().strftime("%Y-%m-%d"),
+        )
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        students = db.execute(
             """
-            SELECT COUNT(*) AS v
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(status = 'online'), 0) AS active,
+                   COALESCE(SUM(date(created_at) = date('now')), 0) AS new_today
             FROM users
             WHERE user_type = 'normal_user'
-              AND date(created_at) = date('now')
             """
-        ).fetchone()["v"]
-        total_routes = db.execute("SELECT COUNT(*) AS v FROM od_routes").fetchone()["v"]
+        ).fetchone()
+        total_routes = sum(fetch_hourly_route_series(db))
 
         top_student = db.execute(
             """
-            SELECT u.id, u.name, COUNT(r.id) AS route_count
-            FROM users u
-            LEFT JOIN od_routes r ON r.user_id = u.id
-            WHERE u.user_type = 'normal_user'
-            GROUP BY u.id
-            ORDER BY route_count DESC
+            SELECT u.id, u.name, s.total AS route_count
+            FROM route_stats_user s
+            JOIN users u ON u.id = s.user_id
+            WHERE u.user_type = 'normal_user' AND s.total > 0
+            ORDER BY s.total DESC, s.user_id ASC
             LIMIT 1
             """
         ).fetchone()
+        if top_student is None:
+            top_student = db.execute(
+                """
+                SELECT id, name, 0 AS route_count
+                FROM users
+                WHERE user_type = 'normal_user'
+                ORDER BY id ASC
+                LIMIT 1
+                """
+            ).fetchone()
 
-        return jsonify(
-            {
-                "ok": True,
-                "total_students": int(total_students),
-                "active_students": int(active_students),
-                "new_students_today": int(new_students_today),
-                "total_routes": int(total_routes),
-                "top_student": dict(top_student) if top_student else None,
-            }
+        return with_etag(
+            jsonify(
+                {
+                    "ok": True,
+                    "total_students": int(students["total"]),
+                    "active_students": int(students["active"]),
+                    "new_students_today": int(students["new_today"]),
+                    "total_routes": int(total_routes),
+                    "top_student": dict(top_student) if top_student else None,
+                }
+            ),
+            etag,
         )
 
     @app.get("/api/admin/accounts")
@@ -1469,15 +2164,17 @@ def create_app() -> Flask:
             params.append(status)
 
         sql.append("GROUP BY u.id ORDER BY datetime(COALESCE(u.created_at, u.last_active_at)) DESC, u.id DESC")
+        head = {
+            "ok": True,
+            "viewer_role": user_type_from_user(admin_user),
+            "can_manage_privileged": bool(is_super_admin_user(admin_user)),
+        }
+        stream_mode = negotiate_list_stream()
+        if stream_mode is not None:
+            cursor = db.execute("\n".join(sql), params)
+            return stream_list_response(stream_mode, head, "accounts", user_json_batches(cursor, app.json.backend))
         rows = db.execute("\n".join(sql), params).fetchall()
-        return jsonify(
-            {
-                "ok": True,
-                "accounts": [user_row_to_dict(r) for r in rows],
-                "viewer_role": user_type_from_user(admin_user),
-                "can_manage_privileged": bool(is_super_admin_user(admin_user)),
-            }
-        )
+        return jsonify(dict(head, accounts=[user_row_to_dict(r) for r in rows]))
 
     @app.post("/api/admin/accounts")
     def admin_create_account() -> Any:
@@ -1642,14 +2339,17 @@ def create_app() -> Flask:
         if err:
             return err
 
+        # 路线数量取自 route_stats_user 汇总表，免去对 od_routes 的整表聚合；
+        # 游标按批读取并逐批写出 CSV，内存占用不随账户数增长；
+        # 数据库为 WAL 模式（见 init_db），导出期间保持的读游标不阻塞账户与路线的并发写入
         db = get_db()
         sql = [
             """
             SELECT u.id, u.name, u.status, u.user_type, u.username,
-                   COUNT(r.id) AS route_count,
+                   COALESCE(s.total, 0) AS route_count,
                    u.last_active_at
             FROM users u
-            LEFT JOIN od_routes r ON r.user_id = u.id
+            LEFT JOIN route_stats_user s ON s.user_id = u.id
             WHERE 1=1
             """
         ]
@@ -1657,44 +2357,26 @@ def create_app() -> Flask:
         if not is_super_admin_user(admin_user):
             sql.append("AND u.user_type = ?")
             params.append(USER_TYPE_NORMAL_USER)
-        sql.append("GROUP BY u.id")
-        sql.append("ORDER BY route_count DESC")
-        rows = db.execute("\n".join(sql), params).fetchall()
+        sql.append("ORDER BY route_count DESC, u.id ASC")
+        cursor = db.execute("\n".join(sql), params)
 
-        buffer = io.StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(
-            ["ID", "姓名", "用户名", "状态", "角色", "路线数量", "最后活跃时间"]
-        )
-        for r in rows:
-            writer.writerow(
-                [
-                    r["id"],
-                    r["name"],
-                    r["username"] or "",
-                    user_status_label(r["status"]),
-                    user_type_label(r["user_type"]),
-                    r["route_count"],
-                    r["last_active_at"],
-                ]
-            )
-
-        data = buffer.getvalue().encode("utf-8-sig")
-        return send_file(
-            io.BytesIO(data),
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name="webgis_accounts_export.csv",
-        )
+        response = Response(stream_with_context(account_csv_chunks(cursor)), mimetype="text/csv")
+        response.headers["Content-Disposition"] = 'attachment; filename="webgis_accounts_export.csv"'
+        return response
 
     return app
 
 
+def connect_db() -> sqlite3.Connection:
+    db = sqlite3.connect(DB_PATH, timeout=30)
+    db.row_factory = sqlite3.Row
+    return db
+
+
 def get_db() -> sqlite3.Connection:
     db = g.get("db")
     if db is None:
-        db = sqlite3.connect(DB_PATH)
-        db.row_factory = sqlite3.Row
+        db = connect_db()
         g.db = db
     return db
 
@@ -1707,160 +2389,648 @@ def clamp_int(raw: str, min_v: int, max_v: int, default: int) -> int:
     return max(min_v, min(max_v, value))
 
 
-def to_float(value: Any, field: str) -> float:
-    if value is None or str(value).strip() == "":
-        raise ValueError(f"{field} 不能为空")
+def parse_bbox(raw: Any) -> tuple[float, float, float, float] | None:
+    # bbox=minLon,minLat,maxLon,maxLat（WGS84），超出经纬度范围的部分按边界截断
+    text = str(raw or "").strip()
+    if not text:
+        return None
+    parts = [p.strip() for p in text.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox 格式应为 minLon,minLat,maxLon,maxLat")
     try:
-        return float(value)
+        min_lon, min_lat, max_lon, max_lat = (float(p) for p in parts)
     except ValueError as exc:
-        raise ValueError(f"{field} 不是有效数字") from exc
+        raise ValueError("bbox 不是有效数字") from exc
+    if any(math.isnan(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise ValueError("bbox 不是有效数字")
+    min_lon, max_lon = max(-180.0, min_lon), min(180.0, max_lon)
+    min_lat, max_lat = max(-90.0, min_lat), min(90.0, max_lat)
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox 范围无效")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def parse_projection_options(args: Any) -> dict[str, Any] | None:
+    # proj=epsg3857 时返回投影参数：datum 为投影前的经纬度基准（天地图用 wgs84，高德类底图用 gcj02），
+    # precision 为量化精度（米/整数单位）；未指定 proj 时返回 None，保持原有浮点经纬度输出
+    proj = str(args.get("proj") or "").strip().lower().replace(":", "")
+    if not proj:
+        return None
+    if proj not in PROJECTION_ALIASES:
+        raise ValueError("proj 仅支持 epsg3857")
+    datum = str(args.get("datum") or "").strip().lower()
+    if not datum:
+        datum = COORD_SYSTEM_WGS84
+    if datum not in {COORD_SYSTEM_WGS84, COORD_SYSTEM_GCJ02}:
+        raise ValueError("datum 仅支持 wgs84 或 gcj02")
+    raw_precision = args.get("precision")
+    precision = PROJECTION_DEFAULT_PRECISION
+    if raw_precision not in (None, ""):
+        precision = to_optional_float(raw_precision)
+        if precision is None or math.isnan(precision):
+            raise ValueError("precision 不是有效数字")
+        if not PROJECTION_MIN_PRECISION <= precision <= PROJECTION_MAX_PRECISION:
+            raise ValueError(
+                f"precision 范围必须在 {PROJECTION_MIN_PRECISION:g} 到 {PROJECTION_MAX_PRECISION:g} 米"
+            )
+    return {"crs": "EPSG:3857", "datum": datum, "precision": precision}
+
+
+def project_route_dicts(routes: list[dict[str, Any]], projection: dict[str, Any]) -> list[dict[str, Any]]:
+    # 以整数网格坐标 origin_xy / destination_xy（[x, y]，乘 precision 即为米）替换全部浮点坐标字段
+    suffix = "_gcj02" if projection["datum"] == COORD_SYSTEM_GCJ02 else ""
+    for key in ("origin", "destination"):
+        xs, ys = mercator_quantize_batch(
+            [r[f"{key}_lat{suffix}"] for r in routes],
+            [r[f"{key}_lon{suffix}"] for r in routes],
+            projection["precision"],
+        )
+        for r, x, y in zip(routes, xs, ys):
+            r[f"{key}_xy"] = [x, y]
+    for r in routes:
+        for field in ROUTE_COORD_OUTPUT_FIELDS:
+            r.pop(field, None)
+    return routes
+
+
+def project_flow_dicts(flows: list[dict[str, Any]], projection: dict[str, Any]) -> list[dict[str, Any]]:
+    # 端点字典与流向缓存共享，这里整体替换端点而不是原地修改
+    suffix = "_gcj02" if projection["datum"] == COORD_SYSTEM_GCJ02 else ""
+    for key in ("origin", "destination"):
+        xs, ys = mercator_quantize_batch(
+            [f[key][f"lat{suffix}"] for f in flows],
+            [f[key][f"lon{suffix}"] for f in flows],
+            projection["precision"],
+        )
+        for f, x, y in zip(flows, xs, ys):
+            f[key] = {"cell": f[key]["cell"], "xy": [x, y]}
+    return flows
+
+
+def normalize_bbox_mode(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    if not text:
+        return ROUTE_BBOX_MODE_EXTENT
+    if text not in ROUTE_BBOX_MODES:
+        raise ValueError("intersects 仅支持 extent / within / endpoint")
+    return text
+
+
+def route_rtree_available(db: sqlite3.Connection) -> bool:
+    row = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'route_extents'").fetchone()
+    return row is not None
+
+
+def route_bbox_clause(
+    db: sqlite3.Connection,
+    bbox: tuple[float, float, float, float],
+    mode: str = ROUTE_BBOX_MODE_EXTENT,
+) -> tuple[str, list[Any]]:
+    # 生成作用于别名 r 的 AND 过滤条件：
+    # extent 外包框与 bbox 相交；within 外包框完全落在 bbox 内；
+    # endpoint 起点或终点落在 bbox 内（先用外包框粗筛，再精确判断端点）。
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if mode == ROUTE_BBOX_MODE_WITHIN:
+        cond = "min_lon >= ? AND max_lon <= ? AND min_lat >= ? AND max_lat <= ?"
+    else:
+        cond = "max_lon >= ? AND min_lon <= ? AND max_lat >= ? AND min_lat <= ?"
+    cond_params: list[Any] = [min_lon, max_lon, min_lat, max_lat]
+
+    if route_rtree_available(db):
+        clause = f"AND r.id IN (SELECT id FROM route_extents WHERE {cond})"
+    else:
+        # 未编译 R*Tree 模块时退化为逐行比较
+        clause = "AND " + (
+            cond.replace("min_lon", "min(r.origin_lon, r.destination_lon)")
+            .replace("max_lon", "max(r.origin_lon, r.destination_lon)")
+            .replace("min_lat", "min(r.origin_lat, r.destination_lat)")
+            .replace("max_lat", "max(r.origin_lat, r.destination_lat)")
+        )
+    params = list(cond_params)
+
+    if mode == ROUTE_BBOX_MODE_ENDPOINT:
+        clause += """
+            AND (
+                (r.origin_lon BETWEEN ? AND ? AND r.origin_lat BETWEEN ? AND ?)
+                OR (r.destination_lon BETWEEN ? AND ? AND r.destination_lat BETWEEN ? AND ?)
+            )
+        """
+        params.extend([min_lon, max_lon, min_lat, max_lat] * 2)
+    return clause, params
+
+
+def route_scope_clause(user: sqlite3.Row | dict[str, Any]) -> tuple[str, list[Any]]:
+    # 普通账户只看自己的线路；普通管理员只能看学生线路，超级管理员可看全部。
+    # 条件作用于别名 r（od_routes）与 u（users）。
+    if not is_admin_user(user):
+        return "AND r.user_id = ?", [int(user["id"])]
+    if not is_super_admin_user(user):
+        return "AND COALESCE(u.user_type, '') = ?", [USER_TYPE_NORMAL_USER]
+    return "", []
+
+
+def get_data_version(db: sqlite3.Connection, name: str) -> int:
+    row = db.execute("SELECT version FROM data_versions WHERE name = ?", (name,)).fetchone()
+    return int(row["version"]) if row else 0
+
+
+def get_data_epoch(db: sqlite3.Connection) -> str:
+    # 数据库纪元（migrate_data_epoch 写入）：数据版本计数从 0 重新开始时随之更换，
+    # 以版本号为键的 ETag 与进程内缓存都要带上它，重建前后的同一版本号不会被当成同一份数据
+    row = db.execute("SELECT value FROM app_meta WHERE key = ?", (DATA_EPOCH_KEY,)).fetchone()
+    return row["value"] if row else ""
+
+
+def data_version_etag(db: sqlite3.Connection, names: tuple[str, ...], *scope: Any) -> str:
+    # 由数据库纪元、数据版本计数（一次读取）与响应范围（查看者、查询参数等）生成 ETag，无需先算出响应体再哈希
+    placeholders = ",".join("?" for _ in names)
+    versions = {
+        r["name"]: int(r["version"])
+        for r in db.execute(f"SELECT name, version FROM data_versions WHERE name IN ({placeholders})", names)
+    }
+    key = "|".join(
+        [get_data_epoch(db), *(f"{n}={versions.get(n, 0)}" for n in names), *(str(v) for v in scope)]
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+def get_change_seq(db: sqlite3.Connection) -> int:
+    # 变更日志当前序号（AUTOINCREMENT 计数，压缩删除旧记录后也不会回退）
+    row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return int(row["seq"]) if row else 0
+
+
+def get_change_log_floor(db: sqlite3.Connection) -> int:
+    row = db.execute("SELECT value FROM app_meta WHERE key = ?", (CHANGE_LOG_FLOOR_KEY,)).fetchone()
+    return int(row["value"]) if row else 0
+
+
+def compact_change_log(db: sqlite3.Connection, keep: int = CHANGE_LOG_MAX_TOMBSTONES) -> int:
+    # 变更日志每个实体只保留最新一条，增长只来自删除墓碑；超出 keep 条时删除最旧的墓碑，
+    # 并把下限（floor）推进到被删除的最大序号，since 低于下限的客户端需全量重新同步
+    row = db.execute(
+        "SELECT seq FROM change_log WHERE op = ? ORDER BY seq DESC LIMIT 1 OFFSET ?",
+        (CHANGE_OP_DELETE, keep),
+    ).fetchone()
+    if row is None:
+        return 0
+    cutoff = int(row["seq"])
+    removed = db.execute("DELETE FROM change_log WHERE op = ? AND seq <= ?", (CHANGE_OP_DELETE, cutoff)).rowcount
+    db.execute(
+        "INSERT INTO app_meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (CHANGE_LOG_FLOOR_KEY, str(max(cutoff, get_change_log_floor(db)))),
+    )
+    db.commit()
+    return int(removed)
 
 
-def to_optional_float(value: Any) -> float | None:
-    if value is None or str(value).strip() == "":
+def maybe_compact_change_log(db: sqlite3.Connection) -> None:
+    global _change_log_compacted_at
+    now = time.monotonic()
+    if now - _change_log_compacted_at < CHANGE_LOG_COMPACT_INTERVAL_SECONDS:
+        return
+    _change_log_compacted_at = now
+    compact_change_log(db)
+
+
+def fetch_change_entries(db: sqlite3.Connection, since: int, upto: int) -> list[sqlite3.Row] | None:
+    # 返回 (since, upto] 区间内的变更；日志已压缩到 since 之后、since 超前（库已重建）
+    # 或变更条数超过 CHANGE_SYNC_MAX_ENTRIES 时返回 None，由客户端全量重新加载
+    if since < get_change_log_floor(db) or since > upto:
         return None
-    try:
-        return float(value)
-    except ValueError:
+    rows = db.execute(
+        """
+        SELECT seq, entity, entity_id, op, owner_id
+        FROM change_log
+        WHERE seq > ? AND seq <= ?
+        ORDER BY seq
+        LIMIT ?
+        """,
+        (since, upto, CHANGE_SYNC_MAX_ENTRIES + 1),
+    ).fetchall()
+    if len(rows) > CHANGE_SYNC_MAX_ENTRIES:
+        return None
+    return rows
+
+
+def fetch_rows_by_ids(
+    db: sqlite3.Connection,
+    sql: str,
+    ids: list[int],
+    params: list[Any] | None = None,
+) -> list[sqlite3.Row]:
+    # sql 中以 {ids} 占位 IN 列表，按块查询避免超出参数上限
+    rows: list[sqlite3.Row] = []
+    for start in range(0, len(ids), CHANGE_SYNC_FETCH_CHUNK):
+        chunk = ids[start : start + CHANGE_SYNC_FETCH_CHUNK]
+        placeholders = ",".join("?" for _ in chunk)
+        rows.extend(db.execute(sql.format(ids=placeholders), [*chunk, *(params or [])]).fetchall())
+    return rows
+
+
+def flow_cell_size(z: int) -> float:
+    # 网格边长对应当前缩放级别下约 FLOW_CELL_PIXELS 像素（256px 瓦片横跨 360/2^z 度）
+    return 360.0 / (2 ** int(z)) * FLOW_CELL_PIXELS / 256.0
+
+
+def flow_cell_range(
+    bbox: tuple[float, float, float, float] | None,
+    cell: float,
+) -> tuple[int, int, int, int] | None:
+    if bbox is None:
         return None
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return (
+        math.floor((min_lon + 180.0) / cell),
+        math.floor((min_lat + 90.0) / cell),
+        math.floor((max_lon + 180.0) / cell),
+        math.floor((max_lat + 90.0) / cell),
+    )
+
+
+def flow_cache_get(key: tuple[Any, ...]) -> list[dict[str, Any]] | None:
+    with _flow_cache_lock:
+        flows = _flow_cache.get(key)
+        if flows is not None:
+            _flow_cache.move_to_end(key)
+        return flows
+
 
+def flow_cache_put(key: tuple[Any, ...], flows: list[dict[str, Any]]) -> None:
+    with _flow_cache_lock:
+        _flow_cache[key] = flows
+        _flow_cache.move_to_end(key)
+        while len(_flow_cache) > FLOW_CACHE_MAX_ENTRIES:
+            _flow_cache.popitem(last=False)
 
-def normalize_coord_system(value: Any, default: str = COORD_SYSTEM_WGS84) -> str:
+
+def aggregate_route_flows(
+    db: sqlite3.Connection,
+    user: sqlite3.Row | dict[str, Any],
+    z: int,
+    cell_range: tuple[int, int, int, int] | None,
+    category: str = "",
+) -> list[dict[str, Any]]:
+    # 起终点吸附到网格后按“起点格 -> 终点格”聚合，返回按线路数降序的流向列表；
+    # 端点坐标取格内实际点位的均值，便于前端直接绘制。
+    cell = flow_cell_size(z)
+    sql = [
+        """
+        SELECT CAST((r.origin_lon + 180.0) / ? AS INTEGER) AS o_x,
+               CAST((r.origin_lat + 90.0) / ? AS INTEGER) AS o_y,
+               CAST((r.destination_lon + 180.0) / ? AS INTEGER) AS d_x,
+               CAST((r.destination_lat + 90.0) / ? AS INTEGER) AS d_y,
+               r.category AS category,
+               COUNT(*) AS total,
+               SUM(r.origin_lat) AS o_lat, SUM(r.origin_lon) AS o_lon,
+               SUM(r.destination_lat) AS d_lat, SUM(r.destination_lon) AS d_lon
+        FROM od_routes r
+        LEFT JOIN users u ON u.id = r.user_id
+        WHERE 1=1
+        """
+    ]
+    params: list[Any] = [cell, cell, cell, cell]
+    if cell_range is not None:
+        # 按整格边界查询，使同一格范围内的平移共用缓存
+        x0, y0, x1, y1 = cell_range
+        bbox = (x0 * cell - 180.0, y0 * cell - 90.0, (x1 + 1) * cell - 180.0, (y1 + 1) * cell - 90.0)
+        clause, clause_params = route_bbox_clause(db, bbox, ROUTE_BBOX_MODE_EXTENT)
+        sql.append(clause)
+        params.extend(clause_params)
+    if category:
+        sql.append("AND r.category = ?")
+        params.append(category)
+    scope_clause, scope_params = route_scope_clause(user)
+    sql.append(scope_clause)
+    params.extend(scope_params)
+    sql.append("GROUP BY o_x, o_y, d_x, d_y, r.category")
+
+    merged: dict[tuple[int, int, int, int], dict[str, Any]] = {}
+    for r in db.execute("\n".join(sql), params).fetchall():
+        key = (int(r["o_x"]), int(r["o_y"]), int(r["d_x"]), int(r["d_y"]))
+        total = int(r["total"])
+        item = merged.get(key)
+        if item is None:
+            item = {"count": 0, "categories": {}, "sums": [0.0, 0.0, 0.0, 0.0]}
+            merged[key] = item
+        item["count"] += total
+        item["categories"][r["category"]] = item["categories"].get(r["category"], 0) + total
+        for i, field in enumerate(("o_lat", "o_lon", "d_lat", "d_lon")):
+            item["sums"][i] += float(r[field] or 0.0)
+
+    centers = [[v / item["count"] for v in item["sums"]] for item in merged.values()]
+    o_lats_gcj, o_lons_gcj = wgs84_to_gcj02_batch([c[0] for c in centers], [c[1] for c in centers])
+    d_lats_gcj, d_lons_gcj = wgs84_to_gcj02_batch([c[2] for c in centers], [c[3] for c in centers])
+
+    flows: list[dict[str, Any]] = []
+    for i, ((o_x, o_y, d_x, d_y), item) in enumerate(merged.items()):
+        count = item["count"]
+        o_lat, o_lon, d_lat, d_lon = centers[i]
+        o_lat_gcj, o_lon_gcj = o_lats_gcj[i], o_lons_gcj[i]
+        d_lat_gcj, d_lon_gcj = d_lats_gcj[i], d_lons_gcj[i]
+        flows.append(
+            {
+                "origin": {
+                    "cell": [o_x, o_y],
+                    "lat": o_lat,
+                    "lon": o_lon,
+                    "lat_gcj02": o_lat_gcj,
+                    "lon_gcj02": o_lon_gcj,
+                },
+                "destination": {
+                    "cell": [d_x, d_y],
+                    "lat": d_lat,
+                    "lon": d_lon,
+                    "lat_gcj02": d_lat_gcj,
+                    "lon_gcj02": d_lon_gcj,
+                },
+                "count": count,
+                "categories": dict(sorted(item["categories"].items(), key=lambda kv: -kv[1])),
+            }
+        )
+    flows.sort(key=lambda f: (-f["count"], f["origin"]["cell"], f["destination"]["cell"]))
+    return flows
+
+
+def normalize_node_conflict_mode(value: Any) -> str:
     text = str(value or "").strip().lower()
     if not text:
-        return default
-    compact = text.replace("-", "").replace("_", "")
-    if compact in {"wgs84", "wgs"}:
-        return COORD_SYSTEM_WGS84
-    if compact in {"gcj02", "gcj", "mars"} or text in {"火星坐标", "火星坐标系"}:
-        return COORD_SYSTEM_GCJ02
-    raise ValueError("coord_system 仅支持 wgs84 或 gcj02")
-
-
-def out_of_china(lat: float, lon: float) -> bool:
-    return lon < 72.004 or lon > 137.8347 or lat < 0.8293 or lat > 55.8271
-
-
-def _transform_lat(x: float, y: float) -> float:
-    ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
-    ret += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
-    ret += (20.0 * math.sin(y * math.pi) + 40.0 * math.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
-    ret += (160.0 * math.sin(y / 12.0 * math.pi) + 320 * math.sin(y * math.pi / 30.0)) * 2.0 / 3.0
-    return ret
-
-
-def _transform_lon(x: float, y: float) -> float:
-    ret = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
-    ret += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
-    ret += (20.0 * math.sin(x * math.pi) + 40.0 * math.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
-    ret += (150.0 * math.sin(x / 12.0 * math.pi) + 300.0 * math.sin(x / 30.0 * math.pi)) * 2.0 / 3.0
-    return ret
-
-
-def wgs84_to_gcj02(lat: float, lon: float) -> tuple[float, float]:
-    if out_of_china(lat, lon):
-        return float(lat), float(lon)
-    d_lat = _transform_lat(lon - 105.0, lat - 35.0)
-    d_lon = _transform_lon(lon - 105.0, lat - 35.0)
-    rad_lat = lat / 180.0 * math.pi
-    magic = math.sin(rad_lat)
-    magic = 1 - GCJ_EE * magic * magic
-    sqrt_magic = math.sqrt(magic)
-    d_lat = (d_lat * 180.0) / ((GCJ_A * (1 - GCJ_EE)) / (magic * sqrt_magic) * math.pi)
-    d_lon = (d_lon * 180.0) / (GCJ_A / sqrt_magic * math.cos(rad_lat) * math.pi)
-    mg_lat = lat + d_lat
-    mg_lon = lon + d_lon
-    return float(mg_lat), float(mg_lon)
-
-
-def gcj02_to_wgs84(lat: float, lon: float) -> tuple[float, float]:
-    if out_of_china(lat, lon):
-        return float(lat), float(lon)
-    wgs_lat = float(lat)
-    wgs_lon = float(lon)
-    for _ in range(2):
-        tmp_lat, tmp_lon = wgs84_to_gcj02(wgs_lat, wgs_lon)
-        wgs_lat -= tmp_lat - lat
-        wgs_lon -= tmp_lon - lon
-    return float(wgs_lat), float(wgs_lon)
-
-
-def to_wgs84(lat: float, lon: float, coord_system: str) -> tuple[float, float]:
-    if coord_system == COORD_SYSTEM_GCJ02:
-        return gcj02_to_wgs84(lat, lon)
-    return float(lat), float(lon)
-
-
-def validate_lat_lon(lat: float, lon: float) -> None:
-    if lat < -90 or lat > 90:
-        raise ValueError("纬度范围必须在 -90 到 90")
-    if lon < -180 or lon > 180:
-        raise ValueError("经度范围必须在 -180 到 180")
+        return NODE_CONFLICT_SKIP
+    if text not in NODE_CONFLICT_MODES:
+        raise ValueError("on_conflict 仅支持 skip 或 replace")
+    return text
+
+
+def build_node_values(payload: dict[str, Any]) -> tuple[str, str, str, float, float]:
+    # 校验并换算一个节点，返回与 NODE_INSERT_SQL 对应的 (code, name, region, lat, lon)，坐标统一为 WGS84
+    code = str(payload.get("code") or "").strip().upper()
+    name = str(payload.get("name") or "").strip()
+    region = str(payload.get("region") or "").strip() or "未分组"
+    coord_system = normalize_coord_system(payload.get("coord_system"), COORD_SYSTEM_WGS84)
+    input_lat = to_float(payload.get("lat"), "lat")
+    input_lon = to_float(payload.get("lon"), "lon")
+
+    if not code:
+        raise ValueError("code 不能为空")
+    if not name:
+        raise ValueError("name 不能为空")
+    validate_source_coords(input_lat, input_lon, coord_system)
+    lat, lon = to_wgs84(input_lat, input_lon, coord_system)
+    validate_lat_lon(lat, lon)
+    return code, name, region, lat, lon
 
 
-def resolve_endpoint(
+def import_node_rows(
     db: sqlite3.Connection,
-    label: str,
-    code: str | None,
-    name: str | None,
-    lat: float | None,
-    lon: float | None,
-    coord_system: str = COORD_SYSTEM_WGS84,
+    rows: Iterable[tuple[int, dict[str, Any]]],
+    on_conflict: str = NODE_CONFLICT_SKIP,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
 ) -> dict[str, Any]:
-    clean_code = (code or "").strip().upper()
-    clean_name = (name or "").strip()
+    # 批量导入节点：逐行校验，每 chunk_size 行 executemany 并提交一次；
+    # 代码已存在（或与同批前序行重复）时按 on_conflict 跳过或覆盖，路线终点区域由触发器增量同步
+    insert_sql = NODE_INSERT_SQL_BY_CONFLICT_MODE[on_conflict]
+    processed = 0
+    inserted = 0
+    conflicts = 0
+    error_count = 0
+    errors: list[dict[str, Any]] = []
+    pending: list[tuple[Any, ...]] = []
+
+    def flush() -> None:
+        nonlocal inserted, conflicts
+        if pending:
+            codes = {values[0] for values in pending}
+            placeholders = ",".join("?" for _ in codes)
+            existing = db.execute(
+                f"SELECT COUNT(*) AS c FROM nodes WHERE code IN ({placeholders})",
+                tuple(codes),
+            ).fetchone()["c"]
+            db.executemany(insert_sql, pending)
+            new_rows = len(codes) - int(existing or 0)
+            inserted += new_rows
+            conflicts += len(pending) - new_rows
+            pending.clear()
+        db.commit()
 
-    if clean_code:
-        row = db.execute(
-            "SELECT code, name, region, lat, lon FROM nodes WHERE UPPER(code) = ?",
-            (clean_code,),
-        ).fetchone()
+    for line, payload in rows:
+        processed += 1
+        try:
+            if payload.get(ROW_ERROR_KEY):
+                raise ValueError(payload[ROW_ERROR_KEY])
+            pending.append(build_node_values(payload))
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": str(exc)})
+        if processed % chunk_size == 0:
+            flush()
+    flush()
+
+    return {
+        "rows_processed": processed,
+        "inserted": inserted,
+        "skipped": conflicts if on_conflict == NODE_CONFLICT_SKIP else 0,
+        "replaced": conflicts if on_conflict == NODE_CONFLICT_REPLACE else 0,
+        "error_count": error_count,
+        "errors": errors,
+    }
+
+
+def get_node_registry(db: sqlite3.Connection) -> dict[str, Any]:
+    # 进程内节点表：按大写代码索引，nodes 数据版本变化时整体重载（版本由触发器维护，覆盖所有写入方；
+    # 连同数据库纪元比较，整库重建后计数回到相同数值也会重载）。
+    # 先读版本再读数据，并发写入时最多多重载一次，不会把旧数据记成新版本。
+    global _node_registry
+    version = (get_data_epoch(db), get_data_version(db, DATA_VERSION_NODES))
+    registry = _node_registry
+    if registry["version"] == version:
+        return registry
+    with _node_registry_lock:
+        registry = _node_registry
+        if registry["version"] == version:
+            return registry
+        rows = db.execute("SELECT code, name, region, lat, lon FROM nodes ORDER BY code ASC").fetchall()
+        nodes: dict[str, sqlite3.Row] = {}
+        for row in rows:
+            nodes.setdefault(str(row["code"]).upper(), row)
+        registry = {"version": version, "nodes": nodes, "body": None}
+        _node_registry = registry
+    return registry
+
+
+def fetch_node_by_code(db: sqlite3.Connection, code: str) -> sqlite3.Row | None:
+    return get_node_registry(db)["nodes"].get(code.upper())
+
+
+def finish_endpoint(
+    db: sqlite3.Connection,
+    label: str,
+    parsed: dict[str, Any],
+    lookup_node: Callable[[str], sqlite3.Row | None] | None = None,
+) -> dict[str, Any]:
+    # 解析阶段的结果在写入端补全：代码点查节点，手动点归入自定义区域
+    if "error" in parsed:
+        raise ValueError(parsed["error"])
+    code = parsed["code"]
+    if code:
+        row = lookup_node(code) if lookup_node is not None else fetch_node_by_code(db, code)
         if row is None:
-            raise ValueError(f"{label}代码 {clean_code} 不存在")
+            raise ValueError(f"{label}代码 {code} 不存在")
         return {
             "code": row["code"],
-            "name": clean_name or row["name"],
+            "name": parsed["name"] or row["name"],
             "region": row["region"],
             "lat": float(row["lat"]),
             "lon": float(row["lon"]),
             "coord_system": COORD_SYSTEM_WGS84,
         }
+    return {**parsed, "region": CUSTOM_REGION, "coord_system": COORD_SYSTEM_WGS84}
 
-    if lat is None or lon is None:
-        raise ValueError(f"{label}需要输入代码或经纬度")
 
-    validate_lat_lon(lat, lon)
-    normalized_system = normalize_coord_system(coord_system, COORD_SYSTEM_WGS84)
-    wgs_lat, wgs_lon = to_wgs84(float(lat), float(lon), normalized_system)
-    validate_lat_lon(wgs_lat, wgs_lon)
-    return {
-        "code": None,
-        "name": clean_name or f"{label}手动点",
-        "region": "自定义",
-        "lat": float(wgs_lat),
-        "lon": float(wgs_lon),
-        "coord_system": COORD_SYSTEM_WGS84,
-    }
+def resolve_endpoint(
+    db: sqlite3.Connection,
+    label: str,
+    code: str | None,
+    name: str | None,
+    lat: float | None,
+    lon: float | None,
+    coord_system: str = COORD_SYSTEM_WGS84,
+    lookup_node: Callable[[str], sqlite3.Row | None] | None = None,
+) -> dict[str, Any]:
+    return finish_endpoint(db, label, parse_endpoint(label, code, name, lat, lon, coord_system), lookup_node)
+
+
+# finish_route_values 返回的列（末列为内容摘要）；写入时再整批追加 GCJ-02 列
+ROUTE_VALUE_COLUMNS = (
+    "user_id",
+    "origin_code",
+    "origin_name",
+    "origin_lat",
+    "origin_lon",
+    "destination_code",
+    "destination_name",
+    "destination_lat",
+    "destination_lon",
+    "destination_region",
+    "category",
+    "status",
+    "created_at",
+    "content_hash",
+)
+ROUTE_GCJ02_COLUMNS = ("origin_lat_gcj02", "origin_lon_gcj02", "destination_lat_gcj02", "destination_lon_gcj02")
+ROUTE_INSERT_COLUMNS = ROUTE_VALUE_COLUMNS + ROUTE_GCJ02_COLUMNS
+ROUTE_INSERT_SQL = (
+    f"INSERT INTO od_routes({', '.join(ROUTE_INSERT_COLUMNS)}) "
+    f"VALUES({','.join('?' for _ in ROUTE_INSERT_COLUMNS)})"
+)
+# 内容重复时：skip 保留已有路线；upsert 以新数据覆盖名称、代码、区域与状态（坐标、账户、时间即内容本身，不变）
+ROUTE_INSERT_SQL_BY_DUPLICATE_MODE = {
+    ROUTE_DUPLICATE_SKIP: f"{ROUTE_INSERT_SQL} ON CONFLICT(content_hash) DO NOTHING",
+    ROUTE_DUPLICATE_UPSERT: (
+        f"{ROUTE_INSERT_SQL} ON CONFLICT(content_hash) DO UPDATE SET "
+        "origin_code = excluded.origin_code, origin_name = excluded.origin_name, "
+        "destination_code = excluded.destination_code, destination_name = excluded.destination_name, "
+        "destination_region = excluded.destination_region, status = excluded.status"
+    ),
+}
+
+
+def normalize_duplicate_mode(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    if not text:
+        return ROUTE_DUPLICATE_SKIP
+    if text not in ROUTE_DUPLICATE_MODES:
+        raise ValueError("on_duplicate 仅支持 skip 或 upsert")
+    return text
+
+
+def route_content_key(
+    user_id: int,
+    origin_lat: float,
+    origin_lon: float,
+    destination_lat: float,
+    destination_lon: float,
+    category: str,
+) -> str:
+    # 路线内容（不含时间）：坐标按 ROUTE_HASH_PRECISION 位小数取整
+    coords = "|".join(
+        f"{round(float(v), ROUTE_HASH_PRECISION) + 0.0:.{ROUTE_HASH_PRECISION}f}"
+        for v in (origin_lat, origin_lon, destination_lat, destination_lon)
+    )
+    return f"{int(user_id)}|{coords}|{(category or '').strip()}"
+
 
+def route_created_at_text(value: str) -> str:
+    # 写入的创建时间统一为 DATETIME_FMT（无法解析的保持原文）
+    parsed_at = parse_datetime_text(value)
+    return parsed_at.strftime(DATETIME_FMT) if parsed_at else str(value or "").strip()
 
-def insert_route(db: sqlite3.Connection, payload: dict[str, Any]) -> int:
+
+def route_content_hash(content_key: str, created_at: str) -> str:
+    # 内容摘要只取写入的字段：内容键 + 归一化后的创建时间，可由已存的行重新算出
+    text = f"{content_key}|{route_created_at_text(created_at)}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def find_route_in_window(
+    db: sqlite3.Connection,
+    user_id: int,
+    origin_lat: float,
+    destination_lat: float,
+    content_key: str,
+    moment: datetime,
+) -> str | None:
+    # 返回该账户在 moment 前后 ROUTE_DUPLICATE_WINDOW_SECONDS 秒内、已有摘要的同内容路线的创建时间，没有时返回 None。
+    # 按 idx_routes_duplicate_window 定位同账户同起终点纬度的路线，其余字段由内容键比对
+    window = timedelta(seconds=ROUTE_DUPLICATE_WINDOW_SECONDS)
+    rows = db.execute(
+        """
+        SELECT origin_lat, origin_lon, destination_lat, destination_lon, category, created_at
+        FROM od_routes
+        WHERE user_id = ? AND origin_lat = ? AND destination_lat = ?
+          AND created_at BETWEEN ? AND ? AND content_hash IS NOT NULL
+        ORDER BY created_at DESC
+        """,
+        (
+            int(user_id),
+            origin_lat,
+            destination_lat,
+            (moment - window).strftime(DATETIME_FMT),
+            (moment + window).strftime(DATETIME_FMT),
+        ),
+    ).fetchall()
+    for row in rows:
+        key = route_content_key(
+            user_id,
+            row["origin_lat"],
+            row["origin_lon"],
+            row["destination_lat"],
+            row["destination_lon"],
+            row["category"],
+        )
+        if key == content_key:
+            return row["created_at"]
+    return None
+
+
+def resolve_route_actor(db: sqlite3.Connection) -> dict[str, Any] | None:
+    # 当前会话中的录入人（系统后台账号与未登录请求均返回 None）
     session_user_id = session.get("user_id")
-    session_user_type = None
-    if session_user_id:
-        row = db.execute(
-            "SELECT id, user_type FROM users WHERE id = ?",
-            (int(session_user_id),),
-        ).fetchone()
-        if row is not None:
-            session_user_id = int(row["id"])
-            session_user_type = row["user_type"]
-        else:
-            session_user_id = None
+    if not session_user_id:
+        return None
+    row = db.execute(
+        "SELECT id, user_type FROM users WHERE id = ?",
+        (int(session_user_id),),
+    ).fetchone()
+    if row is None:
+        return None
+    return {"id": int(row["id"]), "user_type": normalize_user_type(row["user_type"], "")}
 
-    user_id = payload.get("user_id")
-    if user_id in (None, ""):
-        if session_user_id:
-            user_id = session_user_id
+
+def resolve_route_owner(db: sqlite3.Connection, actor: dict[str, Any] | None, raw_user_id: Any) -> int:
+    user_id = raw_user_id
+    if user_id in (None, "") and actor is not None:
+        user_id = actor["id"]
 
     if user_id in (None, ""):
         raise ValueError("请先登录后再录入路线")
@@ -1870,91 +3040,104 @@ def insert_route(db: sqlite3.Connection, payload: dict[str, Any]) -> int:
     except ValueError as exc:
         raise ValueError("user_id 非法") from exc
 
-    if (
-        session_user_id is not None
-        and normalize_user_type(session_user_type, "") not in ADMIN_USER_TYPES
-        and user_id != session_user_id
-    ):
+    if actor is not None and actor["user_type"] not in ADMIN_USER_TYPES and user_id != actor["id"]:
         raise ValueError("无权为其他用户录入路线")
 
-    if session_user_id is not None and normalize_user_type(session_user_type, "") in ADMIN_USER_TYPES:
-        viewer_role = normalize_user_type(session_user_type, "")
-        if viewer_role != USER_TYPE_SUPER_ADMIN:
-            target_row = db.execute("SELECT user_type FROM users WHERE id = ?", (user_id,)).fetchone()
-            if target_row is None:
-                raise ValueError("user_id 对应用户不存在")
-            if normalize_user_type(target_row["user_type"], "") != USER_TYPE_NORMAL_USER:
-                raise ValueError("无权为该账户录入路线")
+    if actor is not None and actor["user_type"] in ADMIN_USER_TYPES and actor["user_type"] != USER_TYPE_SUPER_ADMIN:
+        target_row = db.execute("SELECT user_type FROM users WHERE id = ?", (user_id,)).fetchone()
+        if target_row is None:
+            raise ValueError("user_id 对应用户不存在")
+        if normalize_user_type(target_row["user_type"], "") != USER_TYPE_NORMAL_USER:
+            raise ValueError("无权为该账户录入路线")
 
     user_exists = db.execute("SELECT id FROM users WHERE id = ?", (user_id,)).fetchone()
     if user_exists is None:
         raise ValueError("user_id 对应用户不存在")
+    return user_id
 
-    global_coord_system = normalize_coord_system(payload.get("coord_system"), COORD_SYSTEM_WGS84)
-    origin_coord_system = normalize_coord_system(payload.get("origin_coord_system"), global_coord_system)
-    destination_coord_system = normalize_coord_system(payload.get("destination_coord_system"), global_coord_system)
-
-    origin = resolve_endpoint(
-        db,
-        "起点",
-        payload.get("origin_code"),
-        payload.get("origin_name"),
-        to_optional_float(payload.get("origin_lat")),
-        to_optional_float(payload.get("origin_lon")),
-        origin_coord_system,
+
+def finish_route_values(
+    db: sqlite3.Connection,
+    parsed: dict[str, Any],
+    user_id: int,
+    lookup_node: Callable[[str], sqlite3.Row | None] | None = None,
+    stamp: datetime | None = None,
+) -> tuple[Any, ...]:
+    # 由 parse_route_payload 的结果生成与 ROUTE_VALUE_COLUMNS 对应的参数元组。
+    # 未提供创建时间时由服务端补 stamp（默认当前时间）；时间窗内已有同内容路线时沿用其创建时间，
+    # 摘要随之相同，按 on_duplicate 作为重复处理
+    if parsed["row_error"]:
+        raise ValueError(parsed["row_error"])
+    if parsed["coord_error"]:
+        raise ValueError(parsed["coord_error"])
+    origin = finish_endpoint(db, "起点", parsed["origin"], lookup_node)
+    destination = finish_endpoint(db, "终点", parsed["destination"], lookup_node)
+    if parsed["created_at_error"]:
+        raise ValueError(parsed["created_at_error"])
+
+    content_key = route_content_key(
+        user_id, origin["lat"], origin["lon"], destination["lat"], destination["lon"], parsed["category"]
     )
-    destination = resolve_endpoint(
-        db,
-        "终点",
-        payload.get("destination_code"),
-        payload.get("destination_name"),
-        to_optional_float(payload.get("destination_lat")),
-        to_optional_float(payload.get("destination_lon")),
-        destination_coord_system,
+    if parsed["created_at"]:
+        created_at = route_created_at_text(parsed["created_at"])
+    else:
+        moment = stamp or utc_now()
+        created_at = find_route_in_window(
+            db, user_id, origin["lat"], destination["lat"], content_key, moment
+        ) or moment.strftime(DATETIME_FMT)
+    return (
+        user_id,
+        origin["code"],
+        origin["name"],
+        origin["lat"],
+        origin["lon"],
+        destination["code"],
+        destination["name"],
+        destination["lat"],
+        destination["lon"],
+        destination["region"],
+        parsed["category"],
+        parsed["status"],
+        created_at,
+        route_content_hash(content_key, created_at),
     )
 
-    category = (payload.get("category") or "货运").strip() or "货运"
-    status = (payload.get("status") or "active").strip() or "active"
-    created_at = (payload.get("created_at") or "").strip()
-    if created_at:
-        try:
-            datetime.fromisoformat(created_at)
-        except ValueError as exc:
-            raise ValueError("created_at 必须是 ISO 格式") from exc
-    else:
-        created_at = utc_now_text()
 
-    cur = db.execute(
-        """
-        INSERT INTO od_routes(
-            user_id,
-            origin_code,
-            origin_name,
-            origin_lat,
-            origin_lon,
-            destination_code,
-            destination_name,
-            destination_lat,
-            destination_lon,
-            category,
-            status,
-            created_at
-        ) VALUES(?,?,?,?,?,?,?,?,?,?,?,?)
-        """,
-        (
-            user_id,
-            origin["code"],
-            origin["name"],
-            origin["lat"],
-            origin["lon"],
-            destination["code"],
-            destination["name"],
-            destination["lat"],
-            destination["lon"],
-            category,
-            status,
-            created_at,
-        ),
+def build_route_values(
+    db: sqlite3.Connection,
+    payload: dict[str, Any],
+    user_id: int,
+    lookup_node: Callable[[str], sqlite3.Row | None] | None = None,
+) -> tuple[Any, ...]:
+    # 校验并换算一条路线，返回与 ROUTE_VALUE_COLUMNS 对应的参数元组
+    return finish_route_values(db, parse_route_payload(payload), user_id, lookup_node)
+
+
+def with_gcj02_columns(values_list: list[tuple[Any, ...]]) -> list[tuple[Any, ...]]:
+    # 为 ROUTE_VALUE_COLUMNS 元组整批追加起终点 GCJ-02 坐标，得到与 ROUTE_INSERT_COLUMNS 对应的参数
+    idx = {name: i for i, name in enumerate(ROUTE_VALUE_COLUMNS)}
+    origin_lats, origin_lons = wgs84_to_gcj02_batch(
+        [v[idx["origin_lat"]] for v in values_list], [v[idx["origin_lon"]] for v in values_list]
+    )
+    destination_lats, destination_lons = wgs84_to_gcj02_batch(
+        [v[idx["destination_lat"]] for v in values_list], [v[idx["destination_lon"]] for v in values_list]
+    )
+    return [
+        (*values, *gcj)
+        for values, gcj in zip(values_list, zip(origin_lats, origin_lons, destination_lats, destination_lons))
+    ]
+
+
+def insert_route(db: sqlite3.Connection, payload: dict[str, Any], on_duplicate: str = ROUTE_DUPLICATE_SKIP) -> tuple[int, bool]:
+    # 返回 (路线 ID, 是否新建)；内容重复时按 on_duplicate 处理并返回已有路线 ID
+    actor = resolve_route_actor(db)
+    user_id = resolve_route_owner(db, actor, payload.get("user_id"))
+    values = build_route_values(db, payload, user_id)
+    content_hash = values[-1]
+    existing = db.execute("SELECT id FROM od_routes WHERE content_hash = ?", (content_hash,)).fetchone()
+    db.execute(ROUTE_INSERT_SQL_BY_DUPLICATE_MODE[on_duplicate], with_gcj02_columns([values])[0])
+    route_id = int(existing["id"]) if existing else int(
+        db.execute("SELECT id FROM od_routes WHERE content_hash = ?", (content_hash,)).fetchone()["id"]
     )
 
     db.execute(
@@ -1966,51 +3149,449 @@ def insert_route(db: sqlite3.Connection, payload: dict[str, Any]) -> int:
         (utc_now_text(), user_id),
     )
 
-    return int(cur.lastrowid)
+    return route_id, existing is None
 
 
-def node_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
+def import_route_rows(
+    db: sqlite3.Connection,
+    parsed_rows: Iterable[tuple[int, dict[str, Any]]],
+    actor: dict[str, Any] | None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_chunk: Callable[[dict[str, Any]], bool] | None = None,
+    on_duplicate: str = ROUTE_DUPLICATE_SKIP,
+) -> dict[str, Any]:
+    # 批量导入：parsed_rows 为解析阶段（iter_parsed_upload_routes）按行序产出的 (行号, 解析结果)，
+    # 写库在当前连接单线程完成；
+    # 录入人权限按 user_id 缓存、节点取自进程内节点表（每批提交后按版本刷新），
+    # 每 chunk_size 行 executemany 并提交一次，最后统一刷新涉及账户的 last_active_at。
+    # 与已有路线或同批前序行内容重复的行按 on_duplicate 跳过或覆盖，计入 duplicates。
+    # on_chunk 在每批写入后、提交前调用（可在同一事务中记录进度），返回 False 表示中止导入。
+    # 解析阶段中途抛出 ValueError（如 GeoJSON 结构损坏）时，此前已解析的行照常写入提交后停止，
+    # 结果的 failed 记录出错位置（最后一个已解析行号之后的一行）与错误信息，未出错时为 None。
+    insert_sql = ROUTE_INSERT_SQL_BY_DUPLICATE_MODE[on_duplicate]
+    # 未带创建时间的行整次导入共用同一补充时间，文件内同内容的行摘要相同
+    stamp = utc_now()
+    owner_cache: dict[str, int | str] = {}
+    nodes: dict[str, sqlite3.Row] = get_node_registry(db)["nodes"]
+
+    def lookup_node(code: str) -> sqlite3.Row | None:
+        return nodes.get(code)
+
+    processed = 0
+    inserted = 0
+    duplicates = 0
+    error_count = 0
+    errors: list[dict[str, Any]] = []
+    touched_users: set[int] = set()
+    pending: list[tuple[Any, ...]] = []
+
+    def flush() -> bool:
+        nonlocal inserted, duplicates, nodes
+        if pending:
+            hashes = {values[-1] for values in pending}
+            placeholders = ",".join("?" for _ in hashes)
+            existing = db.execute(
+                f"SELECT COUNT(*) AS c FROM od_routes WHERE content_hash IN ({placeholders})",
+                tuple(hashes),
+            ).fetchone()["c"]
+            db.executemany(insert_sql, with_gcj02_columns(pending))
+            new_rows = len(hashes) - int(existing or 0)
+            inserted += new_rows
+            duplicates += len(pending) - new_rows
+            pending.clear()
+        keep_going = True
+        if on_chunk is not None:
+            keep_going = on_chunk(
+                {
+                    "rows_processed": processed,
+                    "inserted": inserted,
+                    "duplicates": duplicates,
+                    "error_count": error_count,
+                    "errors": errors,
+                }
+            )
+        db.commit()
+        nodes = get_node_registry(db)["nodes"]
+        return keep_going
+
+    cancelled = False
+    failed: dict[str, Any] | None = None
+    iterator = iter(parsed_rows)
+    last_line = 0
+    while True:
+        try:
+            item = next(iterator, None)
+        except ValueError as exc:
+            failed = {"line": last_line + 1, "error": str(exc)}
+            break
+        if item is None:
+            break
+        line, parsed = item
+        last_line = line
+        processed += 1
+        raw_user_id = parsed["user_id"]
+        try:
+            owner = owner_cache.get(raw_user_id)
+            if owner is None:
+                try:
+                    owner = resolve_route_owner(db, actor, raw_user_id)
+                except ValueError as exc:
+                    owner = str(exc)
+                owner_cache[raw_user_id] = owner
+            if isinstance(owner, str):
+                raise ValueError(owner)
+            pending.append(finish_route_values(db, parsed, owner, lookup_node, stamp))
+            touched_users.add(owner)
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": str(exc)})
+        if processed % chunk_size == 0 and not flush():
+            cancelled = True
+            break
+    if not cancelled:
+        flush()
+
+    if touched_users:
+        now = utc_now_text()
+        db.executemany(
+            "UPDATE users SET last_active_at = ? WHERE id = ?",
+            [(now, uid) for uid in sorted(touched_users)],
+        )
+        db.commit()
+
+    return {
+        "rows_processed": processed,
+        "inserted": inserted,
+        "duplicates": duplicates,
+        "error_count": error_count,
+        "errors": errors,
+        "cancelled": cancelled,
+        "failed": failed,
+    }
+
+
+def import_job_upload_path(job_id: str) -> str:
+    return os.path.join(IMPORT_JOB_DIR, f"{job_id}.upload")
+
+
+def import_job_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
     result = dict(row)
-    lat_wgs = float(result.get("lat") or 0.0)
-    lon_wgs = float(result.get("lon") or 0.0)
-    lat_gcj, lon_gcj = wgs84_to_gcj02(lat_wgs, lon_wgs)
-    result["coord_system"] = COORD_SYSTEM_WGS84
-    result["lat"] = lat_wgs
-    result["lon"] = lon_wgs
-    result["lat_wgs84"] = lat_wgs
-    result["lon_wgs84"] = lon_wgs
-    result["lat_gcj02"] = float(lat_gcj)
-    result["lon_gcj02"] = float(lon_gcj)
+    result.pop("file_path", None)
+    result.pop("actor_user_type", None)
+    result["cancel_requested"] = bool(int(result.get("cancel_requested") or 0))
+    try:
+        result["errors"] = json.loads(result.get("errors") or "[]")
+    except ValueError:
+        result["errors"] = []
+
+    # 速率按已运行时长估算；剩余时间按已读取字节占比推算（流式读取时总行数未知）
+    rows_per_second = 0.0
+    eta_seconds = None
+    started_at = parse_datetime_text(result.get("started_at"))
+    if started_at is not None:
+        finished_at = parse_datetime_text(result.get("finished_at")) or utc_now()
+        elapsed = max(1.0, (finished_at - started_at).total_seconds())
+        processed = int(result.get("rows_processed") or 0) - int(result.get("rows_resumed") or 0)
+        rows_per_second = max(0, processed) / elapsed
+        bytes_total = int(result.get("bytes_total") or 0)
+        bytes_processed = int(result.get("bytes_processed") or 0)
+        if result.get("status") == IMPORT_JOB_STATUS_RUNNING and 0 < bytes_processed <= bytes_total:
+            eta_seconds = round(elapsed * (bytes_total - bytes_processed) / bytes_processed, 1)
+    if result.get("status") == IMPORT_JOB_STATUS_COMPLETED:
+        eta_seconds = 0.0
+    result["rows_per_second"] = round(rows_per_second, 1)
+    result["eta_seconds"] = eta_seconds
     return result
 
 
+def import_job_actor(row: sqlite3.Row) -> dict[str, Any] | None:
+    created_by = int(row["created_by"] or 0)
+    if created_by <= 0:
+        return None
+    return {"id": created_by, "user_type": normalize_user_type(row["actor_user_type"], "")}
+
+
+def run_import_job(job_id: str) -> None:
+    # 后台线程执行导入：每批写入与进度更新在同一事务中提交，
+    # 因此重启后可按 rows_processed 跳过已提交的行继续导入。
+    db = connect_db()
+    try:
+        job = db.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None or job["status"] not in IMPORT_JOB_ACTIVE_STATUSES:
+            return
+
+        skip = int(job["rows_processed"] or 0)
+        base_inserted = int(job["inserted"] or 0)
+        base_duplicates = int(job["duplicates"] or 0)
+        base_error_count = int(job["error_count"] or 0)
+        try:
+            base_errors = json.loads(job["errors"] or "[]")
+        except ValueError:
+            base_errors = []
+        # 以条件更新认领任务：读取之后若任务已被取消（排队中取消会直接结束任务并删除上传文件），
+        # 认领失败，不再打开文件
+        now = utc_now_text()
+        claimed = db.execute(
+            """
+            UPDATE import_jobs
+            SET status = ?, started_at = ?, rows_resumed = ?, updated_at = ?
+            WHERE id = ? AND status IN (?, ?) AND cancel_requested = 0
+            """,
+            (IMPORT_JOB_STATUS_RUNNING, now, skip, now, job_id, IMPORT_JOB_STATUS_QUEUED, IMPORT_JOB_STATUS_RUNNING),
+        ).rowcount
+        db.commit()
+        if not claimed:
+            finish_import_job(db, job_id, IMPORT_JOB_STATUS_CANCELLED, "任务已取消")
+            return
+
+        with open(job["file_path"], "rb") as fp:
+            fmt = job["format"] or "csv"
+            parsed_rows = iter_parsed_upload_routes(fp, fmt, get_import_processes(), skip)
+
+            def on_chunk(progress: dict[str, Any]) -> bool:
+                errors = (base_errors + progress["errors"])[:IMPORT_MAX_REPORTED_ERRORS]
+                db.execute(
+                    """
+                    UPDATE import_jobs
+                    SET rows_processed = ?, inserted = ?, duplicates = ?, error_count = ?, errors = ?,
+                        bytes_processed = ?, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (
+                        skip + progress["rows_processed"],
+                        base_inserted + progress["inserted"],
+                        base_duplicates + progress["duplicates"],
+                        base_error_count + progress["error_count"],
+                        json.dumps(errors, ensure_ascii=False),
+                        fp.tell(),
+                        utc_now_text(),
+                        job_id,
+                    ),
+                )
+                flag = db.execute("SELECT cancel_requested FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+                return not (flag and int(flag["cancel_requested"] or 0))
+
+            result = import_route_rows(
+                db,
+                parsed_rows,
+                import_job_actor(job),
+                on_chunk=on_chunk,
+                on_duplicate=normalize_duplicate_mode(job["on_duplicate"]),
+            )
+
+        running = (IMPORT_JOB_STATUS_RUNNING,)
+        failed = result["failed"]
+        if failed is not None:
+            message = f"导入失败：第 {failed['line']} 行：{failed['error']}"
+            finish_import_job(db, job_id, IMPORT_JOB_STATUS_FAILED, message, running)
+        elif result["cancelled"]:
+            finish_import_job(db, job_id, IMPORT_JOB_STATUS_CANCELLED, "任务已取消", running)
+        else:
+            finish_import_job(db, job_id, IMPORT_JOB_STATUS_COMPLETED, "", running)
+    except Exception as exc:
+        db.rollback()
+        finish_import_job(db, job_id, IMPORT_JOB_STATUS_FAILED, f"导入失败：{exc}", (IMPORT_JOB_STATUS_RUNNING,))
+    finally:
+        db.close()
+
+
+def finish_import_job(
+    db: sqlite3.Connection,
+    job_id: str,
+    status: str,
+    message: str,
+    from_statuses: Iterable[str] = IMPORT_JOB_ACTIVE_STATUSES,
+) -> bool:
+    # 只有任务仍处于 from_statuses 之一时才写入最终状态并删除上传文件，
+    # 取消请求与工作线程并发结束同一任务时只有先到的一方生效；返回是否生效
+    now = utc_now_text()
+    statuses = sorted(from_statuses)
+    row = db.execute("SELECT file_path FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+    updated = db.execute(
+        f"""
+        UPDATE import_jobs
+        SET status = ?, message = ?, finished_at = ?, updated_at = ?,
+            bytes_processed = CASE WHEN ? = 'completed' THEN bytes_total ELSE bytes_processed END
+        WHERE id = ? AND status IN ({",".join("?" * len(statuses))})
+        """,
+        (status, message, now, now, status, job_id, *statuses),
+    ).rowcount
+    db.commit()
+    if not updated:
+        return False
+    if row is not None and row["file_path"]:
+        try:
+            os.remove(row["file_path"])
+        except OSError:
+            pass
+    return True
+
+
+def submit_import_job(job_id: str) -> None:
+    global _import_job_executor
+    with _import_job_lock:
+        if _import_job_executor is None:
+            _import_job_executor = ThreadPoolExecutor(
+                max_workers=get_import_job_workers(),
+                thread_name_prefix="webgis-import",
+            )
+        executor = _import_job_executor
+    executor.submit(run_import_job, job_id)
+
+
+def resume_import_jobs() -> None:
+    # 进程启动后首次请求时调用：重新排队未完成的任务（含重启前正在运行的任务）
+    db = connect_db()
+    try:
+        rows = db.execute(
+            "SELECT id FROM import_jobs WHERE status IN (?, ?) ORDER BY created_at ASC",
+            (IMPORT_JOB_STATUS_QUEUED, IMPORT_JOB_STATUS_RUNNING),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return
+    finally:
+        db.close()
+    for r in rows:
+        submit_import_job(r["id"])
+
+
+def node_rows_to_dicts(rows: Iterable[sqlite3.Row]) -> list[dict[str, Any]]:
+    # 整批换算 GCJ-02（wgs84_to_gcj02_batch），逐行结果与 node_row_to_dict 一致
+    results = [dict(row) for row in rows]
+    lats = [float(r.get("lat") or 0.0) for r in results]
+    lons = [float(r.get("lon") or 0.0) for r in results]
+    lats_gcj, lons_gcj = wgs84_to_gcj02_batch(lats, lons)
+    for result, lat_wgs, lon_wgs, lat_gcj, lon_gcj in zip(results, lats, lons, lats_gcj, lons_gcj):
+        result["coord_system"] = COORD_SYSTEM_WGS84
+        result["lat"] = lat_wgs
+        result["lon"] = lon_wgs
+        result["lat_wgs84"] = lat_wgs
+        result["lon_wgs84"] = lon_wgs
+        result["lat_gcj02"] = float(lat_gcj)
+        result["lon_gcj02"] = float(lon_gcj)
+    return results
+
+
+def node_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
+    return node_rows_to_dicts([row])[0]
+
+
+def route_rows_to_dicts(rows: Iterable[sqlite3.Row]) -> list[dict[str, Any]]:
+    # GCJ-02 坐标在写入时已落库，读取时只做投影；缺失（绕过写入接口直接改库的行）时整批补算
+    results = [dict(row) for row in rows]
+    missing = [r for r in results if any(r.get(field) is None for field in ROUTE_GCJ02_COLUMNS)]
+    if missing:
+        for key in ("origin", "destination"):
+            lats = [float(r.get(f"{key}_lat") or 0.0) for r in missing]
+            lons = [float(r.get(f"{key}_lon") or 0.0) for r in missing]
+            lats_gcj, lons_gcj = wgs84_to_gcj02_batch(lats, lons)
+            for r, lat_gcj, lon_gcj in zip(missing, lats_gcj, lons_gcj):
+                r[f"{key}_lat_gcj02"] = lat_gcj
+                r[f"{key}_lon_gcj02"] = lon_gcj
+
+    for result in results:
+        result.pop("content_hash", None)
+        result["coord_system"] = COORD_SYSTEM_WGS84
+        for field in ("origin_lat", "origin_lon", "destination_lat", "destination_lon"):
+            value = float(result.get(field) or 0.0)
+            result[field] = value
+            result[f"{field}_wgs84"] = value
+        for field in ROUTE_GCJ02_COLUMNS:
+            result[field] = float(result[field])
+        result["line_label"] = (
+            f"{result.get('origin_code') or result.get('origin_name')} -> "
+            f"{result.get('destination_code') or result.get('destination_name')}"
+        )
+    return results
+
+
 def route_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
-    result = dict(row)
-    origin_lat_wgs = float(result.get("origin_lat") or 0.0)
-    origin_lon_wgs = float(result.get("origin_lon") or 0.0)
-    destination_lat_wgs = float(result.get("destination_lat") or 0.0)
-    destination_lon_wgs = float(result.get("destination_lon") or 0.0)
-    origin_lat_gcj, origin_lon_gcj = wgs84_to_gcj02(origin_lat_wgs, origin_lon_wgs)
-    destination_lat_gcj, destination_lon_gcj = wgs84_to_gcj02(destination_lat_wgs, destination_lon_wgs)
-
-    result["coord_system"] = COORD_SYSTEM_WGS84
-    result["origin_lat"] = origin_lat_wgs
-    result["origin_lon"] = origin_lon_wgs
-    result["destination_lat"] = destination_lat_wgs
-    result["destination_lon"] = destination_lon_wgs
-    result["origin_lat_wgs84"] = origin_lat_wgs
-    result["origin_lon_wgs84"] = origin_lon_wgs
-    result["destination_lat_wgs84"] = destination_lat_wgs
-    result["destination_lon_wgs84"] = destination_lon_wgs
-    result["origin_lat_gcj02"] = float(origin_lat_gcj)
-    result["origin_lon_gcj02"] = float(origin_lon_gcj)
-    result["destination_lat_gcj02"] = float(destination_lat_gcj)
-    result["destination_lon_gcj02"] = float(destination_lon_gcj)
-    result["line_label"] = (
-        f"{result.get('origin_code') or result.get('origin_name')} -> "
-        f"{result.get('destination_code') or result.get('destination_name')}"
-    )
-    return result
+    return route_rows_to_dicts([row])[0]
+
+
+def iter_row_batches(cursor: sqlite3.Cursor, size: int = STREAM_FETCH_ROWS) -> Iterator[list[sqlite3.Row]]:
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def precompressed_static_variants(static_folder: str | None, filename: str) -> list[tuple[str, str]]:
+    # 返回可用的 (后缀, Content-Encoding)；变体缺失或比源文件旧（源文件改过但未重新构建）时忽略
+    if not static_folder:
+        return []
+    source = safe_join(static_folder, filename)
+    if source is None or not os.path.isfile(source):
+        return []
+    variants: list[tuple[str, str]] = []
+    for suffix, encoding in PRECOMPRESSED_STATIC_VARIANTS:
+        try:
+            if os.path.getmtime(source + suffix) < os.path.getmtime(source):
+                continue
+        except OSError:
+            continue
+        variants.append((suffix, encoding))
+    return variants
+
+
+def precompressed_static_variant(variants: list[tuple[str, str]], accept_encodings: Any) -> tuple[str, str] | None:
+    # 按 Accept-Encoding 的 q 值从可用变体中挑选，q 值相同时按 PRECOMPRESSED_STATIC_VARIANTS 的顺序
+    best: tuple[float, str, str] | None = None
+    for suffix, encoding in variants:
+        quality = accept_encodings.quality(encoding)
+        if quality <= 0 or best is not None and quality <= best[0]:
+            continue
+        best = (quality, suffix, encoding)
+    return None if best is None else (best[1], best[2])
+
+
+def compress_body_cached(data: bytes, encoding: str, level: int) -> bytes:
+    # 动态响应的压缩结果按内容哈希缓存（LRU，按压缩后字节数限额）：轮询接口的响应体多数不变，
+    # 命中时省去一次压缩
+    global _compressed_body_cache_bytes
+    key = (hashlib.sha1(data).digest(), encoding, level)
+    with _compressed_body_cache_lock:
+        cached = _compressed_body_cache.get(key)
+        if cached is not None:
+            _compressed_body_cache.move_to_end(key)
+            return cached
+    compressed = compress_bytes(data, encoding, level)
+    if len(compressed) > COMPRESSED_BODY_CACHE_MAX_ENTRY_BYTES:
+        return compressed
+    with _compressed_body_cache_lock:
+        if key not in _compressed_body_cache:
+            _compressed_body_cache[key] = compressed
+            _compressed_body_cache_bytes += len(compressed)
+        while _compressed_body_cache_bytes > COMPRESSED_BODY_CACHE_MAX_BYTES:
+            _, evicted = _compressed_body_cache.popitem(last=False)
+            _compressed_body_cache_bytes -= len(evicted)
+    return compressed
+
+
+def route_json_fragments(rows: list[sqlite3.Row], backend: str) -> list[bytes]:
+    # 每条路线的 JSON 片段按整行取值缓存：行内容不变即可复用，任何字段变化都会落到新的键上，无需额外失效；
+    # 未命中的行整批转换后逐条序列化
+    keys = [tuple(row) for row in rows]
+    fragments: list[bytes | None] = []
+    with _route_fragment_cache_lock:
+        for key in keys:
+            fragment = _route_fragment_cache.get(key)
+            if fragment is not None:
+                _route_fragment_cache.move_to_end(key)
+            fragments.append(fragment)
+    missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+    if not missing:
+        return fragments
+    encoded = [dumps_bytes(r, backend) for r in route_rows_to_dicts([rows[i] for i in missing])]
+    with _route_fragment_cache_lock:
+        for i, fragment in zip(missing, encoded):
+            fragments[i] = fragment
+            _route_fragment_cache[keys[i]] = fragment
+        while len(_route_fragment_cache) > ROUTE_FRAGMENT_CACHE_MAX_ENTRIES:
+            _route_fragment_cache.popitem(last=False)
+    return fragments
 
 
 def user_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
@@ -2019,6 +3600,7 @@ def user_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
     result.pop("failed_login_count", None)
     result.pop("lock_until", None)
     result.pop("password_updated_at", None)
+    result.pop("login_seq", None)
     status_code = normalize_user_status(result.get("status"))
     result["status_code"] = status_code
     result["status"] = user_status_label(status_code)
@@ -2031,9 +3613,660 @@ def user_row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
     return result
 
 
+def user_json_batches(cursor: sqlite3.Cursor, backend: str) -> Iterator[list[bytes]]:
+    for batch in iter_row_batches(cursor):
+        yield [dumps_bytes(user_row_to_dict(r), backend) for r in batch]
+
+
+def iter_csv_chunks(header: list[str], row_batches: Iterable[list[list[Any]]]) -> Iterator[bytes]:
+    # 表头前写一次 UTF-8 BOM（便于 Excel 识别编码），之后每批行写入同一个缓冲区、取出后清空
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode("utf-8-sig")
+    for batch in row_batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def account_csv_chunks(cursor: sqlite3.Cursor) -> Iterator[bytes]:
+    header = ["ID", "姓名", "用户名", "状态", "角色", "路线数量", "最后活跃时间"]
+    batches = (
+        [
+            [
+                r["id"],
+                r["name"],
+                r["username"] or "",
+                user_status_label(r["status"]),
+                user_type_label(r["user_type"]),
+                r["route_count"],
+                r["last_active_at"],
+            ]
+            for r in batch
+        ]
+        for batch in iter_row_batches(cursor)
+    )
+    return iter_csv_chunks(header, batches)
+
+
+def fetch_hourly_route_series(db: sqlite3.Connection) -> list[int]:
+    series = [0] * 24
+    for r in db.execute("SELECT hour, total FROM route_stats_hourly").fetchall():
+        hour = int(r["hour"])
+        if 0 <= hour < 24:
+            series[hour] = max(0, int(r["total"] or 0))
+    return series
+
+
+def rebuild_route_stats(db: sqlite3.Connection) -> None:
+    # 全量重算汇总表；日常由 od_routes 触发器增量维护，仅在数据修复时调用
+    db.execute("DELETE FROM route_stats_hourly")
+    db.execute(
+        """
+        INSERT INTO route_stats_hourly(hour, total)
+        SELECT CAST(strftime('%H', created_at) AS INTEGER) AS hour, COUNT(*)
+        FROM od_routes
+        WHERE strftime('%H', created_at) IS NOT NULL
+        GROUP BY hour
+        """
+    )
+    db.execute("DELETE FROM route_stats_user")
+    db.execute(
+        """
+        INSERT INTO route_stats_user(user_id, total)
+        SELECT user_id, COUNT(*)
+        FROM od_routes
+        GROUP BY user_id
+        """
+    )
+
+
+def migrate_route_stats(db: sqlite3.Connection) -> None:
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS route_stats_hourly (
+            hour INTEGER PRIMARY KEY CHECK(hour BETWEEN 0 AND 23),
+            total INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS route_stats_user (
+            user_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_route_stats_user_total ON route_stats_user(total DESC, user_id);
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_stats_insert
+        AFTER INSERT ON od_routes
+        BEGIN
+            INSERT INTO route_stats_hourly(hour, total)
+            SELECT CAST(strftime('%H', NEW.created_at) AS INTEGER), 1
+            WHERE strftime('%H', NEW.created_at) IS NOT NULL
+            ON CONFLICT(hour) DO UPDATE SET total = total + 1;
+            INSERT INTO route_stats_user(user_id, total) VALUES(NEW.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET total = total + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_stats_delete
+        AFTER DELETE ON od_routes
+        BEGIN
+            UPDATE route_stats_hourly
+            SET total = total - 1
+            WHERE hour = CAST(strftime('%H', OLD.created_at) AS INTEGER);
+            UPDATE route_stats_user SET total = total - 1 WHERE user_id = OLD.user_id;
+            DELETE FROM route_stats_user WHERE user_id = OLD.user_id AND total <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_stats_update
+        AFTER UPDATE OF user_id, created_at ON od_routes
+        BEGIN
+            UPDATE route_stats_hourly
+            SET total = total - 1
+            WHERE hour = CAST(strftime('%H', OLD.created_at) AS INTEGER);
+            UPDATE route_stats_user SET total = total - 1 WHERE user_id = OLD.user_id;
+            DELETE FROM route_stats_user WHERE user_id = OLD.user_id AND total <= 0;
+            INSERT INTO route_stats_hourly(hour, total)
+            SELECT CAST(strftime('%H', NEW.created_at) AS INTEGER), 1
+            WHERE strftime('%H', NEW.created_at) IS NOT NULL
+            ON CONFLICT(hour) DO UPDATE SET total = total + 1;
+            INSERT INTO route_stats_user(user_id, total) VALUES(NEW.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET total = total + 1;
+        END;
+        """
+    )
+    rebuild_route_stats(db)
+
+
+def add_column_if_missing(db: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    existing = {r["name"] for r in db.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in existing:
+        db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def migrate_route_destination_region(db: sqlite3.Connection) -> None:
+    # 终点代码统一为 nodes 主键写法，并回填终点区域（无对应节点时记为“自定义”）
+    add_column_if_missing(db, "od_routes", "destination_region", f"TEXT NOT NULL DEFAULT '{CUSTOM_REGION}'")
+    db.execute(
+        """
+        UPDATE od_routes
+        SET destination_code = (
+            SELECT n.code FROM nodes n WHERE UPPER(n.code) = UPPER(od_routes.destination_code)
+        )
+        WHERE destination_code IS NOT NULL
+          AND destination_code NOT IN (SELECT code FROM nodes)
+          AND EXISTS (SELECT 1 FROM nodes n WHERE UPPER(n.code) = UPPER(od_routes.destination_code))
+        """
+    )
+    db.execute(
+        """
+        UPDATE od_routes
+        SET destination_region = COALESCE(
+            (SELECT n.region FROM nodes n WHERE n.code = od_routes.destination_code),
+            ?
+        )
+        """,
+        (CUSTOM_REGION,),
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_routes_destination_region ON od_routes(destination_region)")
+
+
+def migrate_route_extents(db: sqlite3.Connection) -> None:
+    # 路线外包框 R*Tree 索引（经纬度为 WGS84），由触发器与 od_routes 同步
+    try:
+        db.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS route_extents USING rtree(
+                id, min_lon, max_lon, min_lat, max_lat
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        print("[WARN] 当前 SQLite 未启用 R*Tree 模块，bbox 查询将退化为逐行比较。")
+        return
+    db.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_routes_extent_insert
+        AFTER INSERT ON od_routes
+        BEGIN
+            INSERT OR REPLACE INTO route_extents(id, min_lon, max_lon, min_lat, max_lat)
+            VALUES(
+                NEW.id,
+                min(NEW.origin_lon, NEW.destination_lon), max(NEW.origin_lon, NEW.destination_lon),
+                min(NEW.origin_lat, NEW.destination_lat), max(NEW.origin_lat, NEW.destination_lat)
+            );
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_extent_delete
+        AFTER DELETE ON od_routes
+        BEGIN
+            DELETE FROM route_extents WHERE id = OLD.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_extent_update
+        AFTER UPDATE OF origin_lat, origin_lon, destination_lat, destination_lon ON od_routes
+        BEGIN
+            INSERT OR REPLACE INTO route_extents(id, min_lon, max_lon, min_lat, max_lat)
+            VALUES(
+                NEW.id,
+                min(NEW.origin_lon, NEW.destination_lon), max(NEW.origin_lon, NEW.destination_lon),
+                min(NEW.origin_lat, NEW.destination_lat), max(NEW.origin_lat, NEW.destination_lat)
+            );
+        END;
+        """
+    )
+    db.execute("DELETE FROM route_extents")
+    db.execute(
+        """
+        INSERT INTO route_extents(id, min_lon, max_lon, min_lat, max_lat)
+        SELECT id,
+               min(origin_lon, destination_lon), max(origin_lon, destination_lon),
+               min(origin_lat, destination_lat), max(origin_lat, destination_lat)
+        FROM od_routes
+        """
+    )
+
+
+def migrate_data_versions(db: sqlite3.Connection) -> None:
+    # 数据版本计数：每次写入 od_routes 时自增，用于缓存失效判断
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+
+        INSERT OR IGNORE INTO data_versions(name, version) VALUES('routes', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_version_insert
+        AFTER INSERT ON od_routes
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'routes';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_version_delete
+        AFTER DELETE ON od_routes
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'routes';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_version_update
+        AFTER UPDATE ON od_routes
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'routes';
+        END;
+        """
+    )
+
+
+def migrate_node_versions(db: sqlite3.Connection) -> None:
+    # 节点数据版本：nodes 任意写入都会自增，进程内节点表据此失效
+    db.executescript(
+        """
+        INSERT OR IGNORE INTO data_versions(name, version) VALUES('nodes', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_nodes_version_insert
+        AFTER INSERT ON nodes
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'nodes';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_nodes_version_delete
+        AFTER DELETE ON nodes
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'nodes';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_nodes_version_update
+        AFTER UPDATE ON nodes
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'nodes';
+        END;
+        """
+    )
+
+
+def migrate_route_content_hash(db: sqlite3.Connection) -> None:
+    # 路线内容摘要：新写入的路线都带摘要并受唯一索引约束；已有路线保持 NULL（唯一索引不约束 NULL），
+    # 由 manage_data.py dedupe-routes 分批补算摘要并清理重复。
+    add_column_if_missing(db, "od_routes", "content_hash", "TEXT")
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_routes_content_hash ON od_routes(content_hash)")
+    add_column_if_missing(db, "import_jobs", "on_duplicate", f"TEXT NOT NULL DEFAULT '{ROUTE_DUPLICATE_SKIP}'")
+    add_column_if_missing(db, "import_jobs", "duplicates", "INTEGER NOT NULL DEFAULT 0")
+
+
+def dedupe_routes_chunk(db: sqlite3.Connection, chunk_size: int = ROUTE_DEDUPE_CHUNK_SIZE) -> dict[str, int]:
+    # 处理一批尚无摘要的路线（按 ID 升序），与新写入采用同一规则：摘要已存在、或时间窗内已有同内容路线时
+    # 删除该行（保留先占用摘要的路线），否则补写摘要并把创建时间归一化为 DATETIME_FMT。
+    # 每批单独提交，可随时中断后重跑。
+    rows = db.execute(
+        """
+        SELECT id, user_id, origin_lat, origin_lon, destination_lat, destination_lon, category, created_at
+        FROM od_routes
+        WHERE content_hash IS NULL
+        ORDER BY id ASC
+        LIMIT ?
+        """,
+        (chunk_size,),
+    ).fetchall()
+    hashed = 0
+    removed = 0
+    for row in rows:
+        content_key = route_content_key(
+            row["user_id"],
+            row["origin_lat"],
+            row["origin_lon"],
+            row["destination_lat"],
+            row["destination_lon"],
+            row["category"],
+        )
+        created_at = route_created_at_text(row["created_at"])
+        content_hash = route_content_hash(content_key, created_at)
+        duplicate = db.execute("SELECT 1 FROM od_routes WHERE content_hash = ?", (content_hash,)).fetchone() is not None
+        moment = parse_datetime_text(created_at)
+        if not duplicate and moment is not None:
+            duplicate = find_route_in_window(
+                db, row["user_id"], row["origin_lat"], row["destination_lat"], content_key, moment
+            ) is not None
+        if duplicate:
+            db.execute("DELETE FROM od_routes WHERE id = ?", (row["id"],))
+            removed += 1
+        else:
+            db.execute(
+                "UPDATE od_routes SET content_hash = ?, created_at = ? WHERE id = ?",
+                (content_hash, created_at, row["id"]),
+            )
+            hashed += 1
+    db.commit()
+    return {"scanned": len(rows), "hashed": hashed, "removed": removed}
+
+
+def migrate_node_route_regions(db: sqlite3.Connection) -> None:
+    # 节点增删改时只同步引用该节点的路线终点区域（按 destination_code 索引），不做全表回写
+    db.executescript(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_routes_destination_code ON od_routes(destination_code);
+
+        CREATE TRIGGER IF NOT EXISTS trg_nodes_region_insert
+        AFTER INSERT ON nodes
+        BEGIN
+            UPDATE od_routes SET destination_region = NEW.region
+            WHERE destination_code = NEW.code AND destination_region <> NEW.region;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_nodes_region_delete
+        AFTER DELETE ON nodes
+        BEGIN
+            UPDATE od_routes SET destination_region = '{CUSTOM_REGION}'
+            WHERE destination_code = OLD.code AND destination_region <> '{CUSTOM_REGION}';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_nodes_region_update
+        AFTER UPDATE OF code, region ON nodes
+        BEGIN
+            UPDATE od_routes SET destination_region = '{CUSTOM_REGION}'
+            WHERE OLD.code <> NEW.code AND destination_code = OLD.code;
+            UPDATE od_routes SET destination_region = NEW.region
+            WHERE destination_code = NEW.code AND destination_region <> NEW.region;
+        END;
+        """
+    )
+
+
+def backfill_route_gcj02(db: sqlite3.Connection, chunk_size: int = ROUTE_DEDUPE_CHUNK_SIZE) -> int:
+    # 分批为缺少 GCJ-02 列的路线补算坐标，返回补算条数
+    total = 0
+    while True:
+        rows = db.execute(
+            """
+            SELECT id, origin_lat, origin_lon, destination_lat, destination_lon
+            FROM od_routes
+            WHERE origin_lat_gcj02 IS NULL OR origin_lon_gcj02 IS NULL
+               OR destination_lat_gcj02 IS NULL OR destination_lon_gcj02 IS NULL
+            LIMIT ?
+            """,
+            (chunk_size,),
+        ).fetchall()
+        if not rows:
+            return total
+        origin_lats, origin_lons = wgs84_to_gcj02_batch(
+            [float(r["origin_lat"]) for r in rows], [float(r["origin_lon"]) for r in rows]
+        )
+        destination_lats, destination_lons = wgs84_to_gcj02_batch(
+            [float(r["destination_lat"]) for r in rows], [float(r["destination_lon"]) for r in rows]
+        )
+        db.executemany(
+            """
+            UPDATE od_routes
+            SET origin_lat_gcj02 = ?, origin_lon_gcj02 = ?, destination_lat_gcj02 = ?, destination_lon_gcj02 = ?
+            WHERE id = ?
+            """,
+            [
+                (o_lat, o_lon, d_lat, d_lon, r["id"])
+                for r, o_lat, o_lon, d_lat, d_lon in zip(rows, origin_lats, origin_lons, destination_lats, destination_lons)
+            ],
+        )
+        db.commit()
+        total += len(rows)
+
+
+def migrate_route_gcj02(db: sqlite3.Connection) -> None:
+    # 路线 GCJ-02 坐标在写入时计算并落库（读多写少），此处为已有路线回填
+    for column in ROUTE_GCJ02_COLUMNS:
+        add_column_if_missing(db, "od_routes", column, "REAL")
+    backfill_route_gcj02(db)
+
+
+def migrate_login_history_ring(db: sqlite3.Connection) -> None:
+    # 登录记录改为按账户固定槽位的环形缓冲：保留每个账户最近 LOGIN_HISTORY_KEEP 条，
+    # 按时间先后编号 seq，并以 seq % LOGIN_HISTORY_KEEP 作为槽位。
+    add_column_if_missing(db, "users", "login_seq", "INTEGER NOT NULL DEFAULT 0")
+    add_column_if_missing(db, "user_login_history", "slot", "INTEGER NOT NULL DEFAULT 0")
+    add_column_if_missing(db, "user_login_history", "seq", "INTEGER NOT NULL DEFAULT 0")
+    db.execute(
+        """
+        WITH ranked AS (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY datetime(login_at) DESC, id DESC
+            ) AS rn
+            FROM user_login_history
+        )
+        DELETE FROM user_login_history WHERE id IN (SELECT id FROM ranked WHERE rn > ?)
+        """,
+        (LOGIN_HISTORY_KEEP,),
+    )
+    db.execute(
+        """
+        WITH ranked AS (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY datetime(login_at) ASC, id ASC
+            ) AS rn
+            FROM user_login_history
+        )
+        UPDATE user_login_history
+        SET seq = (SELECT rn FROM ranked WHERE ranked.id = user_login_history.id)
+        """
+    )
+    db.execute("UPDATE user_login_history SET slot = seq % ?", (LOGIN_HISTORY_KEEP,))
+    db.execute(
+        """
+        UPDATE users
+        SET login_seq = COALESCE((SELECT MAX(h.seq) FROM user_login_history h WHERE h.user_id = users.id), 0)
+        """
+    )
+    db.execute("DROP INDEX IF EXISTS idx_login_history_user_time")
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_login_history_user_slot ON user_login_history(user_id, slot)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_login_history_user_seq ON user_login_history(user_id, seq DESC)")
+
+
+def migrate_import_jobs(db: sqlite3.Connection) -> None:
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            format TEXT NOT NULL DEFAULT 'csv',
+            filename TEXT NOT NULL DEFAULT '',
+            file_path TEXT NOT NULL,
+            created_by INTEGER NOT NULL DEFAULT 0,
+            actor_user_type TEXT NOT NULL DEFAULT '',
+            bytes_total INTEGER NOT NULL DEFAULT 0,
+            bytes_processed INTEGER NOT NULL DEFAULT 0,
+            rows_processed INTEGER NOT NULL DEFAULT 0,
+            rows_resumed INTEGER NOT NULL DEFAULT 0,
+            inserted INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            errors TEXT NOT NULL DEFAULT '[]',
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            message TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            updated_at TEXT NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_import_jobs_status ON import_jobs(status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_import_jobs_created_by ON import_jobs(created_by, created_at DESC);
+        """
+    )
+
+
+def migrate_change_log(db: sqlite3.Connection) -> None:
+    # 增量同步的变更日志：每个实体只保留最新一条（先删后插以取得新的序号），删除记为墓碑；
+    # 路线增删同时记一条账户变更（路线数随之变化），账户已删除时不再记录
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            owner_id INTEGER
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_change_log_entity ON change_log(entity, entity_id);
+        CREATE INDEX IF NOT EXISTS idx_change_log_tombstones ON change_log(seq) WHERE op = 'delete';
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_change_insert
+        AFTER INSERT ON od_routes
+        BEGIN
+            DELETE FROM change_log WHERE entity = 'route' AND entity_id = NEW.id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('route', NEW.id, 'upsert', NEW.user_id);
+            DELETE FROM change_log WHERE entity = 'user' AND entity_id = NEW.user_id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('user', NEW.user_id, 'upsert', NEW.user_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_change_update
+        AFTER UPDATE ON od_routes
+        BEGIN
+            DELETE FROM change_log WHERE entity = 'route' AND entity_id = NEW.id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('route', NEW.id, 'upsert', NEW.user_id);
+            DELETE FROM change_log
+            WHERE entity = 'user' AND entity_id IN (OLD.user_id, NEW.user_id) AND OLD.user_id <> NEW.user_id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id)
+            SELECT 'user', id, 'upsert', id FROM users
+            WHERE id IN (OLD.user_id, NEW.user_id) AND OLD.user_id <> NEW.user_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_routes_change_delete
+        AFTER DELETE ON od_routes
+        BEGIN
+            DELETE FROM change_log WHERE entity = 'route' AND entity_id = OLD.id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('route', OLD.id, 'delete', OLD.user_id);
+            DELETE FROM change_log WHERE entity = 'user' AND entity_id = OLD.user_id AND op = 'upsert';
+            INSERT INTO change_log(entity, entity_id, op, owner_id)
+            SELECT 'user', id, 'upsert', id FROM users WHERE id = OLD.user_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_change_insert
+        AFTER INSERT ON users
+        BEGIN
+            DELETE FROM change_log WHERE entity = 'user' AND entity_id = NEW.id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('user', NEW.id, 'upsert', NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_change_update
+        AFTER UPDATE ON users
+        BEGIN
+            DELETE FROM change_log WHERE entity = 'user' AND entity_id = NEW.id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('user', NEW.id, 'upsert', NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_change_delete
+        AFTER DELETE ON users
+        BEGIN
+            DELETE FROM change_log WHERE entity = 'user' AND entity_id = OLD.id;
+            INSERT INTO change_log(entity, entity_id, op, owner_id) VALUES('user', OLD.id, 'delete', OLD.id);
+        END;
+        """
+    )
+
+
+def migrate_user_alert_versions(db: sqlite3.Connection) -> None:
+    # 账户与告警的数据版本计数，用于只读接口的 ETag
+    db.executescript(
+        """
+        INSERT OR IGNORE INTO data_versions(name, version) VALUES('users', 0);
+        INSERT OR IGNORE INTO data_versions(name, version) VALUES('alerts', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_version_insert
+        AFTER INSERT ON users
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'users';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_version_delete
+        AFTER DELETE ON users
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'users';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_version_update
+        AFTER UPDATE ON users
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'users';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_version_insert
+        AFTER INSERT ON alerts
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'alerts';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_version_delete
+        AFTER DELETE ON alerts
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'alerts';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_version_update
+        AFTER UPDATE ON alerts
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'alerts';
+        END;
+        """
+    )
+
+
+def migrate_data_epoch(db: sqlite3.Connection) -> None:
+    # 数据库纪元：随机值。整库重建（本文件 init_db 或 manage_accounts.py）会清除迁移记录，
+    # 本迁移随数据版本计数表一起重新执行，纪元随之更换
+    db.execute(
+        "INSERT INTO app_meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (DATA_EPOCH_KEY, secrets.token_hex(8)),
+    )
+
+
+def migrate_route_duplicate_window(db: sqlite3.Connection) -> None:
+    # 重复提交判断（find_route_in_window）按账户 + 起终点纬度定位，再按创建时间取窗口
+    db.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_routes_duplicate_window
+        ON od_routes(user_id, origin_lat, destination_lat, created_at)
+        """
+    )
+
+
+# 增量迁移：按顺序执行一次，完成后记录到 app_meta（key = migration:<name>），
+# 与 SCHEMA_VERSION 的整库重建互补，新增结构无需丢弃旧数据。
+SCHEMA_MIGRATIONS: list[tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("route_stats", migrate_route_stats),
+    ("route_destination_region", migrate_route_destination_region),
+    ("route_extents", migrate_route_extents),
+    ("data_versions", migrate_data_versions),
+    ("login_history_ring", migrate_login_history_ring),
+    ("import_jobs", migrate_import_jobs),
+    ("node_versions", migrate_node_versions),
+    ("route_content_hash", migrate_route_content_hash),
+    ("node_route_regions", migrate_node_route_regions),
+    ("route_gcj02", migrate_route_gcj02),
+    ("change_log", migrate_change_log),
+    ("user_alert_versions", migrate_user_alert_versions),
+    ("route_duplicate_window", migrate_route_duplicate_window),
+    ("data_epoch", migrate_data_epoch),
+]
+
+
+def apply_schema_migrations(db: sqlite3.Connection) -> None:
+    for name, migrate in SCHEMA_MIGRATIONS:
+        key = f"migration:{name}"
+        if db.execute("SELECT 1 FROM app_meta WHERE key = ?", (key,)).fetchone() is not None:
+            continue
+        migrate(db)
+        db.execute(
+            "INSERT INTO app_meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, utc_now_text()),
+        )
+        db.commit()
+
+
 def init_db() -> None:
     db = sqlite3.connect(DB_PATH)
     db.row_factory = sqlite3.Row
+    # WAL 模式（写入数据库文件，之后所有连接沿用）：读事务不阻塞写入，
+    # 流式列表与 CSV 导出在逐批输出期间保持的读游标不会让并发写入报 "database is locked"
+    db.execute("PRAGMA journal_mode = WAL")
     db.execute("PRAGMA foreign_keys = ON")
     db.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
     version_row = db.execute("SELECT value FROM app_meta WHERE key = 'schema_version'").fetchone()
@@ -2043,6 +4276,12 @@ def init_db() -> None:
         db.executescript(
             """
             DROP TABLE IF EXISTS alerts;
+            DROP TABLE IF EXISTS route_stats_hourly;
+            DROP TABLE IF EXISTS route_stats_user;
+            DROP TABLE IF EXISTS route_extents;
+            DROP TABLE IF EXISTS data_versions;
+            DROP TABLE IF EXISTS change_log;
+            DROP TABLE IF EXISTS import_jobs;
             DROP TABLE IF EXISTS od_routes;
             DROP TABLE IF EXISTS nodes;
             DROP TABLE IF EXISTS user_login_history;
@@ -2125,9 +4364,11 @@ def init_db() -> None:
             """,
             (SCHEMA_VERSION,),
         )
+        db.execute("DELETE FROM app_meta WHERE key LIKE 'migration:%' OR key = 'change_log_floor'")
         print(f"[INFO] 数据库结构已重建为新版（schema={SCHEMA_VERSION}），旧数据已丢弃。")
 
     db.commit()
+    apply_schema_migrations(db)
     db.close()
 
 
@@ -2135,6 +4376,9 @@ app = create_app()
 
 
 if __name__ == "__main__":
+    # 导入解析进程池以 spawn 启动，工作进程默认会按 __main__ 的文件路径重新执行本文件（创建应用、初始化数据库）。
+    # 把主模块的 spec 指向 route_import：工作进程改为以 __mp_main__ 执行这个纯解析模块，不会导入 app.py
+    __spec__ = importlib.util.find_spec("route_import")
     host = os.environ.get("WEBGIS_HOST", "0.0.0.0")
     try:
         port = int(os.environ.get("WEBGIS_PORT", "5000"))
@@ -0,0 +1,318 @@
+# 【中文注释】
+# 文件说明：coord_transform.py 为项目自研源码文件，提供坐标系识别、校验与换算。
+# 维护约定：本模块不依赖 Flask 与数据库，可在导入工作进程中直接使用。
+
+import math
+from typing import Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，未安装时批量换算退化为逐点计算
+    np = None
+
+COORD_SYSTEM_WGS84 = "wgs84"
+COORD_SYSTEM_GCJ02 = "gcj02"
+COORD_SYSTEM_BD09 = "bd09"
+COORD_SYSTEM_CGCS2000 = "cgcs2000"
+COORD_SYSTEM_EPSG3857 = "epsg3857"
+# CGCS2000 与 WGS84 的差异在厘米级，按同一坐标系处理
+COORD_SYSTEMS_WGS84_EQUIVALENT = {COORD_SYSTEM_WGS84, COORD_SYSTEM_CGCS2000}
+GCJ_A = 6378245.0
+GCJ_EE = 0.00669342162296594323
+BD_X_PI = math.pi * 3000.0 / 180.0
+WEB_MERCATOR_R = 6378137.0
+WEB_MERCATOR_MAX = math.pi * WEB_MERCATOR_R
+WEB_MERCATOR_MAX_LAT = 85.0511287798066
+# 点数少于该值时逐点计算，避免 numpy 数组构造开销
+VECTORIZE_MIN_POINTS = 16
+
+
+def to_float(value: Any, field: str) -> float:
+    if value is None or str(value).strip() == "":
+        raise ValueError(f"{field} 不能为空")
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise ValueError(f"{field} 不是有效数字") from exc
+
+
+def to_optional_float(value: Any) -> float | None:
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def normalize_coord_system(value: Any, default: str = COORD_SYSTEM_WGS84) -> str:
+    text = str(value or "").strip().lower()
+    if not text:
+        return default
+    compact = text.replace("-", "").replace("_", "").replace(":", "").replace(" ", "")
+    if compact in {"wgs84", "wgs", "epsg4326", "4326"}:
+        return COORD_SYSTEM_WGS84
+    if compact in {"gcj02", "gcj", "mars"} or text in {"火星坐标", "火星坐标系"}:
+        return COORD_SYSTEM_GCJ02
+    if compact in {"bd09", "bd09ll", "baidu"} or text in {"百度坐标", "百度坐标系"}:
+        return COORD_SYSTEM_BD09
+    if compact in {"cgcs2000", "cgcs", "epsg4490", "4490"} or text in {"国家2000", "2000国家大地坐标系"}:
+        return COORD_SYSTEM_CGCS2000
+    if compact in {"epsg3857", "3857", "webmercator", "mercator", "epsg900913", "900913"}:
+        return COORD_SYSTEM_EPSG3857
+    raise ValueError("coord_system 仅支持 wgs84 / gcj02 / bd09 / cgcs2000 / epsg3857")
+
+
+def out_of_china(lat: float, lon: float) -> bool:
+    return lon < 72.004 or lon > 137.8347 or lat < 0.8293 or lat > 55.8271
+
+
+def _transform_lat(x: float, y: float) -> float:
+    ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
+    ret += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    ret += (20.0 * math.sin(y * math.pi) + 40.0 * math.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
+    ret += (160.0 * math.sin(y / 12.0 * math.pi) + 320 * math.sin(y * math.pi / 30.0)) * 2.0 / 3.0
+    return ret
+
+
+def _transform_lon(x: float, y: float) -> float:
+    ret = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
+    ret += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    ret += (20.0 * math.sin(x * math.pi) + 40.0 * math.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
+    ret += (150.0 * math.sin(x / 12.0 * math.pi) + 300.0 * math.sin(x / 30.0 * math.pi)) * 2.0 / 3.0
+    return ret
+
+
+def wgs84_to_gcj02(lat: float, lon: float) -> tuple[float, float]:
+    if out_of_china(lat, lon):
+        return float(lat), float(lon)
+    d_lat = _transform_lat(lon - 105.0, lat - 35.0)
+    d_lon = _transform_lon(lon - 105.0, lat - 35.0)
+    rad_lat = lat / 180.0 * math.pi
+    magic = math.sin(rad_lat)
+    magic = 1 - GCJ_EE * magic * magic
+    sqrt_magic = math.sqrt(magic)
+    d_lat = (d_lat * 180.0) / ((GCJ_A * (1 - GCJ_EE)) / (magic * sqrt_magic) * math.pi)
+    d_lon = (d_lon * 180.0) / (GCJ_A / sqrt_magic * math.cos(rad_lat) * math.pi)
+    mg_lat = lat + d_lat
+    mg_lon = lon + d_lon
+    return float(mg_lat), float(mg_lon)
+
+
+def gcj02_to_wgs84(lat: float, lon: float) -> tuple[float, float]:
+    if out_of_china(lat, lon):
+        return float(lat), float(lon)
+    wgs_lat = float(lat)
+    wgs_lon = float(lon)
+    for _ in range(2):
+        tmp_lat, tmp_lon = wgs84_to_gcj02(wgs_lat, wgs_lon)
+        wgs_lat -= tmp_lat - lat
+        wgs_lon -= tmp_lon - lon
+    return float(wgs_lat), float(wgs_lon)
+
+
+def bd09_to_gcj02(lat: float, lon: float) -> tuple[float, float]:
+    x = lon - 0.0065
+    y = lat - 0.006
+    z = math.sqrt(x * x + y * y) - 0.00002 * math.sin(y * BD_X_PI)
+    theta = math.atan2(y, x) - 0.000003 * math.cos(x * BD_X_PI)
+    return float(z * math.sin(theta)), float(z * math.cos(theta))
+
+
+def epsg3857_to_wgs84(lat: float, lon: float) -> tuple[float, float]:
+    # EPSG:3857 投影坐标沿用 lat/lon 字段：lat 为北向 y（米），lon 为东向 x（米）
+    wgs_lon = lon / WEB_MERCATOR_R * 180.0 / math.pi
+    wgs_lat = (2.0 * math.atan(math.exp(lat / WEB_MERCATOR_R)) - math.pi / 2.0) * 180.0 / math.pi
+    return float(wgs_lat), float(wgs_lon)
+
+
+def wgs84_to_epsg3857(lat: float, lon: float) -> tuple[float, float]:
+    # 返回 (x, y)（米）；纬度截断到 Web 墨卡托有效范围
+    lat = max(-WEB_MERCATOR_MAX_LAT, min(WEB_MERCATOR_MAX_LAT, lat))
+    x = lon * math.pi / 180.0 * WEB_MERCATOR_R
+    y = math.log(math.tan(math.pi / 4.0 + lat * math.pi / 360.0)) * WEB_MERCATOR_R
+    return float(x), float(y)
+
+
+def wgs84_to_gcj02_array(lat: Any, lon: Any) -> tuple[Any, Any]:
+    # 与 wgs84_to_gcj02 相同的公式，按 numpy 数组整列计算
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = lon - 105.0
+    y = lat - 35.0
+    d_lat = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * np.sqrt(np.abs(x))
+    d_lat += (20.0 * np.sin(6.0 * x * math.pi) + 20.0 * np.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    d_lat += (20.0 * np.sin(y * math.pi) + 40.0 * np.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
+    d_lat += (160.0 * np.sin(y / 12.0 * math.pi) + 320 * np.sin(y * math.pi / 30.0)) * 2.0 / 3.0
+    d_lon = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * np.sqrt(np.abs(x))
+    d_lon += (20.0 * np.sin(6.0 * x * math.pi) + 20.0 * np.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    d_lon += (20.0 * np.sin(x * math.pi) + 40.0 * np.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
+    d_lon += (150.0 * np.sin(x / 12.0 * math.pi) + 300.0 * np.sin(x / 30.0 * math.pi)) * 2.0 / 3.0
+    rad_lat = lat / 180.0 * math.pi
+    magic = np.sin(rad_lat)
+    magic = 1 - GCJ_EE * magic * magic
+    sqrt_magic = np.sqrt(magic)
+    d_lat = (d_lat * 180.0) / ((GCJ_A * (1 - GCJ_EE)) / (magic * sqrt_magic) * math.pi)
+    d_lon = (d_lon * 180.0) / (GCJ_A / sqrt_magic * np.cos(rad_lat) * math.pi)
+    outside = (lon < 72.004) | (lon > 137.8347) | (lat < 0.8293) | (lat > 55.8271)
+    return np.where(outside, lat, lat + d_lat), np.where(outside, lon, lon + d_lon)
+
+
+def gcj02_to_wgs84_array(lat: Any, lon: Any) -> tuple[Any, Any]:
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    outside = (lon < 72.004) | (lon > 137.8347) | (lat < 0.8293) | (lat > 55.8271)
+    wgs_lat = lat.copy()
+    wgs_lon = lon.copy()
+    for _ in range(2):
+        tmp_lat, tmp_lon = wgs84_to_gcj02_array(wgs_lat, wgs_lon)
+        wgs_lat -= tmp_lat - lat
+        wgs_lon -= tmp_lon - lon
+    return np.where(outside, lat, wgs_lat), np.where(outside, lon, wgs_lon)
+
+
+def bd09_to_gcj02_array(lat: Any, lon: Any) -> tuple[Any, Any]:
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = lon - 0.0065
+    y = lat - 0.006
+    z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * BD_X_PI)
+    theta = np.arctan2(y, x) - 0.000003 * np.cos(x * BD_X_PI)
+    return z * np.sin(theta), z * np.cos(theta)
+
+
+def epsg3857_to_wgs84_array(lat: Any, lon: Any) -> tuple[Any, Any]:
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    wgs_lon = lon / WEB_MERCATOR_R * 180.0 / math.pi
+    wgs_lat = (2.0 * np.arctan(np.exp(lat / WEB_MERCATOR_R)) - math.pi / 2.0) * 180.0 / math.pi
+    return wgs_lat, wgs_lon
+
+
+def wgs84_to_epsg3857_array(lat: Any, lon: Any) -> tuple[Any, Any]:
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -WEB_MERCATOR_MAX_LAT, WEB_MERCATOR_MAX_LAT)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = lon * math.pi / 180.0 * WEB_MERCATOR_R
+    y = np.log(np.tan(math.pi / 4.0 + lat * math.pi / 360.0)) * WEB_MERCATOR_R
+    return x, y
+
+
+def to_wgs84_array(lat: Any, lon: Any, coord_system: str) -> tuple[Any, Any]:
+    if coord_system == COORD_SYSTEM_GCJ02:
+        return gcj02_to_wgs84_array(lat, lon)
+    if coord_system == COORD_SYSTEM_BD09:
+        return gcj02_to_wgs84_array(*bd09_to_gcj02_array(lat, lon))
+    if coord_system == COORD_SYSTEM_EPSG3857:
+        return epsg3857_to_wgs84_array(lat, lon)
+    return np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+
+
+def wgs84_to_gcj02_batch(lats: Sequence[float], lons: Sequence[float]) -> tuple[list[float], list[float]]:
+    # 批量换算：有 numpy 时整列计算，否则逐点调用标量函数；两种方式结果差异小于 1e-9
+    if np is None or len(lats) < VECTORIZE_MIN_POINTS:
+        pairs = [wgs84_to_gcj02(float(lat), float(lon)) for lat, lon in zip(lats, lons)]
+        return [p[0] for p in pairs], [p[1] for p in pairs]
+    out_lat, out_lon = wgs84_to_gcj02_array(lats, lons)
+    return out_lat.tolist(), out_lon.tolist()
+
+
+def gcj02_to_wgs84_batch(lats: Sequence[float], lons: Sequence[float]) -> tuple[list[float], list[float]]:
+    if np is None or len(lats) < VECTORIZE_MIN_POINTS:
+        pairs = [gcj02_to_wgs84(float(lat), float(lon)) for lat, lon in zip(lats, lons)]
+        return [p[0] for p in pairs], [p[1] for p in pairs]
+    out_lat, out_lon = gcj02_to_wgs84_array(lats, lons)
+    return out_lat.tolist(), out_lon.tolist()
+
+
+def mercator_quantize_batch(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    resolution: float,
+) -> tuple[list[int], list[int]]:
+    # 投影到 Web 墨卡托并按 resolution（米/单位）量化为整数，前端乘回 resolution 即得米值
+    if np is None or len(lats) < VECTORIZE_MIN_POINTS:
+        xs: list[int] = []
+        ys: list[int] = []
+        for lat, lon in zip(lats, lons):
+            x, y = wgs84_to_epsg3857(float(lat), float(lon))
+            xs.append(int(round(x / resolution)))
+            ys.append(int(round(y / resolution)))
+        return xs, ys
+    x_array, y_array = wgs84_to_epsg3857_array(lats, lons)
+    return (
+        np.rint(x_array / resolution).astype(np.int64).tolist(),
+        np.rint(y_array / resolution).astype(np.int64).tolist(),
+    )
+
+
+def to_wgs84_batch(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    coord_systems: str | Sequence[str],
+) -> tuple[list[float], list[float]]:
+    # 统一换算入口：coord_systems 为单一坐标系或与点一一对应的坐标系列表（按字段指定来源坐标系），
+    # 按坐标系分组后每组走同一套整批换算（numpy 不可用或点数少时逐点计算，结果一致）
+    out_lat = [float(v) for v in lats]
+    out_lon = [float(v) for v in lons]
+    if isinstance(coord_systems, str):
+        coord_systems = [coord_systems] * len(out_lat)
+    groups: dict[str, list[int]] = {}
+    for i, system in enumerate(coord_systems):
+        if system not in COORD_SYSTEMS_WGS84_EQUIVALENT:
+            groups.setdefault(system, []).append(i)
+    for system, indices in groups.items():
+        group_lat = [out_lat[i] for i in indices]
+        group_lon = [out_lon[i] for i in indices]
+        if np is None or len(indices) < VECTORIZE_MIN_POINTS:
+            pairs = [to_wgs84(lat, lon, system) for lat, lon in zip(group_lat, group_lon)]
+            new_lat = [p[0] for p in pairs]
+            new_lon = [p[1] for p in pairs]
+        else:
+            lat_array, lon_array = to_wgs84_array(group_lat, group_lon, system)
+            new_lat = lat_array.tolist()
+            new_lon = lon_array.tolist()
+        for i, lat, lon in zip(indices, new_lat, new_lon):
+            out_lat[i] = lat
+            out_lon[i] = lon
+    return out_lat, out_lon
+
+
+def to_wgs84(lat: float, lon: float, coord_system: str) -> tuple[float, float]:
+    if coord_system == COORD_SYSTEM_GCJ02:
+        return gcj02_to_wgs84(lat, lon)
+    if coord_system == COORD_SYSTEM_BD09:
+        return gcj02_to_wgs84(*bd09_to_gcj02(lat, lon))
+    if coord_system == COORD_SYSTEM_EPSG3857:
+        return epsg3857_to_wgs84(lat, lon)
+    return float(lat), float(lon)
+
+
+def validate_source_coords(lat: float, lon: float, coord_system: str) -> None:
+    # 换算前按来源坐标系校验输入范围：投影坐标按米校验，其余按经纬度校验
+    if coord_system == COORD_SYSTEM_EPSG3857:
+        if abs(lat) > WEB_MERCATOR_MAX or abs(lon) > WEB_MERCATOR_MAX:
+            raise ValueError(f"EPSG:3857 坐标范围必须在 ±{WEB_MERCATOR_MAX:.0f} 米以内")
+        return
+    validate_lat_lon(lat, lon)
+
+
+def source_coords_valid_array(lat: Any, lon: Any, projected: Any) -> Any:
+    # validate_source_coords 的数组版本，返回通过校验的掩码；projected 为 EPSG:3857（按米校验）的掩码。
+    # NaN 不通过，由调用方逐点处理
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    metres = (np.abs(lat) <= WEB_MERCATOR_MAX) & (np.abs(lon) <= WEB_MERCATOR_MAX)
+    return np.where(projected, metres, lat_lon_valid_array(lat, lon))
+
+
+def lat_lon_valid_array(lat: Any, lon: Any) -> Any:
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    return (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180)
+
+
+def validate_lat_lon(lat: float, lon: float) -> None:
+    if lat < -90 or lat > 90:
+        raise ValueError("纬度范围必须在 -90 到 90")
+    if lon < -180 or lon > 180:
+        raise ValueError("经度范围必须在 -180 到 180")
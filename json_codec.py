@@ -0,0 +1,87 @@
+# 【中文注释】
+# 文件说明：json_codec.py 为项目自研源码文件，提供可替换的 JSON 序列化后端与预序列化片段拼接。
+# 维护约定：orjson 为可选依赖，未安装或遇到其不支持的对象时回退标准库 json，输出语义保持一致（键排序、紧凑格式）。
+
+import json
+from typing import Any, Iterable, Iterator
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+JSON_BACKEND_AUTO = "auto"
+JSON_BACKEND_ORJSON = "orjson"
+JSON_BACKEND_STDLIB = "json"
+JSON_BACKENDS = {JSON_BACKEND_AUTO, JSON_BACKEND_ORJSON, JSON_BACKEND_STDLIB}
+
+
+def resolve_json_backend(value: Any) -> str:
+    # auto：已安装 orjson 时使用 orjson；指定 orjson 但未安装时同样回退标准库
+    text = str(value or "").strip().lower()
+    if text not in JSON_BACKENDS:
+        text = JSON_BACKEND_AUTO
+    if text == JSON_BACKEND_STDLIB or orjson is None:
+        return JSON_BACKEND_STDLIB
+    return JSON_BACKEND_ORJSON
+
+
+def dumps_bytes(obj: Any, backend: str = JSON_BACKEND_STDLIB, default: Any = None) -> bytes:
+    if backend == JSON_BACKEND_ORJSON:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # 超出 64 位的整数、非字符串键等 orjson 不支持的情况交给标准库处理
+            pass
+    return json.dumps(obj, default=default, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def splice_json_array(head: dict[str, Any], key: str, fragments: Iterable[bytes], backend: str = JSON_BACKEND_STDLIB) -> bytes:
+    # 把已序列化的元素片段直接拼成 head 对象中 key 对应的数组，片段本身不再重新编码
+    return b"".join(iter_json_array(head, key, [list(fragments)], backend))
+
+
+def iter_json_array(
+    head: dict[str, Any],
+    key: str,
+    fragment_batches: Iterable[list[bytes]],
+    backend: str = JSON_BACKEND_STDLIB,
+) -> Iterator[bytes]:
+    # splice_json_array 的流式版本：逐批输出，拼接结果与一次性输出的文档相同
+    prefix = dumps_bytes(head, backend)
+    opening = b"{" if prefix == b"{}" else prefix[:-1] + b","
+    yield opening + dumps_bytes(key, backend) + b":["
+    first = True
+    for fragments in fragment_batches:
+        if not fragments:
+            continue
+        yield (b"" if first else b",") + b",".join(fragments)
+        first = False
+    yield b"]}"
+
+
+def iter_ndjson(head: dict[str, Any], fragment_batches: Iterable[list[bytes]], backend: str = JSON_BACKEND_STDLIB) -> Iterator[bytes]:
+    # NDJSON：首行为 head（ok 与列表级字段），其后每行一条记录
+    yield dumps_bytes(head, backend) + b"\n"
+    for fragments in fragment_batches:
+        if fragments:
+            yield b"\n".join(fragments) + b"\n"
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Flask 的 JSON 扩展点：jsonify 与 app.json.dumps 统一经由 dumps_bytes 选择后端
+    backend = JSON_BACKEND_STDLIB
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.backend, self.default).decode("utf-8")
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        return dumps_bytes(obj, self.backend, self.default)
+
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
@@ -15,7 +15,7 @@ from werkzeug.security import generate_password_hash
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "webgis.db")
+DB_PATH = os.environ.get("WEBGIS_DB_PATH", "").strip() or os.path.join(BASE_DIR, "webgis.db")
 DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
 PASSWORD_MIN_LENGTH = 6
 PASSWORD_MAX_LENGTH = 64
@@ -138,6 +138,12 @@ def rebuild_schema(db: sqlite3.Connection) -> None:
     db.executescript(
         """
         DROP TABLE IF EXISTS alerts;
+        DROP TABLE IF EXISTS route_stats_hourly;
+        DROP TABLE IF EXISTS route_stats_user;
+        DROP TABLE IF EXISTS route_extents;
+        DROP TABLE IF EXISTS data_versions;
+        DROP TABLE IF EXISTS change_log;
+        DROP TABLE IF EXISTS import_jobs;
         DROP TABLE IF EXISTS od_routes;
         DROP TABLE IF EXISTS nodes;
         DROP TABLE IF EXISTS user_login_history;
@@ -212,6 +218,8 @@ def rebuild_schema(db: sqlite3.Connection) -> None:
         );
         """
     )
+    # 增量迁移（汇总表、触发器等）由 app.py 在下次启动时重新执行
+    db.execute("DELETE FROM app_meta WHERE key LIKE 'migration:%' OR key = 'change_log_floor'")
 
 
 def ensure_schema(db: sqlite3.Connection) -> None:
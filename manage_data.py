@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""WebGIS data maintenance CLI (rollups, backfills, dedup, change log, compression benchmark)."""
+
+import argparse
+import json
+import sqlite3
+import time
+
+import app as webgis
+import response_codec
+
+BENCH_ENDPOINTS = (
+    "/api/routes",
+    "/api/routes?layout=columnar",
+    "/api/routes?layout=binary",
+    "/api/routes/flows?z=5",
+    "/api/nodes",
+    "/api/users",
+    "/api/admin/accounts",
+    "/api/admin/overview",
+)
+BENCH_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def get_db() -> sqlite3.Connection:
+    db = sqlite3.connect(webgis.DB_PATH)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA foreign_keys = ON")
+    webgis.apply_schema_migrations(db)
+    return db
+
+
+def cmd_rebuild_stats(args: argparse.Namespace) -> int:
+    db = get_db()
+    try:
+        webgis.rebuild_route_stats(db)
+        # 汇总结果可能变化，递增路线数据版本使服务端缓存与 ETag 失效
+        db.execute("UPDATE data_versions SET version = version + 1 WHERE name = ?", (webgis.DATA_VERSION_ROUTES,))
+        db.commit()
+        series = webgis.fetch_hourly_route_series(db)
+        users = int(db.execute("SELECT COUNT(*) AS c FROM route_stats_user").fetchone()["c"] or 0)
+        payload = {"total_routes": sum(series), "users_with_routes": users, "hourly": series}
+        if args.json:
+            print(json.dumps(payload, ensure_ascii=False, indent=2))
+            return 0
+        print(f"[OK] 统计汇总已重建：路线 {payload['total_routes']} 条，涉及账户 {users} 个")
+        return 0
+    finally:
+        db.close()
+
+
+def cmd_dedupe_routes(args: argparse.Namespace) -> int:
+    if args.chunk_size <= 0:
+        raise ValueError("--chunk-size 必须大于 0")
+    db = get_db()
+    try:
+        totals = {"scanned": 0, "hashed": 0, "removed": 0}
+        while True:
+            result = webgis.dedupe_routes_chunk(db, args.chunk_size)
+            if result["scanned"] == 0:
+                break
+            for key, value in result.items():
+                totals[key] += value
+            if not args.json:
+                print(f"[..] 已处理 {totals['scanned']} 条，补写摘要 {totals['hashed']} 条，删除重复 {totals['removed']} 条")
+        if args.json:
+            print(json.dumps(totals, ensure_ascii=False, indent=2))
+            return 0
+        print(f"[OK] 去重完成：补写摘要 {totals['hashed']} 条，删除重复 {totals['removed']} 条")
+        return 0
+    finally:
+        db.close()
+
+
+def cmd_backfill_gcj02(args: argparse.Namespace) -> int:
+    db = get_db()
+    try:
+        total = webgis.backfill_route_gcj02(db)
+        print(f"[OK] 已为 {total} 条路线补算 GCJ-02 坐标")
+        return 0
+    finally:
+        db.close()
+
+
+def cmd_compact_change_log(args: argparse.Namespace) -> int:
+    if args.keep < 0:
+        raise ValueError("--keep 不能小于 0")
+    db = get_db()
+    try:
+        removed = webgis.compact_change_log(db, args.keep)
+        floor = webgis.get_change_log_floor(db)
+        print(f"[OK] 已清理 {removed} 条删除墓碑，增量同步下限为序号 {floor}")
+        return 0
+    finally:
+        db.close()
+
+
+def bench_encoding(body: bytes, encoding: str, level: int, repeat: int) -> dict[str, float]:
+    # 一次性压缩与按块流式压缩（每块刷新一次，与流式接口一致）各跑 repeat 次，CPU 时间取平均
+    chunks = [body[i : i + BENCH_STREAM_CHUNK_BYTES] for i in range(0, len(body), BENCH_STREAM_CHUNK_BYTES)]
+    started = time.process_time()
+    for _ in range(repeat):
+        buffered = response_codec.compress_bytes(body, encoding, level)
+    buffered_ms = (time.process_time() - started) * 1000 / repeat
+    started = time.process_time()
+    for _ in range(repeat):
+        streamed = b"".join(response_codec.iter_compressed_chunks(chunks, encoding, level))
+    stream_ms = (time.process_time() - started) * 1000 / repeat
+    return {
+        "bytes": len(buffered),
+        "ratio": round(len(buffered) / len(body), 4),
+        "cpu_ms": round(buffered_ms, 3),
+        "stream_bytes": len(streamed),
+        "stream_ratio": round(len(streamed) / len(body), 4),
+        "stream_cpu_ms": round(stream_ms, 3),
+    }
+
+
+def cmd_bench_compression(args: argparse.Namespace) -> int:
+    if args.repeat <= 0:
+        raise ValueError("--repeat 必须大于 0")
+    client = webgis.app.test_client()
+    with client.session_transaction() as sess:
+        sess["is_system_admin"] = True
+    results = []
+    for url in args.endpoint or BENCH_ENDPOINTS:
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        body = response.get_data()
+        levels = response_codec.compression_levels(response.content_type or "")
+        if response.status_code != 200 or not body or levels is None:
+            print(f"[WARN] 跳过 {url}：状态码 {response.status_code}，类型 {response.content_type}")
+            continue
+        for encoding in response_codec.available_encodings():
+            result = {"endpoint": url, "raw_bytes": len(body), "encoding": encoding, "level": levels[encoding]}
+            result.update(bench_encoding(body, encoding, levels[encoding], args.repeat))
+            results.append(result)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    print(f"{'接口':<32} {'原始字节':>10} {'编码':<5} {'级别':>4} {'压缩率':>7} {'CPU ms':>8} {'流式压缩率':>10} {'流式 CPU ms':>11}")
+    for r in results:
+        print(
+            f"{r['endpoint']:<32} {r['raw_bytes']:>10} {r['encoding']:<5} {r['level']:>4} {r['ratio']:>7.4f} "
+            f"{r['cpu_ms']:>8.3f} {r['stream_ratio']:>10.4f} {r['stream_cpu_ms']:>11.3f}"
+        )
+    missing = [name for name in response_codec.ENCODING_PREFERENCE if name not in response_codec.available_encodings()]
+    if missing:
+        print(f"[WARN] 未安装对应依赖，未参与对比的编码：{', '.join(missing)}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="WebGIS 数据维护工具")
+    sub = parser.add_subparsers(dest="command")
+
+    p_stats = sub.add_parser("rebuild-stats", help="全量重建路线统计汇总表")
+    p_stats.add_argument("--json", action="store_true")
+    p_stats.set_defaults(func=cmd_rebuild_stats)
+
+    p_dedupe = sub.add_parser("dedupe-routes", help="为已有路线分批补算内容摘要并删除重复路线")
+    p_dedupe.add_argument("--chunk-size", type=int, default=webgis.ROUTE_DEDUPE_CHUNK_SIZE)
+    p_dedupe.add_argument("--json", action="store_true")
+    p_dedupe.set_defaults(func=cmd_dedupe_routes)
+
+    p_gcj = sub.add_parser("backfill-gcj02", help="为缺少 GCJ-02 坐标列的路线补算坐标")
+    p_gcj.set_defaults(func=cmd_backfill_gcj02)
+
+    p_changes = sub.add_parser("compact-change-log", help="清理增量同步变更日志中较旧的删除墓碑")
+    p_changes.add_argument("--keep", type=int, default=webgis.CHANGE_LOG_MAX_TOMBSTONES)
+    p_changes.set_defaults(func=cmd_compact_change_log)
+
+    p_bench = sub.add_parser("bench-compression", help="按接口对比各响应压缩编码的压缩率与 CPU 耗时")
+    p_bench.add_argument("--endpoint", action="append", help="待测接口路径，可重复；默认测试路线、节点、账户与概览接口")
+    p_bench.add_argument("--repeat", type=int, default=5)
+    p_bench.add_argument("--json", action="store_true")
+    p_bench.set_defaults(func=cmd_bench_compression)
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    if not hasattr(args, "func"):
+        parser.print_help()
+        return 2
+    try:
+        return int(args.func(args))
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+# 【中文注释】
+# 文件说明：response_codec.py 为项目自研源码文件，负责响应压缩编码的协商（gzip / br / zstd）与一次性、流式两种压缩。
+# 维护约定：brotli 与 zstandard 为可选依赖，未安装时不参与协商；本模块不依赖 Flask，Accept-Encoding 以 werkzeug 的 Accept 对象传入。
+
+import gzip
+import zlib
+from typing import Any, Callable, Iterable, Iterator
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时不提供 br 编码
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard 为可选依赖，未安装时不提供 zstd 编码
+    zstandard = None
+
+ENCODING_GZIP = "gzip"
+ENCODING_BR = "br"
+ENCODING_ZSTD = "zstd"
+# q 值相同时的服务端偏好：zstd 压缩率接近 br 且 CPU 开销最低，gzip 兜底
+ENCODING_PREFERENCE = (ENCODING_ZSTD, ENCODING_BR, ENCODING_GZIP)
+COMPRESS_MIN_BYTES = 256
+# 流式压缩的刷新间隔（未压缩字节）：小块（如逐行 CSV）攒够后再刷新，避免每块刷新拖低压缩率
+STREAM_FLUSH_BYTES = 32 * 1024
+
+# 按 Content-Type 选择各编码的压缩级别，按顺序匹配（子串），未命中的类型不压缩。
+# JSON 类（含列式 +json 与 NDJSON）重复键名多，较高级别收益明显；二进制路线格式主要是数值数组，
+# 高级别收益有限，取较低级别；页面与脚本等文本类取中等级别。
+COMPRESSION_PRESETS: tuple[tuple[tuple[str, ...], dict[str, int]], ...] = (
+    (
+        ("application/json", "+json", "application/x-ndjson"),
+        {ENCODING_GZIP: 6, ENCODING_BR: 5, ENCODING_ZSTD: 6},
+    ),
+    (
+        ("application/vnd.odwebgis.routes.binary",),
+        {ENCODING_GZIP: 4, ENCODING_BR: 4, ENCODING_ZSTD: 3},
+    ),
+    (
+        ("text/html", "text/css", "text/csv", "text/plain", "application/javascript", "text/javascript", "image/svg+xml"),
+        {ENCODING_GZIP: 6, ENCODING_BR: 4, ENCODING_ZSTD: 3},
+    ),
+)
+
+
+def available_encodings() -> tuple[str, ...]:
+    # 按服务端偏好排列的、当前环境可用的编码
+    installed = {ENCODING_GZIP: True, ENCODING_BR: brotli is not None, ENCODING_ZSTD: zstandard is not None}
+    return tuple(encoding for encoding in ENCODING_PREFERENCE if installed[encoding])
+
+
+def compression_levels(content_type: str) -> dict[str, int] | None:
+    # 返回 编码 -> 级别；不可压缩的类型（图片、字体、压缩包等）返回 None
+    for patterns, levels in COMPRESSION_PRESETS:
+        if any(pattern in content_type for pattern in patterns):
+            return levels
+    return None
+
+
+def negotiate_encoding(accept_encodings: Any, available: Iterable[str] | None = None) -> str | None:
+    # 取 q 值最高的可用编码，q 值相同按服务端偏好；q=0（含 *;q=0）表示拒绝；无可接受编码时返回 None（不压缩）
+    best: str | None = None
+    best_quality = 0.0
+    for encoding in available_encodings() if available is None else available:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == ENCODING_BR:
+        return brotli.compress(data, quality=level)
+    if encoding == ENCODING_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    # mtime 固定为 0，相同内容的输出逐字节一致
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def stream_compressor(encoding: str, level: int) -> tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]:
+    # 返回 (compress, flush, finish)：flush 输出到目前为止的全部数据（不结束流），finish 写出流尾
+    if encoding == ENCODING_BR:
+        compressor = brotli.Compressor(quality=level)
+        return compressor.process, compressor.flush, compressor.finish
+    if encoding == ENCODING_ZSTD:
+        zobj = zstandard.ZstdCompressor(level=level).compressobj()
+        return zobj.compress, lambda: zobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), zobj.flush
+    gobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return gobj.compress, lambda: gobj.flush(zlib.Z_SYNC_FLUSH), gobj.flush
+
+
+def iter_compressed_chunks(
+    chunks: Iterable[bytes],
+    encoding: str,
+    level: int,
+    flush_bytes: int = STREAM_FLUSH_BYTES,
+) -> Iterator[bytes]:
+    # 增量压缩：累计输入达到 flush_bytes 时刷新一次（0 表示每块都刷新），客户端可边收边解压，
+    # 内存只占压缩器窗口与当前块，不缓冲整个响应体
+    compress, flush, finish = stream_compressor(encoding, level)
+    pending = 0
+    for chunk in chunks:
+        data = compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
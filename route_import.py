@@ -0,0 +1,786 @@
+# 【中文注释】
+# 文件说明：route_import.py 为项目自研源码文件，负责路线导入的纯计算阶段（字段解析、校验与坐标换算）。
+# 维护约定：本模块不依赖 Flask 与数据库，可在进程池工作进程中执行；节点查询与写库仍由 app.py 单线程完成。
+
+import csv
+import importlib.util
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Iterable, Iterator
+
+from coord_transform import (
+    COORD_SYSTEM_EPSG3857,
+    COORD_SYSTEM_WGS84,
+    COORD_SYSTEMS_WGS84_EQUIVALENT,
+    lat_lon_valid_array,
+    normalize_coord_system,
+    np,
+    source_coords_valid_array,
+    to_optional_float,
+    to_wgs84,
+    to_wgs84_array,
+    to_wgs84_batch,
+    validate_lat_lon,
+    validate_source_coords,
+)
+
+PARSE_BATCH_SIZE = 500
+PARSE_MAX_IN_FLIGHT_PER_PROCESS = 2
+IMPORT_FORMAT_CSV = "csv"
+IMPORT_FORMAT_GEOJSON = "geojson"
+IMPORT_FORMAT_NDJSON = "ndjson"
+IMPORT_FORMAT_PARQUET = "parquet"
+IMPORT_FORMAT_ARROW = "arrow"
+IMPORT_FORMAT_LABELS = {
+    IMPORT_FORMAT_CSV: "CSV",
+    IMPORT_FORMAT_GEOJSON: "GeoJSON",
+    IMPORT_FORMAT_NDJSON: "NDJSON",
+    IMPORT_FORMAT_PARQUET: "Parquet",
+    IMPORT_FORMAT_ARROW: "Arrow",
+}
+IMPORT_FORMAT_EXTENSIONS = {
+    ".csv": IMPORT_FORMAT_CSV,
+    ".geojson": IMPORT_FORMAT_GEOJSON,
+    ".json": IMPORT_FORMAT_GEOJSON,
+    ".ndjson": IMPORT_FORMAT_NDJSON,
+    ".jsonl": IMPORT_FORMAT_NDJSON,
+    ".geojsonl": IMPORT_FORMAT_NDJSON,
+    ".parquet": IMPORT_FORMAT_PARQUET,
+    ".arrow": IMPORT_FORMAT_ARROW,
+    ".feather": IMPORT_FORMAT_ARROW,
+    ".ipc": IMPORT_FORMAT_ARROW,
+}
+COLUMNAR_IMPORT_FORMATS = {IMPORT_FORMAT_PARQUET, IMPORT_FORMAT_ARROW}
+COLUMNAR_BATCH_ROWS = 65536
+JSON_READ_CHUNK_CHARS = 1 << 16
+ROW_ERROR_KEY = "_row_error"
+ROUTE_COORD_FIELDS = {"origin_lat", "origin_lon", "destination_lat", "destination_lon", "lat", "lon"}
+ROUTE_ENDPOINT_LABELS = (("origin", "起点"), ("destination", "终点"))
+# parse_route_payload 读取的字段；列式导入只取出这些列的值
+ROUTE_PAYLOAD_FIELDS = {
+    "user_id",
+    "category",
+    "status",
+    "created_at",
+    "coord_system",
+    "origin_coord_system",
+    "destination_coord_system",
+    ROW_ERROR_KEY,
+    *(f"{key}_{field}" for key in ("origin", "destination") for field in ("code", "name", "lat", "lon")),
+}
+NODE_IMPORT_FORMATS = {IMPORT_FORMAT_CSV, IMPORT_FORMAT_GEOJSON, IMPORT_FORMAT_NDJSON}
+_parse_executor: ProcessPoolExecutor | None = None
+_parse_executor_workers = 0
+_parse_executor_lock = threading.Lock()
+
+
+def columnar_import_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_import_format(filename: str | None, requested: str | None = None) -> str:
+    # 优先使用显式指定的格式，否则按扩展名识别，默认按 CSV 处理
+    text = (requested or "").strip().lower()
+    if text:
+        if text in {"jsonl", "geojsonl"}:
+            text = IMPORT_FORMAT_NDJSON
+        elif text in {"feather", "ipc"}:
+            text = IMPORT_FORMAT_ARROW
+        if text not in IMPORT_FORMAT_LABELS:
+            raise ValueError("format 仅支持 csv / geojson / ndjson / parquet / arrow")
+        return text
+    name = (filename or "").strip().lower()
+    for ext, fmt in IMPORT_FORMAT_EXTENSIONS.items():
+        if name.endswith(ext):
+            return fmt
+    return IMPORT_FORMAT_CSV
+
+
+def payload_value(key: str, value: Any) -> Any:
+    # JSON / 列式数据的字段统一成与 CSV 一致的文本，坐标字段保留数值避免往返转换
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if key in ROUTE_COORD_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value).strip()
+
+
+def geojson_feature_to_payload(feature: Any) -> dict[str, Any]:
+    # LineString / MultiPoint 取首点为起点、末点为终点；properties 中的字段（含节点代码）与 CSV 列同名
+    if not isinstance(feature, dict):
+        return {ROW_ERROR_KEY: "要素必须是 GeoJSON Feature 对象"}
+    properties = feature.get("properties")
+    payload = {
+        str(k).strip(): payload_value(str(k).strip(), v)
+        for k, v in (properties.items() if isinstance(properties, dict) else [])
+    }
+    geometry = feature.get("geometry")
+    if not geometry:
+        return payload
+    coords = geometry.get("coordinates") if isinstance(geometry, dict) else None
+    if (
+        geometry.get("type") not in {"LineString", "MultiPoint"}
+        or not isinstance(coords, list)
+        or len(coords) < 2
+        or not all(isinstance(pt, list) and len(pt) >= 2 for pt in (coords[0], coords[-1]))
+    ):
+        payload[ROW_ERROR_KEY] = "几何类型仅支持至少包含两个点的 LineString 或 MultiPoint"
+        return payload
+    for key, point in (("origin", coords[0]), ("destination", coords[-1])):
+        if payload.get(f"{key}_lat") in (None, "") and payload.get(f"{key}_lon") in (None, ""):
+            payload[f"{key}_lon"] = payload_value(f"{key}_lon", point[0])
+            payload[f"{key}_lat"] = payload_value(f"{key}_lat", point[1])
+    return payload
+
+
+def geojson_node_feature_to_payload(feature: Any) -> dict[str, Any]:
+    # 节点要素：Point 几何为节点坐标，properties 中的 code / name / region / coord_system 与 CSV 列同名
+    if not isinstance(feature, dict):
+        return {ROW_ERROR_KEY: "要素必须是 GeoJSON Feature 对象"}
+    properties = feature.get("properties")
+    payload = {
+        str(k).strip(): payload_value(str(k).strip(), v)
+        for k, v in (properties.items() if isinstance(properties, dict) else [])
+    }
+    geometry = feature.get("geometry")
+    if not geometry:
+        return payload
+    coords = geometry.get("coordinates") if isinstance(geometry, dict) else None
+    if geometry.get("type") != "Point" or not isinstance(coords, list) or len(coords) < 2:
+        payload[ROW_ERROR_KEY] = "节点几何类型仅支持 Point"
+        return payload
+    if payload.get("lat") in (None, "") and payload.get("lon") in (None, ""):
+        payload["lon"] = payload_value("lon", coords[0])
+        payload["lat"] = payload_value("lat", coords[1])
+    return payload
+
+
+def open_upload_text(stream: Any) -> io.TextIOWrapper:
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", errors="ignore", newline="")
+
+
+def close_upload_text(stream: Any, text_stream: io.TextIOWrapper) -> None:
+    # 不随包装器关闭底层文件，由调用方负责
+    if not getattr(stream, "closed", False):
+        text_stream.detach()
+
+
+def iter_csv_upload_rows(stream: Any) -> Iterator[tuple[int, dict[str, str]]]:
+    # 逐行读取上传的 CSV（兼容 BOM），跳过空行；返回 (行号, 去空白后的字段)
+    text_stream = open_upload_text(stream)
+    try:
+        reader = csv.DictReader(text_stream)
+        for idx, row in enumerate(reader, start=2):
+            if not any((v or "").strip() for v in row.values() if isinstance(v, str)):
+                continue
+            yield idx, {k.strip(): (v or "").strip() for k, v in row.items() if k and isinstance(v, str)}
+    finally:
+        close_upload_text(stream, text_stream)
+
+
+def iter_ndjson_upload_rows(
+    stream: Any,
+    feature_to_payload: Callable[[Any], dict[str, Any]] = geojson_feature_to_payload,
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    # 每行一个 JSON 对象：平铺字段与 CSV 列同名，或为 GeoJSON Feature；返回 (行号, 字段)
+    text_stream = open_upload_text(stream)
+    try:
+        for idx, raw in enumerate(text_stream, start=1):
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                yield idx, {ROW_ERROR_KEY: "JSON 格式无效"}
+                continue
+            if not isinstance(obj, dict):
+                yield idx, {ROW_ERROR_KEY: "每行必须是 JSON 对象"}
+            elif obj.get("type") == "Feature":
+                yield idx, feature_to_payload(obj)
+            else:
+                yield idx, {str(k).strip(): payload_value(str(k).strip(), v) for k, v in obj.items()}
+    finally:
+        close_upload_text(stream, text_stream)
+
+
+def iter_geojson_features(text_stream: Any) -> Iterator[Any]:
+    # 增量解析 FeatureCollection：逐个解码顶层键值，遇到 features 数组时逐个产出要素，
+    # 内存占用只与单个要素大小相关
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = text_stream.read(JSON_READ_CHUNK_CHARS)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    def expect(chars: str) -> str:
+        nonlocal pos
+        ch = peek()
+        if not ch or ch not in chars:
+            raise ValueError("GeoJSON 格式无效")
+        pos += 1
+        return ch
+
+    def decode() -> Any:
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise ValueError("GeoJSON 格式无效") from None
+            # 数字可能恰好被块边界截断，读到块尾时补读后重新解码
+            if end == len(buf) and fill():
+                continue
+            pos = end
+            return value
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        expect(":")
+        if key == "features":
+            expect("[")
+            if peek() == "]":
+                pos += 1
+            else:
+                while True:
+                    yield decode()
+                    if expect(",]") == "]":
+                        break
+        else:
+            decode()
+        if expect(",}") == "}":
+            return
+
+
+def iter_geojson_upload_rows(
+    stream: Any,
+    feature_to_payload: Callable[[Any], dict[str, Any]] = geojson_feature_to_payload,
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    # GeoJSON FeatureCollection；行号为要素序号（从 1 开始）
+    text_stream = open_upload_text(stream)
+    try:
+        for idx, feature in enumerate(iter_geojson_features(text_stream), start=1):
+            yield idx, feature_to_payload(feature)
+    finally:
+        close_upload_text(stream, text_stream)
+
+
+def convert_rows_to_wgs84(rows: list[dict[str, Any]]) -> None:
+    # 整批换算非 WGS84 坐标（按字段的来源坐标系，经 to_wgs84_batch）并回写为 WGS84（坐标系随之改为 wgs84），
+    # 逐行校验时不再重复换算；坐标系非法、缺坐标或输入越界的行保持原样，由逐行校验报告原有错误
+    system_cache: dict[tuple[Any, str], str | None] = {}
+
+    def system_of(value: Any, default: str) -> str | None:
+        key = (value, default)
+        if key not in system_cache:
+            try:
+                system_cache[key] = normalize_coord_system(value, default)
+            except ValueError:
+                system_cache[key] = None
+        return system_cache[key]
+
+    global_systems = [system_of(row.get("coord_system"), COORD_SYSTEM_WGS84) for row in rows]
+    for key in ("origin", "destination"):
+        lat_name = f"{key}_lat"
+        lon_name = f"{key}_lon"
+        system_name = f"{key}_coord_system"
+        indices: list[int] = []
+        lats: list[float] = []
+        lons: list[float] = []
+        systems: list[str] = []
+        for i, (row, base) in enumerate(zip(rows, global_systems)):
+            system = system_of(row.get(system_name), base) if base is not None else None
+            if system is None or system in COORD_SYSTEMS_WGS84_EQUIVALENT:
+                continue
+            lat = to_optional_float(row.get(lat_name))
+            lon = to_optional_float(row.get(lon_name))
+            if lat is None or lon is None or math.isnan(lat) or math.isnan(lon):
+                continue
+            try:
+                validate_source_coords(lat, lon, system)
+            except ValueError:
+                continue
+            indices.append(i)
+            lats.append(lat)
+            lons.append(lon)
+            systems.append(system)
+        if not indices:
+            continue
+        wgs_lats, wgs_lons = to_wgs84_batch(lats, lons, systems)
+        for i, new_lat, new_lon in zip(indices, wgs_lats, wgs_lons):
+            row = rows[i]
+            row[lat_name] = new_lat
+            row[lon_name] = new_lon
+            row[system_name] = COORD_SYSTEM_WGS84
+
+
+def iter_columnar_record_batches(stream: Any, fmt: str) -> Iterator[Any]:
+    import pyarrow as pa
+
+    if fmt == IMPORT_FORMAT_PARQUET:
+        import pyarrow.parquet as pq
+
+        yield from pq.ParquetFile(stream).iter_batches(batch_size=COLUMNAR_BATCH_ROWS)
+        return
+
+    import pyarrow.ipc as ipc
+
+    # Arrow IPC 文件格式（.arrow / .feather v2）可随机访问；否则按流格式读取
+    try:
+        reader = ipc.open_file(stream)
+    except pa.ArrowInvalid:
+        stream.seek(0)
+        yield from ipc.open_stream(stream)
+        return
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i)
+
+
+def columnar_batch_columns(batch: Any) -> tuple[dict[str, list[Any]], dict[str, tuple[Any, Any]], list[bool]]:
+    # 整列取出记录批（列名去空白，同名列后者覆盖，与逐行 dict 一致），返回：
+    #   字段 -> 按 payload_value 规则规范化的值列（只取解析用到的字段）；
+    #   数值坐标列 -> (float64 数组, 空值掩码)，numpy 可用时供整列校验与换算；
+    #   每行是否含非空值（全空行跳过但仍占行号）
+    import pyarrow.types as pat
+
+    arrays = {str(name).strip(): column for name, column in zip(batch.schema.names, batch.columns)}
+    count = batch.num_rows
+    nonempty = [False] * count
+    columns: dict[str, list[Any]] = {}
+    coord_arrays: dict[str, tuple[Any, Any]] = {}
+    for key, array in arrays.items():
+        is_text = pat.is_string(array.type) or pat.is_large_string(array.type)
+        is_number = pat.is_floating(array.type) or pat.is_integer(array.type)
+        if key not in ROUTE_PAYLOAD_FIELDS:
+            values = None
+        elif key in ROUTE_COORD_FIELDS and is_number:
+            # 数值坐标原样保留（payload_value 对数值坐标不做转换），空值换成空串
+            raw = array.to_pylist()
+            values = raw if array.null_count == 0 else ["" if v is None else v for v in raw]
+            if np is not None:
+                coord_arrays[key] = (
+                    array.to_numpy(zero_copy_only=False).astype(np.float64),
+                    array.is_null().to_numpy(zero_copy_only=False),
+                )
+        elif is_text:
+            values = ["" if v is None else v.strip() for v in array.to_pylist()]
+        elif is_number or pat.is_boolean(array.type):
+            values = ["" if v is None else str(v).strip() for v in array.to_pylist()]
+        else:
+            values = [payload_value(key, v) for v in array.to_pylist()]
+        if values is not None:
+            columns[key] = values
+        if array.null_count == 0 and not is_text:
+            # 非文本且无空值的列每行都非空
+            nonempty = [True] * count
+            continue
+        if values is None:
+            raw = array.to_pylist()
+            values = ["" if v is None else v.strip() for v in raw] if is_text else ["" if v is None else v for v in raw]
+        nonempty = [flag or v != "" for flag, v in zip(nonempty, values)]
+    return columns, coord_arrays, nonempty
+
+
+def parse_columnar_endpoints(
+    label: str,
+    codes: list[Any],
+    names: list[Any],
+    lats: list[Any],
+    lons: list[Any],
+    systems: list[str | None],
+    coord_arrays: tuple[tuple[Any, Any], tuple[Any, Any]] | None = None,
+) -> list[dict[str, Any] | None]:
+    # 与 parse_endpoint 逐行结果一致：有代码的行只做规范化；手动点整列校验来源范围、按坐标系分组整批换算、
+    # 再整列校验换算结果。坐标系非法的行（systems 为 None）返回 None；
+    # 坐标为空、NaN、越界等少见情况逐行交给 parse_endpoint，保证错误信息不变。
+    # coord_arrays 为 ((纬度数组, 空值掩码), (经度数组, 空值掩码))，缺省（文本坐标列或无 numpy）时逐行转换后同样整批处理
+    results: list[dict[str, Any] | None] = [None] * len(systems)
+    manual: list[int] = []
+    for i, (code, system) in enumerate(zip(codes, systems)):
+        if system is None:
+            continue
+        code = (code or "").strip().upper()
+        if code:
+            results[i] = {"code": code, "name": (names[i] or "").strip()}
+        else:
+            manual.append(i)
+    if not manual:
+        return results
+
+    def endpoint_or_error(i: int, lat: float | None, lon: float | None) -> dict[str, Any]:
+        try:
+            return parse_endpoint(label, None, names[i], lat, lon, systems[i])
+        except ValueError as exc:
+            return {"error": str(exc)}
+
+    if np is None:
+        for i in manual:
+            results[i] = endpoint_or_error(i, to_optional_float(lats[i]), to_optional_float(lons[i]))
+        return results
+
+    index = np.asarray(manual, dtype=np.int64)
+    if coord_arrays is not None:
+        (lat_all, lat_null), (lon_all, lon_null) = coord_arrays
+        lat = lat_all[index]
+        lon = lon_all[index]
+        missing = lat_null[index] | lon_null[index]
+    else:
+        parsed_lat = [to_optional_float(lats[i]) for i in manual]
+        parsed_lon = [to_optional_float(lons[i]) for i in manual]
+        missing = np.array([a is None or b is None for a, b in zip(parsed_lat, parsed_lon)], dtype=bool)
+        lat = np.array([math.nan if v is None else v for v in parsed_lat], dtype=np.float64)
+        lon = np.array([math.nan if v is None else v for v in parsed_lon], dtype=np.float64)
+    row_systems = np.array([systems[i] for i in manual], dtype=object)
+    ok = ~missing & source_coords_valid_array(lat, lon, row_systems == COORD_SYSTEM_EPSG3857)
+
+    wgs_lat = lat.copy()
+    wgs_lon = lon.copy()
+    for system in set(row_systems[ok].tolist()) - COORD_SYSTEMS_WGS84_EQUIVALENT:
+        group = ok & (row_systems == system)
+        wgs_lat[group], wgs_lon[group] = to_wgs84_array(lat[group], lon[group], system)
+    ok &= lat_lon_valid_array(wgs_lat, wgs_lon)
+
+    for i, good, is_missing, src_lat, src_lon, out_lat, out_lon in zip(
+        manual, ok.tolist(), missing.tolist(), lat.tolist(), lon.tolist(), wgs_lat.tolist(), wgs_lon.tolist()
+    ):
+        if good:
+            results[i] = {"code": None, "name": (names[i] or "").strip() or f"{label}手动点", "lat": out_lat, "lon": out_lon}
+        elif is_missing:
+            results[i] = endpoint_or_error(i, None, None)
+        else:
+            results[i] = endpoint_or_error(i, src_lat, src_lon)
+    return results
+
+
+def endpoint_coord_arrays(coord_arrays: dict[str, tuple[Any, Any]], key: str) -> tuple[tuple[Any, Any], tuple[Any, Any]] | None:
+    lat = coord_arrays.get(f"{key}_lat")
+    lon = coord_arrays.get(f"{key}_lon")
+    return None if lat is None or lon is None else (lat, lon)
+
+
+def parse_route_columns(
+    columns: dict[str, list[Any]],
+    count: int,
+    coord_arrays: dict[str, tuple[Any, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    # parse_route_payload 的整列版本，输出与逐行解析相同的结构与错误信息；
+    # 坐标系按取值组合缓存，坐标按列整批校验与换算，避免为每行构造字段字典
+    def column(name: str) -> list[Any]:
+        return columns.get(name) or [None] * count
+
+    system_cache: dict[tuple[Any, Any, Any], tuple[str, str] | str] = {}
+    origin_systems: list[str | None] = []
+    destination_systems: list[str | None] = []
+    coord_errors: list[str | None] = []
+    for key in zip(column("coord_system"), column("origin_coord_system"), column("destination_coord_system")):
+        resolved = system_cache.get(key)
+        if resolved is None:
+            try:
+                base = normalize_coord_system(key[0], COORD_SYSTEM_WGS84)
+                resolved = (normalize_coord_system(key[1], base), normalize_coord_system(key[2], base))
+            except ValueError as exc:
+                resolved = str(exc)
+            system_cache[key] = resolved
+        if isinstance(resolved, str):
+            origin_systems.append(None)
+            destination_systems.append(None)
+            coord_errors.append(resolved)
+        else:
+            origin_systems.append(resolved[0])
+            destination_systems.append(resolved[1])
+            coord_errors.append(None)
+
+    endpoints = {
+        key: parse_columnar_endpoints(
+            label,
+            column(f"{key}_code"),
+            column(f"{key}_name"),
+            column(f"{key}_lat"),
+            column(f"{key}_lon"),
+            origin_systems if key == "origin" else destination_systems,
+            endpoint_coord_arrays(coord_arrays or {}, key),
+        )
+        for key, label in ROUTE_ENDPOINT_LABELS
+    }
+
+    results: list[dict[str, Any]] = []
+    for i, (user_id, row_error, category, status, created_at) in enumerate(
+        zip(column("user_id"), column(ROW_ERROR_KEY), column("category"), column("status"), column("created_at"))
+    ):
+        parsed: dict[str, Any] = {
+            "user_id": str(user_id or "").strip(),
+            "row_error": row_error or None,
+            "coord_error": coord_errors[i],
+            "origin": None,
+            "destination": None,
+            "category": (category or "货运").strip() or "货运",
+            "status": (status or "active").strip() or "active",
+            "created_at": None,
+            "created_at_error": None,
+        }
+        results.append(parsed)
+        if coord_errors[i] is not None:
+            continue
+        parsed["origin"] = endpoints["origin"][i]
+        parsed["destination"] = endpoints["destination"][i]
+        created_at = (created_at or "").strip()
+        if created_at:
+            try:
+                datetime.fromisoformat(created_at)
+                parsed["created_at"] = created_at
+            except ValueError:
+                parsed["created_at_error"] = "created_at 必须是 ISO 格式"
+    return results
+
+
+def iter_columnar_parsed_routes(stream: Any, fmt: str) -> Iterator[tuple[int, dict[str, Any]]]:
+    # Parquet / Arrow 的解析阶段：整列取出记录批后按列解析，直接产出 parse_route_payload 结构，
+    # 不经过逐行字段字典与进程池；行号为数据行序号（从 1 开始），全空行跳过
+    if not columnar_import_available():
+        raise ValueError("服务器未安装 pyarrow，无法导入 Parquet/Arrow 文件")
+    line = 0
+    for batch in iter_columnar_record_batches(stream, fmt):
+        columns, coord_arrays, nonempty = columnar_batch_columns(batch)
+        for parsed, keep in zip(parse_route_columns(columns, batch.num_rows, coord_arrays), nonempty):
+            line += 1
+            if keep:
+                yield line, parsed
+
+
+def iter_upload_rows(stream: Any, fmt: str) -> Iterator[tuple[int, dict[str, Any]]]:
+    # 逐行读取文本格式（Parquet / Arrow 由 iter_columnar_parsed_routes 按列解析，不经过这里）
+    if fmt == IMPORT_FORMAT_GEOJSON:
+        return iter_geojson_upload_rows(stream)
+    if fmt == IMPORT_FORMAT_NDJSON:
+        return iter_ndjson_upload_rows(stream)
+    return iter_csv_upload_rows(stream)
+
+
+def iter_parsed_upload_routes(stream: Any, fmt: str, processes: int = 1, skip: int = 0) -> Iterator[tuple[int, dict[str, Any]]]:
+    # 导入的解析阶段入口：Parquet / Arrow 按列解析；其余格式逐行读取后按批解析（可分发到进程池）。
+    # skip 为已提交的行数（后台任务恢复时跳过）
+    if fmt in COLUMNAR_IMPORT_FORMATS:
+        parsed = iter_columnar_parsed_routes(stream, fmt)
+        return itertools.islice(parsed, skip, None) if skip else parsed
+    rows = iter_upload_rows(stream, fmt)
+    if skip:
+        rows = itertools.islice(rows, skip, None)
+    return iter_parsed_routes(rows, processes)
+
+
+def iter_node_upload_rows(stream: Any, fmt: str) -> Iterator[tuple[int, dict[str, Any]]]:
+    if fmt == IMPORT_FORMAT_GEOJSON:
+        return iter_geojson_upload_rows(stream, geojson_node_feature_to_payload)
+    if fmt == IMPORT_FORMAT_NDJSON:
+        return iter_ndjson_upload_rows(stream, geojson_node_feature_to_payload)
+    return iter_csv_upload_rows(stream)
+
+
+def parse_endpoint(
+    label: str,
+    code: str | None,
+    name: str | None,
+    lat: float | None,
+    lon: float | None,
+    coord_system: str = COORD_SYSTEM_WGS84,
+) -> dict[str, Any]:
+    # 有代码时只做规范化，节点是否存在由写入端查询；手动点在此完成校验与 WGS84 换算
+    clean_code = (code or "").strip().upper()
+    clean_name = (name or "").strip()
+    if clean_code:
+        return {"code": clean_code, "name": clean_name}
+
+    if lat is None or lon is None:
+        raise ValueError(f"{label}需要输入代码或经纬度")
+
+    normalized_system = normalize_coord_system(coord_system, COORD_SYSTEM_WGS84)
+    validate_source_coords(lat, lon, normalized_system)
+    wgs_lat, wgs_lon = to_wgs84(float(lat), float(lon), normalized_system)
+    validate_lat_lon(wgs_lat, wgs_lon)
+    return {
+        "code": None,
+        "name": clean_name or f"{label}手动点",
+        "lat": float(wgs_lat),
+        "lon": float(wgs_lon),
+    }
+
+
+def parse_route_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    # 各阶段的错误分别记录而不是立即抛出，写入端按原有顺序（坐标系 → 起点 → 终点 → 时间）报告第一个错误，
+    # 保证与逐行校验时的错误信息一致
+    parsed: dict[str, Any] = {
+        "user_id": str(payload.get("user_id") or "").strip(),
+        "row_error": payload.get(ROW_ERROR_KEY) or None,
+        "coord_error": None,
+        "origin": None,
+        "destination": None,
+        "category": (payload.get("category") or "货运").strip() or "货运",
+        "status": (payload.get("status") or "active").strip() or "active",
+        "created_at": None,
+        "created_at_error": None,
+    }
+    try:
+        global_coord_system = normalize_coord_system(payload.get("coord_system"), COORD_SYSTEM_WGS84)
+        origin_coord_system = normalize_coord_system(payload.get("origin_coord_system"), global_coord_system)
+        destination_coord_system = normalize_coord_system(payload.get("destination_coord_system"), global_coord_system)
+    except ValueError as exc:
+        parsed["coord_error"] = str(exc)
+        return parsed
+
+    for key, label, coord_system in (
+        ("origin", "起点", origin_coord_system),
+        ("destination", "终点", destination_coord_system),
+    ):
+        try:
+            parsed[key] = parse_endpoint(
+                label,
+                payload.get(f"{key}_code"),
+                payload.get(f"{key}_name"),
+                to_optional_float(payload.get(f"{key}_lat")),
+                to_optional_float(payload.get(f"{key}_lon")),
+                coord_system,
+            )
+        except ValueError as exc:
+            parsed[key] = {"error": str(exc)}
+
+    created_at = (payload.get("created_at") or "").strip()
+    if created_at:
+        try:
+            datetime.fromisoformat(created_at)
+            parsed["created_at"] = created_at
+        except ValueError:
+            parsed["created_at_error"] = "created_at 必须是 ISO 格式"
+    return parsed
+
+
+def parse_route_batch(batch: list[tuple[int, dict[str, Any]]]) -> list[tuple[int, dict[str, Any]]]:
+    # 先整批换算坐标（不修改调用方传入的字段），再逐行解析校验
+    payloads = [dict(payload) for _, payload in batch]
+    convert_rows_to_wgs84(payloads)
+    return [(line, parse_route_payload(payload)) for (line, _), payload in zip(batch, payloads)]
+
+
+def get_parse_executor(processes: int) -> ProcessPoolExecutor:
+    # 进程池在首次需要时创建并在进程内长期复用，所有导入请求与后台任务共享。
+    # 使用 spawn 启动工作进程：不 fork 已有多个线程的服务进程；工作进程只需 route_import 与 coord_transform
+    # （python app.py 启动时主模块的 spec 指向本模块，工作进程不会重新执行 app.py）
+    global _parse_executor, _parse_executor_workers
+    with _parse_executor_lock:
+        if _parse_executor is None or _parse_executor_workers != processes:
+            if _parse_executor is not None:
+                _parse_executor.shutdown(wait=False, cancel_futures=True)
+            _parse_executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            _parse_executor_workers = processes
+        return _parse_executor
+
+
+def discard_parse_executor(executor: ProcessPoolExecutor) -> None:
+    # 工作进程异常退出后进程池不可再用，丢弃后下次导入重新创建
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is executor:
+            _parse_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def read_row_batch(iterator: Iterator[tuple[int, dict[str, Any]]], batch_size: int) -> tuple[list[tuple[int, dict[str, Any]]], ValueError | None]:
+    # 读取一批行；读文件中途出错（如 GeoJSON 结构损坏）时返回已读到的行与该错误，
+    # 由调用方先解析产出出错位置之前的行再抛出
+    batch: list[tuple[int, dict[str, Any]]] = []
+    try:
+        for item in itertools.islice(iterator, batch_size):
+            batch.append(item)
+    except ValueError as exc:
+        return batch, exc
+    return batch, None
+
+
+def iter_parsed_routes(
+    rows: Iterable[tuple[int, dict[str, Any]]],
+    processes: int = 1,
+    batch_size: int = PARSE_BATCH_SIZE,
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    # 按批把解析分发到进程池，结果按提交顺序取回，保证行号与写入顺序不变；
+    # 在途批次数有上限，避免读文件远快于写库时占满内存。只有一批数据时不启动进程池。
+    # 读文件出错时，出错位置之前的行全部产出后再抛出该错误。
+    iterator = iter(rows)
+    first, error = read_row_batch(iterator, batch_size)
+    if not first:
+        if error is not None:
+            raise error
+        return
+    second, error = read_row_batch(iterator, batch_size) if error is None else ([], error)
+    if processes <= 1 or not second:
+        yield from parse_route_batch(first)
+        yield from parse_route_batch(second)
+        while error is None:
+            batch, error = read_row_batch(iterator, batch_size)
+            if not batch:
+                break
+            yield from parse_route_batch(batch)
+        if error is not None:
+            raise error
+        return
+
+    max_in_flight = processes * PARSE_MAX_IN_FLIGHT_PER_PROCESS
+    executor = get_parse_executor(processes)
+    in_flight: deque[Future] = deque()
+    try:
+        in_flight.append(executor.submit(parse_route_batch, first))
+        in_flight.append(executor.submit(parse_route_batch, second))
+        exhausted = error is not None
+        while in_flight:
+            while not exhausted and len(in_flight) < max_in_flight:
+                batch, error = read_row_batch(iterator, batch_size)
+                exhausted = error is not None or not batch
+                if batch:
+                    in_flight.append(executor.submit(parse_route_batch, batch))
+            yield from in_flight.popleft().result()
+        if error is not None:
+            raise error
+    except BrokenProcessPool:
+        discard_parse_executor(executor)
+        raise
+    finally:
+        # 提前结束（取消、写库出错）时撤回尚未开始的批次；进程池本身保留给后续导入
+        for future in in_flight:
+            future.cancel()
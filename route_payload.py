@@ -0,0 +1,171 @@
+# 【中文注释】
+# 文件说明：route_payload.py 为项目自研源码文件，负责 /api/routes 的紧凑输出格式（列式 JSON 与二进制类型数组）。
+# 维护约定：本模块不依赖 Flask 与数据库，只处理 route_rows_to_dicts（及投影）之后的路线字典列表。
+
+import json
+import struct
+from typing import Any
+
+ROUTE_LAYOUT_ROWS = "rows"
+ROUTE_LAYOUT_COLUMNAR = "columnar"
+ROUTE_LAYOUT_BINARY = "binary"
+ROUTE_LAYOUTS = {ROUTE_LAYOUT_ROWS, ROUTE_LAYOUT_COLUMNAR, ROUTE_LAYOUT_BINARY}
+ROUTE_MIME_COLUMNAR = "application/vnd.odwebgis.routes.columnar+json"
+ROUTE_MIME_BINARY = "application/vnd.odwebgis.routes.binary"
+ROUTE_BINARY_MAGIC = b"ODRB"
+ROUTE_BINARY_VERSION = 1
+ROUTE_BINARY_ALIGN = 8
+
+# 整数列与字典编码列（取值重复度高，输出为字典下标）；created_at 为普通字符串列
+ROUTE_INT_COLUMNS = ("id", "user_id")
+ROUTE_DICT_COLUMNS = (
+    "user_name",
+    "category",
+    "status",
+    "origin_code",
+    "origin_name",
+    "destination_code",
+    "destination_name",
+    "destination_region",
+)
+ROUTE_STRING_COLUMNS = ("created_at",)
+ROUTE_FLOAT_COLUMNS = (
+    "origin_lat",
+    "origin_lon",
+    "destination_lat",
+    "destination_lon",
+    "origin_lat_gcj02",
+    "origin_lon_gcj02",
+    "destination_lat_gcj02",
+    "destination_lon_gcj02",
+)
+
+# 二进制格式的数值列类型：类型名 -> struct 格式字符（均按小端打包）
+BINARY_DTYPES = {"int32": "i", "float64": "d"}
+
+
+def negotiate_route_layout(layout: Any, accept_mimetypes: Any) -> str:
+    # 显式 layout= 优先；否则按 Accept 协商，未声明紧凑格式（含 */*）时保持原有逐行 JSON
+    text = str(layout or "").strip().lower()
+    if text:
+        if text not in ROUTE_LAYOUTS:
+            raise ValueError("layout 仅支持 rows / columnar / binary")
+        return text
+    best = accept_mimetypes.best_match(
+        ["application/json", ROUTE_MIME_COLUMNAR, ROUTE_MIME_BINARY],
+        default="application/json",
+    )
+    if best == ROUTE_MIME_COLUMNAR:
+        return ROUTE_LAYOUT_COLUMNAR
+    if best == ROUTE_MIME_BINARY:
+        return ROUTE_LAYOUT_BINARY
+    return ROUTE_LAYOUT_ROWS
+
+
+def dictionary_encode(values: list[Any]) -> tuple[list[Any], list[int]]:
+    # 按首次出现顺序建字典，返回 (字典, 下标列)；None 也作为一个字典项
+    index: dict[Any, int] = {}
+    dictionary: list[Any] = []
+    codes: list[int] = []
+    for value in values:
+        code = index.get(value)
+        if code is None:
+            code = len(dictionary)
+            index[value] = code
+            dictionary.append(value)
+        codes.append(code)
+    return dictionary, codes
+
+
+def route_numeric_columns(routes: list[dict[str, Any]], projected: bool) -> dict[str, tuple[str, list[Any]]]:
+    # 返回 列名 -> (类型名, 值列表)；投影输出（proj=epsg3857）时坐标为量化后的整数列
+    # origin_x / origin_y / destination_x / destination_y，否则为浮点经纬度（WGS84 与 GCJ-02）
+    columns: dict[str, tuple[str, list[Any]]] = {}
+    for name in ROUTE_INT_COLUMNS:
+        columns[name] = ("int32", [int(r.get(name) or 0) for r in routes])
+    if projected:
+        for key in ("origin", "destination"):
+            columns[f"{key}_x"] = ("int32", [r[f"{key}_xy"][0] for r in routes])
+            columns[f"{key}_y"] = ("int32", [r[f"{key}_xy"][1] for r in routes])
+    else:
+        for name in ROUTE_FLOAT_COLUMNS:
+            columns[name] = ("float64", [float(r[name]) for r in routes])
+    return columns
+
+
+def route_text_columns(routes: list[dict[str, Any]]) -> tuple[dict[str, list[Any]], dict[str, list[int]], dict[str, list[Any]]]:
+    # 返回 (字典, 字典下标列, 普通字符串列)
+    dictionaries: dict[str, list[Any]] = {}
+    dict_columns: dict[str, list[int]] = {}
+    for name in ROUTE_DICT_COLUMNS:
+        dictionaries[name], dict_columns[name] = dictionary_encode([r.get(name) for r in routes])
+    string_columns = {name: [r.get(name) for r in routes] for name in ROUTE_STRING_COLUMNS}
+    return dictionaries, dict_columns, string_columns
+
+
+def encode_routes_columnar(routes: list[dict[str, Any]], projection: dict[str, Any] | None = None) -> dict[str, Any]:
+    # 列式 JSON：每个字段一个数组，字典编码列的值为 dictionaries[字段] 的下标；
+    # 不输出可由其他列推导的字段（*_wgs84、coord_system、line_label）
+    numeric = route_numeric_columns(routes, projection is not None)
+    dictionaries, dict_columns, string_columns = route_text_columns(routes)
+    columns: dict[str, list[Any]] = {name: values for name, (_, values) in numeric.items()}
+    columns.update(dict_columns)
+    columns.update(string_columns)
+    payload: dict[str, Any] = {
+        "layout": ROUTE_LAYOUT_COLUMNAR,
+        "count": len(routes),
+        "columns": columns,
+        "dictionaries": dictionaries,
+    }
+    if projection is not None:
+        payload["projection"] = projection
+    return payload
+
+
+def align_offset(offset: int) -> int:
+    return (offset + ROUTE_BINARY_ALIGN - 1) // ROUTE_BINARY_ALIGN * ROUTE_BINARY_ALIGN
+
+
+def encode_routes_binary(routes: list[dict[str, Any]], projection: dict[str, Any] | None = None) -> bytes:
+    # 二进制格式（小端）：
+    #   0   4 字节 magic "ODRB"
+    #   4   uint16 版本号，uint16 保留
+    #   8   uint32 路线数 count，uint32 头部 JSON 字节长度 header_len
+    #   16  头部 JSON（UTF-8）：columns（name / type / offset）、dictionaries、字典下标列与字符串列、projection
+    #   数据区起点为 16 + header_len 向上按 8 字节对齐；各数值列的类型数组依次排列，
+    #   offset 为相对数据区起点的字节偏移（8 字节对齐），前端可直接
+    #   new Float64Array(buffer, dataStart + offset, count) / new Int32Array(buffer, dataStart + offset, count)
+    count = len(routes)
+    numeric = route_numeric_columns(routes, projection is not None)
+    dictionaries, dict_columns, string_columns = route_text_columns(routes)
+
+    columns: list[dict[str, Any]] = []
+    arrays: list[bytes] = []
+    offset = 0
+    for name, (dtype, values) in numeric.items():
+        packed = struct.pack(f"<{count}{BINARY_DTYPES[dtype]}", *values)
+        columns.append({"name": name, "type": dtype, "offset": offset})
+        arrays.append(packed + b"\0" * (align_offset(len(packed)) - len(packed)))
+        offset += align_offset(len(packed))
+
+    header: dict[str, Any] = {
+        "layout": ROUTE_LAYOUT_BINARY,
+        "count": count,
+        "columns": columns,
+        "dictionaries": dictionaries,
+        "dict_columns": dict_columns,
+        "string_columns": string_columns,
+    }
+    if projection is not None:
+        header["projection"] = projection
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    prefix_len = 16 + len(header_bytes)
+    return b"".join(
+        [
+            ROUTE_BINARY_MAGIC,
+            struct.pack("<HHII", ROUTE_BINARY_VERSION, 0, count, len(header_bytes)),
+            header_bytes,
+            b"\0" * (align_offset(prefix_len) - prefix_len),
+            *arrays,
+        ]
+    )
@@ -136,6 +136,10 @@ function bindHoverMotion(layer, onEnter, onLeave) {
     layer.on("mouseout", onLeave);
 }
 
+// 路线以列式 + Web 墨卡托整数坐标加载（/api/routes 的 layout / proj 参数），单次上限与服务端 limit 上限一致
+const ROUTE_LOAD_LIMIT = 1000;
+const ROUTE_LOAD_QUERY = "layout=columnar&proj=epsg3857";
+
 const EXPORT_QUALITY_PRESETS = {
     standard: {
         width: 1600,
@@ -230,6 +234,12 @@ function AdminApp() {
     const [loading, setLoading] = useState(false);
     const [users, setUsers] = useState([]);
     const [allRoutes, setAllRoutes] = useState([]);
+    // 全量加载被截断（达到 ROUTE_LOAD_LIMIT）时，按当前视野（bbox）补充加载的路线，只用于地图绘制
+    const [viewportRoutes, setViewportRoutes] = useState([]);
+    const routeTruncatedRef = useRef(false);
+    // allRoutes 的同步副本，增量合并时据此计算截断状态
+    const allRoutesRef = useRef([]);
+    const viewportTimerRef = useRef(null);
     const [overview, setOverview] = useState({
         total_students: 0,
         active_students: 0,
@@ -273,6 +283,10 @@ function AdminApp() {
     const [themeMode, setThemeMode] = useState(api.getTheme(api.getThemePreference()));
     const [filterPanelOpen, setFilterPanelOpen] = useState(true);
     const layoutAutoInitRef = useRef(false);
+    const routeSyncSeqRef = useRef(null);
+    // 当前学生列表及其查询条件，增量同步按同一条件合并账户变更
+    const usersRef = useRef([]);
+    const usersQueryRef = useRef({ q: "", status: "" });
     const [accountPanelOpen, setAccountPanelOpen] = useState(true);
     const [accounts, setAccounts] = useState([]);
     const [accountFilter, setAccountFilter] = useState({ q: "", user_type: "all" });
@@ -365,8 +379,15 @@ function AdminApp() {
         });
     }, [accounts, accountFilter]);
 
+    const mapRoutes = useMemo(() => {
+        if (viewportRoutes.length === 0) return allRoutes;
+        const byId = new Map(viewportRoutes.map((r) => [Number(r.id), r]));
+        allRoutes.forEach((r) => byId.set(Number(r.id), r));
+        return [...byId.values()];
+    }, [allRoutes, viewportRoutes]);
+
     const activeRoutes = useMemo(() => {
-        let rows = allRoutes;
+        let rows = mapRoutes;
 
         if (onlySelectedStudent) {
             rows = rows.filter((r) => selectedUserIdSet.has(Number(r.user_id)));
@@ -399,7 +420,7 @@ function AdminApp() {
         }
 
         return rows;
-    }, [allRoutes, onlySelectedStudent, selectedUserIdSet, selectedRouteIds, selectedRouteIdSet, routeCategory, routeKeyword]);
+    }, [mapRoutes, onlySelectedStudent, selectedUserIdSet, selectedRouteIds, selectedRouteIdSet, routeCategory, routeKeyword]);
 
     useEffect(() => {
         if (!categoryOptions.includes(routeCategory)) {
@@ -432,7 +453,12 @@ function AdminApp() {
         if (filters.status) params.set("status", filters.status);
 
         const res = await api.get(`/api/users?${params.toString()}`);
-        const list = res.users || [];
+        usersQueryRef.current = { ...filters };
+        applyUserList(res.users || []);
+    }
+
+    function applyUserList(list) {
+        usersRef.current = list;
         setUsers(list);
 
         if (list.length === 0) {
@@ -457,9 +483,100 @@ function AdminApp() {
         });
     }
 
+    function userMatchesQuery(user) {
+        // 与 /api/users?user_type=normal_user&q=&status= 的筛选条件一致
+        const { q, status } = usersQueryRef.current;
+        if (api.normalizeUserType(user.user_type) !== "normal_user") return false;
+        if (status && user.status_code !== status) return false;
+        if (!q) return true;
+        const keyword = q.toLowerCase();
+        return [user.name, String(user.id), user.username, user.status_code]
+            .some((v) => String(v || "").toLowerCase().includes(keyword));
+    }
+
+    function applyUserDelta(delta) {
+        const upserts = delta.upserts || [];
+        const deleted = new Set((delta.deleted || []).map(Number));
+        if (upserts.length === 0 && deleted.size === 0) return;
+        const byId = new Map(usersRef.current.map((u) => [Number(u.id), u]));
+        deleted.forEach((id) => byId.delete(id));
+        upserts.forEach((u) => {
+            if (userMatchesQuery(u)) byId.set(Number(u.id), u);
+            else byId.delete(Number(u.id));
+        });
+        // 排序与 /api/users 一致：路线数降序，其次最近活跃（无则注册时间）降序
+        const activeAt = (u) => String(u.last_active_at || u.created_at || "");
+        applyUserList(
+            [...byId.values()].sort(
+                (a, b) => Number(b.route_count || 0) - Number(a.route_count || 0) || activeAt(b).localeCompare(activeAt(a))
+            )
+        );
+    }
+
+    function applyRouteDelta(delta) {
+        const upserts = delta.upserts || [];
+        const deleted = new Set((delta.deleted || []).map(Number));
+        if (upserts.length === 0 && deleted.size === 0) return;
+        if (deleted.size > 0) {
+            setViewportRoutes((prev) => prev.filter((r) => !deleted.has(Number(r.id))));
+        }
+        const byId = new Map(allRoutesRef.current.map((r) => [Number(r.id), r]));
+        deleted.forEach((id) => byId.delete(id));
+        upserts.forEach((r) => byId.set(Number(r.id), r));
+        const merged = [...byId.values()].sort((a, b) => String(b.created_at || "").localeCompare(String(a.created_at || "")));
+        // 与全量加载一致只保留最新的 ROUTE_LOAD_LIMIT 条；合并后超出即视为截断，首次截断时补充加载视野内路线
+        const wasTruncated = routeTruncatedRef.current;
+        applyRouteList(merged.slice(0, ROUTE_LOAD_LIMIT), wasTruncated || merged.length > ROUTE_LOAD_LIMIT);
+        if (!wasTruncated && routeTruncatedRef.current) {
+            loadViewportRoutes().catch((err) => api.notify(err.message || "加载视野内路线失败", true));
+        }
+    }
+
+    function applyRouteList(routes, truncated) {
+        allRoutesRef.current = routes;
+        routeTruncatedRef.current = truncated;
+        setAllRoutes(routes);
+    }
+
+    async function syncChanges() {
+        // 变更后按同步序号增量合并路线与学生列表，概览只在统计有变化时重新加载；
+        // 尚无序号或服务端要求全量同步（日志已压缩、变更过多）时全部重新加载
+        const since = routeSyncSeqRef.current;
+        if (since !== null) {
+            const delta = await api.get(`/api/sync?since=${since}`);
+            if (!delta.full_resync) {
+                routeSyncSeqRef.current = Number(delta.seq || 0);
+                applyRouteDelta(delta.routes || {});
+                applyUserDelta(delta.users || {});
+                if (delta.stats_changed) await loadOverview();
+                return;
+            }
+        }
+        await Promise.all([loadAllRoutes(), loadUsers(), loadOverview()]);
+    }
+
     async function loadAllRoutes() {
-        const res = await api.get("/api/routes?limit=2000");
-        setAllRoutes(res.routes || []);
+        // 先取序号再全量加载：期间发生的变更会在下次增量中重复下发，按 id 覆盖即可
+        const sync = await api.get("/api/sync");
+        const res = await api.get(`/api/routes?limit=${ROUTE_LOAD_LIMIT}&${ROUTE_LOAD_QUERY}`);
+        const routes = api.decodeRouteColumns(res);
+        routeSyncSeqRef.current = Number(sync.seq || 0);
+        applyRouteList(routes, routes.length >= ROUTE_LOAD_LIMIT);
+        loadViewportRoutes().catch((err) => api.notify(err.message || "加载视野内路线失败", true));
+    }
+
+    async function loadViewportRoutes() {
+        const map = mapRef.current;
+        if (!routeTruncatedRef.current || !map) {
+            setViewportRoutes([]);
+            return;
+        }
+        const bounds = map.getBounds();
+        const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+            .map((v) => v.toFixed(6))
+            .join(",");
+        const res = await api.get(`/api/routes?limit=${ROUTE_LOAD_LIMIT}&${ROUTE_LOAD_QUERY}&bbox=${bbox}`);
+        setViewportRoutes(api.decodeRouteColumns(res));
     }
 
     async function loadOverview() {
@@ -699,8 +816,15 @@ function AdminApp() {
 
         mapRef.current = map;
         routeLayerRef.current = L.layerGroup().addTo(map);
+        map.on("moveend", () => {
+            clearTimeout(viewportTimerRef.current);
+            viewportTimerRef.current = setTimeout(() => {
+                loadViewportRoutes().catch((err) => api.notify(err.message || "加载视野内路线失败", true));
+            }, 300);
+        });
 
         return () => {
+            clearTimeout(viewportTimerRef.current);
             map.remove();
             mapRef.current = null;
             baseTileLayersRef.current = null;
@@ -1136,9 +1260,7 @@ function AdminApp() {
             setSelectedRouteIds([]);
             api.notify(`已删除 ${ids.length} 条线路`);
             await Promise.all([
-                loadAllRoutes(),
-                loadUsers(),
-                loadOverview(),
+                syncChanges(),
                 selectedUserId ? loadSelectedSummary(selectedUserId) : Promise.resolve(),
             ]);
         } catch (err) {
@@ -1314,9 +1436,7 @@ function AdminApp() {
         try {
             await Promise.all([
                 loadMe(),
-                loadUsers(),
-                loadAllRoutes(),
-                loadOverview(),
+                syncChanges(),
                 selectedUserId ? loadSelectedSummary(selectedUserId) : Promise.resolve(),
             ]);
             api.notify("数据已刷新");
@@ -1362,7 +1482,7 @@ function AdminApp() {
                 password: "",
                 user_type: canManagePrivileged ? "super_admin" : "normal_user",
             });
-            await Promise.all([loadAccounts(), loadUsers(), loadOverview()]);
+            await Promise.all([loadAccounts(), syncChanges()]);
         } catch (err) {
             api.notify(err.message || "创建账户失败", true);
         } finally {
@@ -1390,12 +1510,7 @@ function AdminApp() {
             api.notify("账户已删除");
             setSelectedUserIds((prev) => (prev || []).filter((id) => Number(id) !== Number(account.id)));
             setStudentContextMenu((prev) => ({ ...prev, open: false, routeId: "" }));
-            await Promise.all([
-                loadAccounts(),
-                loadUsers(),
-                loadAllRoutes(),
-                loadOverview(),
-            ]);
+            await Promise.all([loadAccounts(), syncChanges()]);
             if (summaryTargetId) {
                 try {
                     await loadSelectedSummary(summaryTargetId);
@@ -1422,9 +1537,7 @@ function AdminApp() {
             api.notify("线路已删除");
             setStudentContextMenu((prev) => ({ ...prev, open: false, routeId: "" }));
             await Promise.all([
-                loadAllRoutes(),
-                loadUsers(),
-                loadOverview(),
+                syncChanges(),
                 selectedUserId ? loadSelectedSummary(selectedUserId) : Promise.resolve(),
             ]);
         } catch (err) {
@@ -1453,9 +1566,7 @@ function AdminApp() {
             setStudentContextMenu((prev) => ({ ...prev, open: false, routeId: "" }));
             api.notify(`已删除 ${api.fmtNumber(res.deleted_count || 0)} 条线路`);
             await Promise.all([
-                loadAllRoutes(),
-                loadUsers(),
-                loadOverview(),
+                syncChanges(),
                 selectedUserId ? loadSelectedSummary(selectedUserId) : Promise.resolve(),
             ]);
         } catch (err) {
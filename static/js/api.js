@@ -195,7 +195,8 @@
 
     async function request(url, options = {}) {
         const response = await fetch(url, options);
-        const isJson = response.headers.get("content-type")?.includes("application/json");
+        // 含列式路线格式等 +json 类型
+        const isJson = /application\/([\w.-]+\+)?json/.test(response.headers.get("content-type") || "");
         const payload = isJson ? await response.json() : await response.text();
 
         if (!response.ok) {
@@ -441,6 +442,46 @@
         return "普通账户";
     }
 
+    const WEB_MERCATOR_R = 6378137.0;
+
+    function mercatorToLatLon(x, y) {
+        // EPSG:3857（米）-> 经纬度，与服务端 epsg3857_to_wgs84 一致
+        const lon = (x / WEB_MERCATOR_R) * 180 / Math.PI;
+        const lat = (2 * Math.atan(Math.exp(y / WEB_MERCATOR_R)) - Math.PI / 2) * 180 / Math.PI;
+        return [lat, lon];
+    }
+
+    function decodeRouteColumns(payload) {
+        // /api/routes?layout=columnar 的列式结果还原为逐行路线对象：字典列按下标取值；
+        // 投影输出（proj=epsg3857）的整数网格坐标乘 precision 后反投影回 datum 基准下的 *_lat / *_lon
+        const columns = payload?.columns || {};
+        const dictionaries = payload?.dictionaries || {};
+        const projection = payload?.projection || null;
+        const count = Number(payload?.count || 0);
+        const names = Object.keys(columns).filter((name) => !/^(origin|destination)_[xy]$/.test(name));
+        const suffix = projection?.datum === "gcj02" ? "_gcj02" : "";
+        const routes = new Array(count);
+        for (let i = 0; i < count; i += 1) {
+            const route = {};
+            names.forEach((name) => {
+                const value = columns[name][i];
+                route[name] = dictionaries[name] ? dictionaries[name][value] : value;
+            });
+            if (projection) {
+                ["origin", "destination"].forEach((key) => {
+                    const [lat, lon] = mercatorToLatLon(
+                        columns[`${key}_x`][i] * projection.precision,
+                        columns[`${key}_y`][i] * projection.precision
+                    );
+                    route[`${key}_lat${suffix}`] = lat;
+                    route[`${key}_lon${suffix}`] = lon;
+                });
+            }
+            routes[i] = route;
+        }
+        return routes;
+    }
+
     function getMapKey() {
         return String(window.__WEBGIS_MAP_KEY__ || "").trim();
     }
@@ -483,6 +524,7 @@
         isAdminType,
         isSuperAdminType,
         userTypeLabel,
+        decodeRouteColumns,
     };
 })();
 
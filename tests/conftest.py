@@ -0,0 +1,56 @@
+# 【中文注释】
+# 文件说明：tests/conftest.py 把项目根目录加入模块搜索路径，测试可直接 import 根目录下的模块；
+# 并在导入 app 之前把数据库指向临时目录，测试不会读写项目根目录下的 webgis.db；
+# 另提供各接口测试共用的建账户工厂（make_user）与已登录超级管理员的测试客户端（admin_client）。
+
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["WEBGIS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="webgis-test-"), "webgis.db")
+os.environ.setdefault("WEBGIS_SECRET_KEY", "webgis-test-secret")
+os.environ.setdefault("WEBGIS_IMPORT_PROCESSES", "1")
+
+
+@pytest.fixture(scope="session")
+def make_user():
+    # 直接写库创建账户并返回 ID；用户名为前缀加序号，各测试模块共用同一个临时库也不会重名。
+    # app 在此处才导入，保证上面的环境变量先生效
+    import app as webgis
+    from werkzeug.security import generate_password_hash
+
+    password_hash = generate_password_hash("x")
+    seq = itertools.count(1)
+
+    def create(prefix: str, user_type: str = webgis.USER_TYPE_NORMAL_USER) -> int:
+        username = f"{prefix}-{next(seq)}"
+        now = webgis.utc_now_text()
+        db = sqlite3.connect(webgis.DB_PATH)
+        try:
+            user_id = db.execute(
+                "INSERT INTO users(name, username, user_type, status, password_hash, created_at, last_active_at) VALUES(?, ?, ?, ?, ?, ?, ?)",
+                (username, username, user_type, "offline", password_hash, now, now),
+            ).lastrowid
+            db.commit()
+        finally:
+            db.close()
+        return user_id
+
+    return create
+
+
+@pytest.fixture(scope="module")
+def admin_client(make_user):
+    # 每个测试模块一个以超级管理员身份登录的测试客户端
+    import app as webgis
+
+    client = webgis.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = make_user("admin", webgis.USER_TYPE_SUPER_ADMIN)
+    return client
@@ -0,0 +1,109 @@
+# 【中文注释】
+# 文件说明：coord_transform 的测试：各坐标系对照参考坐标、往返换算，以及 numpy 批量与逐点换算结果一致（1e-9）。
+
+import random
+
+import pytest
+
+import coord_transform as ct
+
+# (WGS-84, GCJ-02) 参考点：上海、深圳、北京
+WGS84_GCJ02_REFERENCE = [
+    ((31.1774276, 121.5272106), (31.17530398364597, 121.531541859215)),
+    ((22.543847, 113.912316), (22.540796131694766, 113.9171764808363)),
+    ((39.911954, 116.377817), (39.91334545536069, 116.38404722455657)),
+]
+# 天安门：BD-09 -> GCJ-02
+BD09_GCJ02_REFERENCE = ((39.915, 116.404), (39.90865673957631, 116.39762729119315))
+# gcj02_to_wgs84 为两次迭代的近似反算，往返误差在 1e-5 度（约 1 米）以内
+ROUND_TRIP_TOLERANCE = 1e-5
+BATCH_TOLERANCE = 1e-9
+
+
+def random_points(n: int, seed: int = 11) -> tuple[list[float], list[float]]:
+    # 大部分落在国内，另有少量境外点（境外点不做偏移）
+    rng = random.Random(seed)
+    lats = [rng.uniform(18.0, 53.0) if i % 5 else rng.uniform(-60.0, 10.0) for i in range(n)]
+    lons = [rng.uniform(73.0, 135.0) if i % 5 else rng.uniform(-170.0, 70.0) for i in range(n)]
+    return lats, lons
+
+
+@pytest.mark.parametrize(("wgs", "gcj"), WGS84_GCJ02_REFERENCE)
+def test_wgs84_gcj02_reference_points(wgs, gcj):
+    assert ct.wgs84_to_gcj02(*wgs) == pytest.approx(gcj, abs=1e-9)
+    assert ct.gcj02_to_wgs84(*gcj) == pytest.approx(wgs, abs=ROUND_TRIP_TOLERANCE)
+    assert ct.to_wgs84(*gcj, ct.COORD_SYSTEM_GCJ02) == pytest.approx(wgs, abs=ROUND_TRIP_TOLERANCE)
+
+
+def test_bd09_reference_point():
+    bd, gcj = BD09_GCJ02_REFERENCE
+    assert ct.bd09_to_gcj02(*bd) == pytest.approx(gcj, abs=1e-9)
+    assert ct.to_wgs84(*bd, ct.COORD_SYSTEM_BD09) == pytest.approx(ct.gcj02_to_wgs84(*gcj), abs=1e-12)
+
+
+def test_out_of_china_is_unchanged():
+    assert ct.wgs84_to_gcj02(51.5, -0.12) == (51.5, -0.12)
+    assert ct.gcj02_to_wgs84(51.5, -0.12) == (51.5, -0.12)
+
+
+def test_epsg3857_reference_and_round_trip():
+    assert ct.wgs84_to_epsg3857(0.0, 180.0) == pytest.approx((ct.WEB_MERCATOR_MAX, 0.0), abs=1e-6)
+    assert ct.wgs84_to_epsg3857(ct.WEB_MERCATOR_MAX_LAT, 0.0) == pytest.approx((0.0, ct.WEB_MERCATOR_MAX), abs=1e-6)
+    for lat, lon in zip(*random_points(50)):
+        x, y = ct.wgs84_to_epsg3857(lat, lon)
+        assert ct.to_wgs84(y, x, ct.COORD_SYSTEM_EPSG3857) == pytest.approx((lat, lon), abs=1e-9)
+
+
+def test_gcj02_round_trip():
+    lats, lons = random_points(200)
+    for lat, lon in zip(lats, lons):
+        gcj = ct.wgs84_to_gcj02(lat, lon)
+        assert ct.gcj02_to_wgs84(*gcj) == pytest.approx((lat, lon), abs=ROUND_TRIP_TOLERANCE)
+
+
+@pytest.mark.parametrize("system", [ct.COORD_SYSTEM_WGS84, ct.COORD_SYSTEM_CGCS2000])
+def test_wgs84_equivalent_systems_are_identity(system):
+    assert ct.to_wgs84(39.9, 116.4, system) == (39.9, 116.4)
+    assert ct.to_wgs84_batch([39.9, 31.2], [116.4, 121.5], system) == ([39.9, 31.2], [116.4, 121.5])
+
+
+def test_batch_matches_scalar():
+    pytest.importorskip("numpy")
+    lats, lons = random_points(500)
+    batch = ct.wgs84_to_gcj02_batch(lats, lons)
+    scalar = list(zip(*(ct.wgs84_to_gcj02(lat, lon) for lat, lon in zip(lats, lons))))
+    assert batch[0] == pytest.approx(list(scalar[0]), abs=BATCH_TOLERANCE)
+    assert batch[1] == pytest.approx(list(scalar[1]), abs=BATCH_TOLERANCE)
+
+    batch = ct.gcj02_to_wgs84_batch(lats, lons)
+    scalar = list(zip(*(ct.gcj02_to_wgs84(lat, lon) for lat, lon in zip(lats, lons))))
+    assert batch[0] == pytest.approx(list(scalar[0]), abs=BATCH_TOLERANCE)
+    assert batch[1] == pytest.approx(list(scalar[1]), abs=BATCH_TOLERANCE)
+
+
+def test_to_wgs84_batch_matches_scalar_for_mixed_systems():
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    lats, lons = random_points(400)
+    systems = [
+        rng.choice([ct.COORD_SYSTEM_WGS84, ct.COORD_SYSTEM_CGCS2000, ct.COORD_SYSTEM_GCJ02, ct.COORD_SYSTEM_BD09, ct.COORD_SYSTEM_EPSG3857])
+        for _ in lats
+    ]
+    # EPSG:3857 的点以米为单位：先投影，lat 字段存 y、lon 字段存 x
+    for i, system in enumerate(systems):
+        if system == ct.COORD_SYSTEM_EPSG3857:
+            x, y = ct.wgs84_to_epsg3857(lats[i], lons[i])
+            lats[i], lons[i] = y, x
+
+    out_lat, out_lon = ct.to_wgs84_batch(lats, lons, systems)
+    for lat, lon, system, got_lat, got_lon in zip(lats, lons, systems, out_lat, out_lon):
+        assert (got_lat, got_lon) == pytest.approx(ct.to_wgs84(lat, lon, system), abs=BATCH_TOLERANCE)
+
+
+def test_mercator_quantize_batch_matches_scalar():
+    pytest.importorskip("numpy")
+    lats, lons = random_points(300)
+    xs, ys = ct.mercator_quantize_batch(lats, lons, 0.5)
+    for lat, lon, qx, qy in zip(lats, lons, xs, ys):
+        x, y = ct.wgs84_to_epsg3857(lat, lon)
+        assert (qx, qy) == (int(round(x / 0.5)), int(round(y / 0.5)))
@@ -0,0 +1,55 @@
+# 【中文注释】
+# 文件说明：数据版本 ETag 的接口测试：各压缩编码的响应共用弱 ETag，If-None-Match 按弱比较命中 304；
+# 写入与数据库纪元变化（整库重建后计数从 0 重新开始）都会改变 ETag。
+
+import sqlite3
+
+import pytest
+
+import app as webgis
+
+
+def test_etag_is_weak_and_shared_across_encodings(admin_client):
+    identity = admin_client.get("/api/stats/overview", headers={"Accept-Encoding": "identity"})
+    gzipped = admin_client.get("/api/stats/overview", headers={"Accept-Encoding": "gzip"})
+    assert identity.status_code == gzipped.status_code == 200
+    assert identity.headers["ETag"].startswith('W/"')
+    assert identity.headers["ETag"] == gzipped.headers["ETag"]
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_if_none_match_uses_weak_comparison(admin_client, encoding):
+    etag = admin_client.get("/api/stats/overview").headers["ETag"]
+    strong = etag[2:]
+    for value in (etag, strong):
+        resp = admin_client.get("/api/stats/overview", headers={"If-None-Match": value, "Accept-Encoding": encoding})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag
+
+
+def test_write_changes_etag(admin_client):
+    before = admin_client.get("/api/stats/overview").headers["ETag"]
+    resp = admin_client.post(
+        "/api/routes",
+        json={"origin_lat": 30.2, "origin_lon": 120.2, "destination_lat": 31.2, "destination_lon": 121.4},
+    )
+    assert resp.get_json()["ok"]
+    after = admin_client.get("/api/stats/overview", headers={"If-None-Match": before})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before
+
+
+def test_data_epoch_change_invalidates_etag_and_node_registry(admin_client):
+    # 模拟整库重建：计数不变、纪元更换
+    etag = admin_client.get("/api/nodes").headers["ETag"]
+    db = sqlite3.connect(webgis.DB_PATH)
+    db.row_factory = sqlite3.Row
+    registry = webgis.get_node_registry(db)
+    db.execute("UPDATE app_meta SET value = ? WHERE key = ?", ("rebuilt", webgis.DATA_EPOCH_KEY))
+    db.commit()
+    assert webgis.get_node_registry(db) is not registry
+    db.close()
+
+    resp = admin_client.get("/api/nodes", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
@@ -0,0 +1,151 @@
+# 【中文注释】
+# 文件说明：路线内容摘要去重的测试：未带创建时间的模板 CSV 在时间窗内重复导入、重复保存都应被识别为重复，
+# 超出时间窗的同一路线保留；摘要可由已存的行重新算出，旧数据补算摘要沿用同一规则；
+# 以及导入中途解析失败时返回已导入计数与出错位置。
+
+import io
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import app as webgis
+
+
+@pytest.fixture(scope="module")
+def client(admin_client, make_user):
+    admin_client.owner_id = make_user("owner")
+    return admin_client
+
+
+def freeze_clock(monkeypatch, text):
+    # 固定服务端补创建时间用的当前时间
+    moment = datetime.strptime(text, webgis.DATETIME_FMT)
+    monkeypatch.setattr(webgis, "utc_now", lambda: moment)
+    monkeypatch.setattr(webgis, "utc_now_text", lambda: text)
+
+
+def template_csv(client, rows):
+    header = client.get("/api/routes/template").data.decode("utf-8-sig")
+    lines = [header.rstrip("\n")]
+    for origin, destination in rows:
+        lines.append(f",,{origin[0]},{origin[1]},,,{destination[0]},{destination[1]},客运,{client.owner_id},wgs84,,")
+    return ("\n".join(lines) + "\n").encode("utf-8-sig")
+
+
+def post_batch(client, content):
+    resp = client.post(
+        "/api/routes/batch",
+        data={"file": (io.BytesIO(content), "od_routes_template.csv")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def test_reimporting_template_csv_skips_rows(client, monkeypatch):
+    content = template_csv(client, [((30.1, 120.1), (31.2, 121.4)), ((39.9, 116.4), (31.2, 121.4))])
+
+    freeze_clock(monkeypatch, "2026-03-01 08:00:00")
+    first = post_batch(client, content)
+    assert first["inserted"] == 2
+
+    freeze_clock(monkeypatch, "2026-03-01 08:05:00")
+    second = post_batch(client, content)
+    assert second["inserted"] == 0
+    assert second["duplicates"] == 2
+
+    # 超出时间窗的同一路线是新的行程
+    freeze_clock(monkeypatch, "2026-03-01 09:30:00")
+    third = post_batch(client, content)
+    assert third["inserted"] == 2
+    assert third["duplicates"] == 0
+
+
+def test_saving_route_twice_without_created_at_is_duplicate(client, monkeypatch):
+    payload = {
+        "user_id": client.owner_id,
+        "origin_lat": 22.5,
+        "origin_lon": 114.0,
+        "destination_lat": 23.1,
+        "destination_lon": 113.3,
+    }
+    freeze_clock(monkeypatch, "2026-03-01 08:00:00")
+    first = client.post("/api/routes", json=payload).get_json()
+    freeze_clock(monkeypatch, "2026-03-01 08:00:01")
+    second = client.post("/api/routes", json=payload).get_json()
+    assert first["ok"] and second["ok"]
+    assert second["duplicate"] is True
+    assert second["route"]["id"] == first["route"]["id"]
+
+
+def test_content_hash_recomputes_from_stored_row(client):
+    payload = {
+        "user_id": client.owner_id,
+        "origin_lat": 24.5,
+        "origin_lon": 118.1,
+        "destination_lat": 26.1,
+        "destination_lon": 119.3,
+        "created_at": "2026-03-03T10:20:30",
+    }
+    route = client.post("/api/routes", json=payload).get_json()["route"]
+    db = sqlite3.connect(webgis.DB_PATH)
+    db.row_factory = sqlite3.Row
+    row = db.execute("SELECT * FROM od_routes WHERE id = ?", (route["id"],)).fetchone()
+    db.close()
+    assert row["created_at"] == "2026-03-03 10:20:30"
+    key = webgis.route_content_key(
+        row["user_id"], row["origin_lat"], row["origin_lon"], row["destination_lat"], row["destination_lon"], row["category"]
+    )
+    assert row["content_hash"] == webgis.route_content_hash(key, row["created_at"])
+
+
+def test_legacy_dedupe_uses_duplicate_window(client):
+    # 旧数据没有摘要：相隔几秒的双击保存应清理，相隔超过时间窗的同一路线保留
+    db = sqlite3.connect(webgis.DB_PATH)
+    db.row_factory = sqlite3.Row
+    times = ["2026-03-04 08:00:00", "2026-03-04T08:00:03", "2026-03-04 11:00:00"]
+    ids = [
+        db.execute(
+            """
+            INSERT INTO od_routes(
+                user_id, origin_name, origin_lat, origin_lon, destination_name, destination_lat, destination_lon,
+                category, status, created_at
+            ) VALUES(?, '起点', 27.1, 112.9, '终点', 28.2, 113.0, '货运', 'active', ?)
+            """,
+            (client.owner_id, created_at),
+        ).lastrowid
+        for created_at in times
+    ]
+    db.commit()
+    while webgis.dedupe_routes_chunk(db, 2)["scanned"]:
+        pass
+    kept = [row["id"] for row in db.execute(f"SELECT id FROM od_routes WHERE id IN ({','.join('?' for _ in ids)})", ids)]
+    db.close()
+    assert kept == [ids[0], ids[2]]
+
+
+def test_batch_reports_counts_when_geojson_breaks_mid_stream(client):
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[lon, 25.0], [121.4, 31.2]]},
+            "properties": {"user_id": client.owner_id, "created_at": "2026-03-02T08:00:00"},
+        }
+        for lon in (110.1, 110.2)
+    ]
+    body = json.dumps({"type": "FeatureCollection", "features": features})
+    # 第 3 个要素结构损坏
+    content = (body[:-2] + ', {"type": "Feature", "geometry": }]}').encode("utf-8")
+    resp = client.post(
+        "/api/routes/batch",
+        data={"file": (io.BytesIO(content), "routes.geojson")},
+        content_type="multipart/form-data",
+    )
+    payload = resp.get_json()
+    assert resp.status_code == 400
+    assert payload["ok"] is False
+    assert payload["inserted"] == 2
+    assert payload["failed"]["line"] == 3
+    assert "第 3 行" in payload["message"]
@@ -0,0 +1,90 @@
+# 【中文注释】
+# 文件说明：route_import 解析阶段的测试：Parquet / Arrow 按列解析与逐行解析（把记录批转成逐行字段字典，
+# 走 CSV 等文本格式的 parse_route_batch）结果一致。
+
+import io
+import math
+import random
+
+import pytest
+
+import route_import
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def assert_same(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        assert (math.isnan(a) and math.isnan(b)) or a == pytest.approx(b, abs=1e-9)
+    elif isinstance(a, dict) and isinstance(b, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            assert_same(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same(x, y)
+    else:
+        assert a == b
+
+
+def mixed_parquet(n: int = 3000) -> bytes:
+    # 覆盖：各坐标系、节点代码、空值、NaN、越界、文本坐标、非法坐标系与时间、全空行、列名带空白
+    rng = random.Random(7)
+
+    def pick(*values):
+        return [rng.choice(values) for _ in range(n)]
+
+    columns = {
+        "origin_lat": pick(30.5, None, 95.0, float("nan"), 4e6, 39.9),
+        "origin_lon": pick(120.1, 116.4, 190.0, 1.3e7),
+        "destination_lat": pick("31.2", "", "abc", None, "3.5e6"),
+        "destination_lon": pick("121.4", "", "1.2e7", None),
+        " coord_system ": pick("wgs84", "gcj02", "bd09", "epsg3857", "cgcs2000", "百度坐标", "bad", None, ""),
+        "origin_coord_system": pick(None, "", "gcj02", "xx"),
+        "origin_code": pick(None, "", " bj ", "SH"),
+        "origin_name": pick(None, " 名 ", ""),
+        "destination_code": pick(None, "", "sh"),
+        "user_id": pick(2, 3, None),
+        "category": pick(None, "客运", " "),
+        "created_at": pick(None, "", "2026-01-01T00:00:00", "bad"),
+        "extra": pick(None, 1.5),
+    }
+    for values in columns.values():
+        for i in range(0, n, 97):
+            values[i] = None
+    buffer = io.BytesIO()
+    pq.write_table(pa.table(columns), buffer)
+    return buffer.getvalue()
+
+
+def columnar_rows(data: bytes) -> list[tuple[int, dict]]:
+    # 参照实现：记录批逐行转成与 CSV 同名的字段字典，行号为数据行序号（从 1 开始），全空行跳过
+    rows = []
+    line = 0
+    for batch in route_import.iter_columnar_record_batches(io.BytesIO(data), route_import.IMPORT_FORMAT_PARQUET):
+        for record in batch.to_pylist():
+            line += 1
+            row = {str(k).strip(): route_import.payload_value(str(k).strip(), v) for k, v in record.items()}
+            if any(v not in (None, "") for v in row.values()):
+                rows.append((line, row))
+    return rows
+
+
+def test_columnar_parse_matches_row_parse():
+    data = mixed_parquet()
+    rows = columnar_rows(data)
+    expected = []
+    for start in range(0, len(rows), route_import.PARSE_BATCH_SIZE):
+        expected.extend(route_import.parse_route_batch(rows[start : start + route_import.PARSE_BATCH_SIZE]))
+    actual = list(route_import.iter_columnar_parsed_routes(io.BytesIO(data), route_import.IMPORT_FORMAT_PARQUET))
+    assert [line for line, _ in actual] == [line for line, _ in expected]
+    assert_same(actual, expected)
+
+
+def test_parsed_upload_routes_skip_resumes_after_committed_rows():
+    data = mixed_parquet(500)
+    full = list(route_import.iter_parsed_upload_routes(io.BytesIO(data), route_import.IMPORT_FORMAT_PARQUET))
+    resumed = list(route_import.iter_parsed_upload_routes(io.BytesIO(data), route_import.IMPORT_FORMAT_PARQUET, skip=100))
+    assert_same(resumed, full[100:])
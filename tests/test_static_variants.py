@@ -0,0 +1,52 @@
+# 【中文注释】
+# 文件说明：预压缩静态资源的接口测试：有 .br/.gz 变体时，变体与原文件两种响应都声明 Vary: Accept-Encoding。
+
+import gzip
+import os
+
+import pytest
+
+import app as webgis
+
+
+@pytest.fixture()
+def static_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(webgis.app, "static_folder", str(tmp_path))
+    source = tmp_path / "bundle.js"
+    plain = tmp_path / "plain.js"
+    source.write_text("console.log('variant');\n" * 50)
+    plain.write_text("console.log('plain');\n")
+    (tmp_path / "bundle.js.gz").write_bytes(gzip.compress(source.read_bytes()))
+    return source
+
+
+def test_variant_is_served_with_vary(static_file):
+    resp = webgis.app.test_client().get("/static/bundle.js", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers.get("Vary", "")
+    resp.close()
+
+
+def test_identity_fallback_declares_vary_when_variant_exists(static_file):
+    resp = webgis.app.test_client().get("/static/bundle.js", headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" in resp.headers.get("Vary", "")
+    resp.close()
+
+
+def test_file_without_variant_has_no_vary(static_file):
+    resp = webgis.app.test_client().get("/static/plain.js", headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == 200
+    assert "Accept-Encoding" not in resp.headers.get("Vary", "")
+    resp.close()
+
+
+def test_stale_variant_is_ignored(static_file):
+    stamp = os.path.getmtime(static_file)
+    os.utime(str(static_file) + ".gz", (stamp - 60, stamp - 60))
+    resp = webgis.app.test_client().get("/static/bundle.js", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" not in resp.headers.get("Vary", "")
+    resp.close()
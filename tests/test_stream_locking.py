@@ -0,0 +1,77 @@
+# 【中文注释】
+# 文件说明：流式输出期间的并发写入测试：逐批输出时保持的读游标不能让其他连接的写入报 "database is locked"。
+
+import io
+import sqlite3
+
+import pytest
+
+import app as webgis
+
+ROUTE_COUNT = 1200
+EXPORT_ACCOUNT_COUNT = 1200
+
+
+@pytest.fixture(scope="module")
+def client(admin_client, make_user):
+    owner_id = make_user("stream-owner")
+    admin_client.owner_id = owner_id
+
+    lines = ["origin_lat,origin_lon,destination_lat,destination_lon,user_id"]
+    lines += [f"{20 + i * 0.01:.2f},110.5,31.2,121.4,{owner_id}" for i in range(ROUTE_COUNT)]
+    resp = admin_client.post(
+        "/api/routes/batch",
+        data={"file": (io.BytesIO("\n".join(lines).encode("utf-8")), "routes.csv")},
+        content_type="multipart/form-data",
+    )
+    assert resp.get_json()["inserted"] == ROUTE_COUNT
+    return admin_client
+
+
+def assert_writer_not_blocked(user_id):
+    writer = sqlite3.connect(webgis.DB_PATH, timeout=0.5)
+    try:
+        writer.execute("UPDATE users SET last_active_at = ? WHERE id = ?", (webgis.utc_now_text(), user_id))
+        writer.commit()
+    finally:
+        writer.close()
+
+
+def test_writer_not_blocked_while_route_stream_paused(client):
+    resp = client.get("/api/routes?limit=1000&stream=1", buffered=False)
+    chunks = iter(resp.response)
+    body = [next(chunks), next(chunks)]
+
+    # 第一批已输出、游标仍有未读行时，其他连接写入
+    assert_writer_not_blocked(client.owner_id)
+
+    body.extend(chunks)
+    resp.close()
+    payload = webgis.app.json.loads(b"".join(body))
+    assert len(payload["routes"]) == 1000
+
+
+def test_writer_not_blocked_while_account_export_paused(client):
+    db = sqlite3.connect(webgis.DB_PATH)
+    now = webgis.utc_now_text()
+    db.executemany(
+        "INSERT INTO users(name, username, user_type, status, password_hash, created_at, last_active_at) VALUES(?, ?, ?, ?, ?, ?, ?)",
+        [
+            (f"export-{i}", f"export-{i}", webgis.USER_TYPE_NORMAL_USER, "offline", "x", now, now)
+            for i in range(EXPORT_ACCOUNT_COUNT)
+        ],
+    )
+    db.commit()
+    db.close()
+
+    resp = client.get("/api/export/accounts-csv", buffered=False)
+    chunks = iter(resp.response)
+    body = [next(chunks), next(chunks)]
+
+    # 表头与第一批已输出、游标仍有未读行时，其他连接写入
+    assert_writer_not_blocked(client.owner_id)
+
+    body.extend(chunks)
+    resp.close()
+    lines = b"".join(body).decode("utf-8-sig").splitlines()
+    assert len(lines) - 1 >= EXPORT_ACCOUNT_COUNT
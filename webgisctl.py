@@ -7,6 +7,7 @@ Older .sh/.bat scripts can remain as thin wrappers for compatibility.
 """
 
 import argparse
+import gzip
 import hashlib
 import http.cookiejar
 import json
@@ -36,6 +37,10 @@ LOG_DIR = ROOT_DIR / "logs"
 DEFAULT_VENV_DIR = ".venv"
 DEFAULT_PORT = 5000
 TAILWIND_VERSION = "v3.4.17"
+STATIC_DIR = ROOT_DIR / "static"
+PRECOMPRESS_SUFFIXES = {".js", ".jsx", ".css", ".svg", ".html", ".json", ".map", ".txt"}
+PRECOMPRESS_MIN_BYTES = 1024
+PRECOMPRESS_ENCODINGS = (".gz", ".br")
 
 
 def info(msg: str) -> None:
@@ -285,6 +290,48 @@ def run_tailwind_build(args: argparse.Namespace) -> None:
     ok(f"Tailwind CSS build completed with standalone binary: {tailwind_bin}")
 
 
+def precompress_static_assets(static_dir: Path = STATIC_DIR) -> Tuple[int, int]:
+    """Write max-level .gz (and .br when brotli is installed) next to static text assets.
+
+    Variants newer than their source are kept; variants whose source is gone are removed.
+    Returns (written, skipped).
+    """
+    try:
+        import brotli  # type: ignore
+    except ImportError:
+        brotli = None
+        warn("Python package 'brotli' not installed, only .gz variants will be generated.")
+
+    for variant in [p for ext in PRECOMPRESS_ENCODINGS for p in static_dir.rglob(f"*{ext}")]:
+        if not variant.with_suffix("").exists():
+            variant.unlink()
+
+    written = skipped = 0
+    for source in sorted(static_dir.rglob("*")):
+        if not source.is_file() or source.suffix not in PRECOMPRESS_SUFFIXES:
+            continue
+        if source.stat().st_size < PRECOMPRESS_MIN_BYTES:
+            continue
+        data = None
+        for ext in PRECOMPRESS_ENCODINGS:
+            if ext == ".br" and brotli is None:
+                continue
+            target = source.with_name(source.name + ext)
+            if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+                skipped += 1
+                continue
+            if data is None:
+                data = source.read_bytes()
+            if ext == ".gz":
+                # mtime=0 keeps the output byte-identical across builds
+                payload = gzip.compress(data, compresslevel=9, mtime=0)
+            else:
+                payload = brotli.compress(data, quality=11)
+            target.write_bytes(payload)
+            written += 1
+    return written, skipped
+
+
 def health_status(host: str, port: int, path: str, timeout: float = 2.0) -> Optional[int]:
     url = f"http://{host}:{port}{path}"
     try:
@@ -583,6 +630,9 @@ def cmd_build(args: argparse.Namespace) -> int:
         venv_python = get_venv_python(args.venv_dir)
         py = str(venv_python if venv_python.exists() else (args.python or sys.executable))
         run_cmd([py, "build_jsx.py"])
+    if not args.skip_precompress:
+        written, skipped = precompress_static_assets()
+        ok(f"Precompressed static assets: {written} written, {skipped} up to date.")
     ok("Build completed.")
     return 0
 
@@ -634,6 +684,9 @@ def cmd_clean(args: argparse.Namespace) -> int:
             ROOT_DIR / args.venv_dir,
             ROOT_DIR / ".venv-wsl",
             ROOT_DIR / "webgis.db",
+            ROOT_DIR / "webgis.db-wal",
+            ROOT_DIR / "webgis.db-shm",
+            ROOT_DIR / ".import_jobs",
             ROOT_DIR / ".tianditu_key",
             Path(args.env_file),
         ]:
@@ -753,6 +806,7 @@ def build_parser() -> argparse.ArgumentParser:
     p_build.add_argument("--venv-dir", default=DEFAULT_VENV_DIR, help="Virtual env directory.")
     p_build.add_argument("--skip-tailwind", action="store_true", help="Skip Tailwind build.")
     p_build.add_argument("--with-jsx-dist", action="store_true", help="Compile JSX to static/js/dist.")
+    p_build.add_argument("--skip-precompress", action="store_true", help="Skip writing .gz/.br static variants.")
     p_build.add_argument("--force-standalone-tailwind", action="store_true", help="Force standalone Tailwind binary.")
     p_build.add_argument("--npm-timeout", type=int, default=300, help="npm build timeout seconds.")
     p_build.set_defaults(func=cmd_build)
@@ -792,6 +846,7 @@ def build_parser() -> argparse.ArgumentParser:
     p_deploy.add_argument("--force-standalone-tailwind", action="store_true", help="Force standalone Tailwind binary.")
     p_deploy.add_argument("--skip-tailwind", action="store_true", help="Skip Tailwind build.")
     p_deploy.add_argument("--with-jsx-dist", action="store_true", help="Compile JSX to dist during deploy.")
+    p_deploy.add_argument("--skip-precompress", action="store_true", help="Skip writing .gz/.br static variants.")
     p_deploy.add_argument("--wait-seconds", type=int, default=45, help="Startup wait timeout.")
     p_deploy.add_argument("--open", action="store_true", help="Open browser page after deploy.")
     p_deploy.add_argument("--map-key", default="", help="TianDiTu API key.")